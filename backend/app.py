@@ -1,9 +1,16 @@
-from flask import Flask, jsonify
+from flask import Flask, Response, jsonify
 from flask_cors import CORS
 import os
 
 from routes.owner import owner_bp
 from routes.mechanic import mechanic_bp
+from utils.scheduler import start_scheduler
+from utils.accounts import cache_stats, start_profile_listener
+from utils.dispatch import mechanic_index, start_index_listener
+from utils.board import request_board, start_board_listener
+from utils.tracking import tracking_stats
+from utils import instrumentation, metrics
+from firebase import readiness
 
 app = Flask(__name__)
 
@@ -11,7 +18,8 @@ app = Flask(__name__)
 CORS(
     app,
     resources={r"/*": {"origins": "*"}},
-    supports_credentials=False
+    supports_credentials=False,
+    expose_headers=["ETag"]
 )
 
 # ✅ FORCE PREFLIGHT RESPONSE (THIS IS THE KEY)
@@ -23,10 +31,13 @@ def handle_preflight():
     if request.method == "OPTIONS":
         response = jsonify({})
         response.headers.add("Access-Control-Allow-Origin", "*")
-        response.headers.add("Access-Control-Allow-Headers", "Content-Type,Authorization")
+        response.headers.add("Access-Control-Allow-Headers", "Content-Type,Authorization,If-None-Match")
         response.headers.add("Access-Control-Allow-Methods", "GET,POST,PUT,DELETE,OPTIONS")
         return response, 200
 
+# 📈 PER-ENDPOINT TIMING (+ X-Datastore-Usage when DB_DEBUG_HEADER=1)
+instrumentation.install(app)
+
 # ✅ BLUEPRINTS
 app.register_blueprint(owner_bp, url_prefix="/owner")
 app.register_blueprint(mechanic_bp, url_prefix="/mechanic")
@@ -35,6 +46,63 @@ app.register_blueprint(mechanic_bp, url_prefix="/mechanic")
 def health():
     return {"status": "FixIt backend running"}
 
+# 🚦 READINESS (liveness stays at /): 503 until Firestore answers
+@app.route("/ready")
+def ready_route():
+    ok, details = readiness()
+    return {"status": "ready" if ok else "unavailable", **details}, 200 if ok else 503
+
+@app.route("/cache/stats")
+def cache_stats_route():
+    return cache_stats()
+
+@app.route("/dispatch/stats")
+def dispatch_stats_route():
+    return mechanic_index.stats()
+
+@app.route("/board/stats")
+def board_stats_route():
+    return request_board.stats()
+
+@app.route("/tracking/stats")
+def tracking_stats_route():
+    return tracking_stats()
+
+@app.route("/stats")
+def stats_route():
+    return metrics.counters()
+
+@app.route("/metrics")
+def metrics_route():
+    return Response(
+        instrumentation.render_prometheus(),
+        mimetype="text/plain; version=0.0.4"
+    )
+
+def start_background_services():
+    # 👂 OPTIONAL CROSS-PROCESS PROFILE CACHE INVALIDATION
+    if os.environ.get("PROFILE_CACHE_LISTENER") == "1":
+        start_profile_listener()
+
+    # 🧭 OPTIONAL LIVE DISPATCH INDEX (otherwise re-warmed every minute)
+    if os.environ.get("DISPATCH_LISTENER") == "1":
+        start_index_listener()
+
+    # 📋 OPTIONAL LIVE REQUEST BOARD (/mechanic/requests from memory)
+    if os.environ.get("REQUEST_BOARD") == "1":
+        start_board_listener()
+
+    # ⏰ RADIUS EXPANSION / TIMEOUT SCHEDULER
+    # One leader across all workers (Firestore lease); set RUN_SCHEDULER=0
+    # when running `python -m utils.scheduler` as a separate process instead.
+    if os.environ.get("RUN_SCHEDULER", "1") == "1":
+        start_scheduler()
+
+# 🍴 With gunicorn --preload the app is imported once in the master; threads
+# don't survive fork, so gunicorn.conf.py starts them in each worker instead
+if os.environ.get("FIXIT_PRELOADED") != "1":
+    start_background_services()
+
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 5002))
     app.run(host="0.0.0.0", port=port)
\ No newline at end of file
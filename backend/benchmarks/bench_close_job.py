@@ -0,0 +1,106 @@
+"""
+Latency of POST /owner/bill/confirm against a local Firestore emulator.
+
+Start the emulator first, e.g.
+    gcloud emulators firestore start --host-port=localhost:8080
+
+then run from backend/:
+    FIRESTORE_EMULATOR_HOST=localhost:8080 python -m benchmarks.bench_close_job --jobs 300
+
+Without FIRESTORE_EMULATOR_HOST it runs on the in-memory engine
+(FIXIT_STORAGE=memory) and also reports commit / write / read counts;
+latency there only measures the app's own overhead.
+"""
+import argparse
+import os
+import statistics
+import time
+import uuid
+
+os.environ.setdefault("RUN_SCHEDULER", "0")
+
+if not os.environ.get("FIRESTORE_EMULATOR_HOST"):
+    os.environ.setdefault("FIXIT_STORAGE", "memory")
+
+from firebase import get_db  # noqa: E402
+from app import app  # noqa: E402
+
+db = get_db()
+
+
+def seed(jobs):
+    run = uuid.uuid4().hex[:6]
+    request_ids = []
+
+    for i in range(jobs):
+        owner_phone = f"7{run}{i:05d}"
+        mechanic_phone = f"6{run}{i:05d}"
+        request_id = f"bench-{run}-{i}"
+
+        db.collection("owners").document(owner_phone).set({
+            "phone": owner_phone,
+            "name": "Bench Owner",
+            "active_request_id": request_id
+        })
+        db.collection("mechanics").document(mechanic_phone).set({
+            "phone": mechanic_phone,
+            "name": "Bench Mechanic",
+            "verified": True,
+            "is_available": False,
+            "active_request_id": request_id
+        })
+        db.collection("requests").document(request_id).set({
+            "owner_phone": owner_phone,
+            "mechanic_phone": mechanic_phone,
+            "status": "IN_PROGRESS",
+            "bill_status": "AWAITING_BILL_CONFIRMATION",
+            "grand_total": 500
+        })
+        db.collection("bills").document(request_id).set({
+            "request_id": request_id,
+            "status": "AWAITING_BILL_CONFIRMATION",
+            "grand_total": 500
+        })
+
+        request_ids.append(request_id)
+
+    return request_ids
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--jobs", type=int, default=200)
+    args = parser.parse_args()
+
+    request_ids = seed(args.jobs)
+    client = app.test_client()
+
+    if hasattr(db, "reset_counters"):
+        db.reset_counters()
+
+    latencies = []
+    for request_id in request_ids:
+        start = time.perf_counter()
+        res = client.post("/owner/bill/confirm", json={"request_id": request_id})
+        latencies.append((time.perf_counter() - start) * 1000)
+        assert res.status_code == 200, res.get_json()
+
+    print(f"jobs closed : {args.jobs}")
+    print(f"p50 (ms)    : {statistics.median(latencies):.2f}")
+    print(f"p99 (ms)    : {percentile(latencies, 99):.2f}")
+    print(f"mean (ms)   : {statistics.mean(latencies):.2f}")
+
+    if hasattr(db, "reset_counters"):
+        print(f"commits/job : {db.commits / args.jobs:.1f}")
+        print(f"writes/job  : {db.writes / args.jobs:.1f}")
+        print(f"reads/job   : {db.reads / args.jobs:.1f}")
+
+
+if __name__ == "__main__":
+    main()
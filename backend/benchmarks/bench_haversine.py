@@ -0,0 +1,71 @@
+"""
+Scalar haversine loop vs utils.geo.haversine_many.
+
+Run from backend/:
+    python -m benchmarks.bench_haversine
+    python -m benchmarks.bench_haversine --sizes 1000 10000 100000 --radius 12
+
+Points are spread uniformly over a ~110 km square around the origin,
+so with a 12 km radius most of them fail the bounding-box prefilter,
+which is roughly what a mechanic sees across a city.
+"""
+import argparse
+import random
+import timeit
+
+from utils.geo import haversine, haversine_many
+
+ORIGIN = (12.9716, 77.5946)
+SPREAD_DEG = 0.5
+
+
+def make_points(n, seed=7):
+    rng = random.Random(seed)
+    lats = [ORIGIN[0] + rng.uniform(-SPREAD_DEG, SPREAD_DEG) for _ in range(n)]
+    lngs = [ORIGIN[1] + rng.uniform(-SPREAD_DEG, SPREAD_DEG) for _ in range(n)]
+    return lats, lngs
+
+
+def scalar(lats, lngs, radius_km):
+    return [
+        haversine(ORIGIN[0], ORIGIN[1], la, lo) <= radius_km
+        for la, lo in zip(lats, lngs)
+    ]
+
+
+def best_ms(fn, repeat):
+    return min(timeit.repeat(fn, number=1, repeat=repeat)) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--radius", type=float, default=12)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'points':>8} {'scalar ms':>10} {'batch ms':>10} {'bbox ms':>10} {'speedup':>8} {'in radius':>10}")
+
+    for n in args.sizes:
+        lats, lngs = make_points(n)
+
+        expected = scalar(lats, lngs, args.radius)
+        _, mask = haversine_many(*ORIGIN, lats, lngs, radius_km=args.radius)
+        assert list(mask) == expected
+
+        t_scalar = best_ms(lambda: scalar(lats, lngs, args.radius), args.repeat)
+        t_batch = best_ms(
+            lambda: haversine_many(*ORIGIN, lats, lngs)[0] <= args.radius, args.repeat
+        )
+        t_bbox = best_ms(
+            lambda: haversine_many(*ORIGIN, lats, lngs, radius_km=args.radius), args.repeat
+        )
+
+        print(
+            f"{n:>8} {t_scalar:>10.2f} {t_batch:>10.2f} {t_bbox:>10.2f} "
+            f"{t_scalar / t_bbox:>7.1f}x {sum(expected):>10}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Firestore reads per /mechanic/requests poll, against the in-memory engine.
+
+Run from backend/:
+    python -m benchmarks.bench_nearby_reads --requests 200 --polls 20
+    REQUEST_BOARD=1 python -m benchmarks.bench_nearby_reads    # live board
+"""
+import argparse
+import os
+import random
+import time
+from datetime import datetime, timezone, timedelta
+
+os.environ["FIXIT_STORAGE"] = "memory"
+os.environ.setdefault("RUN_SCHEDULER", "0")
+
+from firebase import get_db  # noqa: E402  (after FIXIT_STORAGE is set)
+from app import app  # noqa: E402
+from utils.geo import geo_fields  # noqa: E402
+from utils.request_logic import skill_key  # noqa: E402
+from utils.board import request_board  # noqa: E402
+
+db = get_db()
+
+CENTER = (12.9716, 77.5946)
+
+
+def seed(num_requests):
+    now = datetime.now(timezone.utc)
+
+    batch = db.batch()
+
+    batch.set(db.collection("mechanics").document("mech-1"), {
+        "phone": "9000000001",
+        "verified": True,
+        "is_available": True,
+        "location": {"lat": CENTER[0], "lng": CENTER[1]},
+        "skills": {
+            "vehicle_types": ["CAR", "BIKE"],
+            "service_types": ["BATTERY", "PUNCTURE"]
+        }
+    })
+
+    for i in range(num_requests):
+        lat = CENTER[0] + random.uniform(-0.05, 0.05)
+        lng = CENTER[1] + random.uniform(-0.05, 0.05)
+
+        vehicle_type = random.choice(["CAR", "BIKE", "LORRY"])
+        service_type = random.choice(["BATTERY", "PUNCTURE", "ENGINE"])
+
+        batch.set(db.collection("requests").document(f"req-{i}"), {
+            "owner_phone": f"80000{i:05d}",
+            "status": "SEARCHING",
+            "vehicle_type": vehicle_type,
+            "service_type": service_type,
+            "skill_key": skill_key(vehicle_type, service_type),
+            "owner_location": {"lat": lat, "lng": lng},
+            **geo_fields(lat, lng),
+            "search_radius_km": 3,
+            "radius_expanded_count": 0,
+            "timeout_at": now + timedelta(seconds=600)
+        })
+
+        if len(batch) >= 400:
+            batch.commit()
+            batch = db.batch()
+
+    batch.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--polls", type=int, default=20)
+    args = parser.parse_args()
+
+    random.seed(42)
+    seed(args.requests)
+
+    # 📋 REQUEST_BOARD=1: let the listener catch up with the seed
+    deadline = time.monotonic() + 10
+    while request_board.stats()["listening"] and time.monotonic() < deadline:
+        if request_board.stats()["requests"] >= args.requests:
+            break
+        time.sleep(0.05)
+
+    client = app.test_client()
+    db.reset_counters()
+
+    for _ in range(args.polls):
+        res = client.get("/mechanic/requests?phone=9000000001")
+        assert res.status_code == 200, res.get_json()
+
+    print(f"requests seeded : {args.requests}")
+    print(f"polls           : {args.polls}")
+    print(f"reads / poll    : {db.reads / args.polls:.1f}")
+    print(f"queries / poll  : {db.queries / args.polls:.1f}")
+    print(f"writes / poll   : {db.writes / args.polls:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,277 @@
+"""
+Sync (gthread) vs async (gevent) gunicorn workers at equal memory.
+
+For each mode: start gunicorn with the same number of workers, open
+--streams SSE connections (/owner/request/<id>/stream, as
+request-status.js does) and hold them, then measure --pollers clients
+polling GET /owner/request/<id> for --duration seconds. Reports how
+many streams were served, poll throughput / latency, and the resident
+memory of the gunicorn processes.
+
+The in-memory engine lives inside the worker, so it needs --workers 1;
+with FIRESTORE_EMULATOR_HOST set any worker count works.
+
+Run from backend/:
+    python -m benchmarks.bench_serving --streams 200 --pollers 20 --duration 15
+"""
+import argparse
+import http.client
+import json
+import os
+import selectors
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HOST = "127.0.0.1"
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+# -----------------------------
+# SERVER
+# -----------------------------
+def start_server(mode, args, port):
+    env = {
+        **os.environ,
+        "FIXIT_SERVE_MODE": mode,
+        "WEB_CONCURRENCY": str(args.workers),
+        "THREADS": str(args.threads),
+        "WORKER_CONNECTIONS": str(args.connections),
+        "PORT": str(port),
+        "RUN_SCHEDULER": "0",
+    }
+    if not os.environ.get("FIRESTORE_EMULATOR_HOST"):
+        env["FIXIT_STORAGE"] = "memory"
+
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "app:app", "-c", "gunicorn.conf.py"],
+        cwd=BACKEND_DIR, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            call(port, "GET", "/")
+            return proc
+        except OSError:
+            time.sleep(0.2)
+
+    proc.kill()
+    raise RuntimeError(f"gunicorn ({mode}) did not start")
+
+
+def stop_server(proc):
+    proc.send_signal(signal.SIGTERM)
+    try:
+        proc.wait(timeout=15)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+
+
+def rss_mb(pid):
+    """
+    Resident memory of `pid` and its children (gunicorn master + workers).
+    """
+    pids = [pid]
+    for entry in os.listdir("/proc"):
+        if entry.isdigit():
+            try:
+                with open(f"/proc/{entry}/stat") as f:
+                    if int(f.read().rsplit(")", 1)[1].split()[1]) == pid:
+                        pids.append(int(entry))
+            except (OSError, IndexError, ValueError):
+                continue
+
+    total_kb = 0
+    for p in pids:
+        try:
+            with open(f"/proc/{p}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        total_kb += int(line.split()[1])
+        except OSError:
+            continue
+    return round(total_kb / 1024, 1)
+
+
+# -----------------------------
+# CLIENTS
+# -----------------------------
+def call(port, method, path, body=None, timeout=5):
+    conn = http.client.HTTPConnection(HOST, port, timeout=timeout)
+    try:
+        headers = {"Content-Type": "application/json"} if body is not None else {}
+        conn.request(method, path, body=json.dumps(body) if body is not None else None, headers=headers)
+        res = conn.getresponse()
+        return res.status, res.read()
+    finally:
+        conn.close()
+
+
+def seed(port, count, run):
+    request_ids = []
+    for i in range(count):
+        phone = f"5{run}{i:04d}"
+        call(port, "POST", "/owner/register", {
+            "name": "Bench Owner", "phone": phone,
+            "password": "bench", "confirm_password": "bench",
+        })
+        status, body = call(port, "POST", "/owner/request/create", {
+            "owner_phone": phone, "vehicle_type": "CAR", "service_type": "BATTERY",
+            "lat": 12.9716 + i * 0.001, "lng": 77.5946,
+        })
+        if status != 201:
+            raise RuntimeError(f"seeding failed: {status} {body[:200]}")
+        request_ids.append(json.loads(body)["request_id"])
+    return request_ids
+
+
+def open_streams(port, request_ids, count, timeout):
+    """
+    Open `count` SSE connections; return (sockets, streams that got their
+    first status event within `timeout`).
+    """
+    selector = selectors.DefaultSelector()
+    sockets = []
+
+    for i in range(count):
+        sock = socket.create_connection((HOST, port))
+        request_id = request_ids[i % len(request_ids)]
+        sock.sendall(
+            f"GET /owner/request/{request_id}/stream HTTP/1.1\r\n"
+            f"Host: {HOST}\r\nAccept: text/event-stream\r\n\r\n".encode()
+        )
+        sock.setblocking(False)
+        selector.register(sock, selectors.EVENT_READ, data=b"")
+        sockets.append(sock)
+
+    served = 0
+    pending = len(sockets)
+    deadline = time.monotonic() + timeout
+    while pending and time.monotonic() < deadline:
+        for key, _ in selector.select(timeout=0.2):
+            chunk = key.fileobj.recv(65536)
+            buffered = key.data + chunk
+            if b"event: status" in buffered or not chunk:
+                selector.unregister(key.fileobj)
+                pending -= 1
+                served += 1 if chunk else 0
+            else:
+                selector.modify(key.fileobj, selectors.EVENT_READ, data=buffered)
+
+    selector.close()
+    return sockets, served
+
+
+def poll(port, request_ids, duration, pollers):
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    stop = time.monotonic() + duration
+
+    def worker(n):
+        path = f"/owner/request/{request_ids[n % len(request_ids)]}"
+        while time.monotonic() < stop:
+            start = time.perf_counter()
+            try:
+                status, _ = call(port, "GET", path)
+                ok = status == 200
+            except OSError:
+                ok = False
+            elapsed = (time.perf_counter() - start) * 1000
+            with lock:
+                if ok:
+                    latencies.append(elapsed)
+                else:
+                    errors[0] += 1
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(pollers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    return latencies, errors[0]
+
+
+def run_mode(mode, args, port):
+    proc = start_server(mode, args, port)
+    sockets = []
+    try:
+        request_ids = seed(port, args.requests, f"{port % 10000:04d}")
+        idle_rss = rss_mb(proc.pid)
+
+        sockets, served = open_streams(port, request_ids, args.streams, args.stream_timeout)
+        latencies, errors = poll(port, request_ids, args.duration, args.pollers)
+        loaded_rss = rss_mb(proc.pid)
+    finally:
+        for sock in sockets:
+            sock.close()
+        stop_server(proc)
+
+    return {
+        "mode": mode,
+        "streams_requested": args.streams,
+        "streams_served": served,
+        "polls": len(latencies),
+        "poll_errors": errors,
+        "poll_rps": round(len(latencies) / args.duration, 1),
+        "p50_ms": round(statistics.median(latencies), 2) if latencies else None,
+        "p95_ms": round(percentile(latencies, 95), 2) if latencies else None,
+        "p99_ms": round(percentile(latencies, 99), 2) if latencies else None,
+        "rss_idle_mb": idle_rss,
+        "rss_loaded_mb": loaded_rss,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--threads", type=int, default=50, help="gthread threads per worker")
+    parser.add_argument("--connections", type=int, default=1000, help="gevent connections per worker")
+    parser.add_argument("--streams", type=int, default=200)
+    parser.add_argument("--pollers", type=int, default=20)
+    parser.add_argument("--requests", type=int, default=20, help="requests the streams / polls spread over")
+    parser.add_argument("--duration", type=float, default=15.0)
+    parser.add_argument("--stream-timeout", type=float, default=10.0)
+    parser.add_argument("--port", type=int, default=5102)
+    parser.add_argument("--out", help="save results as JSON")
+    args = parser.parse_args()
+
+    if args.workers > 1 and not os.environ.get("FIRESTORE_EMULATOR_HOST"):
+        parser.error("the in-memory engine is per process: use --workers 1 or the emulator")
+
+    results = [
+        run_mode("sync", args, args.port),
+        run_mode("async", args, args.port + 1),
+    ]
+
+    columns = (
+        "mode", "streams_served", "poll_rps", "poll_errors",
+        "p50_ms", "p95_ms", "p99_ms", "rss_idle_mb", "rss_loaded_mb",
+    )
+    print(f"workers={args.workers} threads={args.threads} streams={args.streams} "
+          f"pollers={args.pollers} duration={args.duration}s")
+    print(" ".join(f"{c:>14}" for c in columns))
+    for r in results:
+        print(" ".join(f"{str(r[c]):>14}" for c in columns))
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump({"config": vars(args), "results": results}, f, indent=2)
+        print(f"📄 saved {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,598 @@
+"""
+Load test: simulated owners and mechanics driving the real routes.
+
+Owners behave like request-status.js / owner-bill.js:
+    create → poll status → verify OTP → poll for the bill → confirm → rate
+Mechanics behave like mechanic-dashboard.js / mechanic-active-job.js:
+    go online → poll dashboard → accept → ping location → bill → wait
+Poll and ping intervals are the frontend's, divided by --speed.
+--searching seeds extra SEARCHING requests nobody will accept, as
+standing load on the request queries.
+
+Runs in-process on the in-memory engine (FIXIT_STORAGE=memory), which
+charges each call its own datastore reads / writes. With
+FIRESTORE_EMULATOR_HOST set it runs against the emulator instead
+(per-call datastore counts are then not available).
+
+Reports requests/s, p50/p95/p99 latency and reads/writes per call for
+every endpoint, and saves the report as JSON (--out). --baseline
+prints the change against an earlier report.
+
+Simulated users and the app share one process (and one GIL), so at a
+few hundred users latency includes the harness's own queueing: compare
+runs made with the same options on the same machine.
+
+Run from backend/:
+    python -m benchmarks.load_test --owners 50 --mechanics 500 --searching 2000 --duration 60
+    python -m benchmarks.load_test --baseline benchmarks/results/<earlier>.json
+"""
+import argparse
+import contextlib
+import json
+import os
+import random
+import statistics
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+
+os.environ.setdefault("RUN_SCHEDULER", "0")
+if not os.environ.get("FIRESTORE_EMULATOR_HOST"):
+    os.environ.setdefault("FIXIT_STORAGE", "memory")
+
+from firebase import get_db  # noqa: E402  (after FIXIT_STORAGE is set)
+from app import app  # noqa: E402
+from utils.accounts import MECHANICS, OWNERS, new_account_ref  # noqa: E402
+from utils.geo import geo_fields  # noqa: E402
+from utils.request_logic import skill_key  # noqa: E402
+
+db = get_db()
+
+# ⏱️ Client timings (seconds) from the frontend
+OWNER_POLL = 3.0            # request-status.js polling fallback
+DASHBOARD_POLL = 5.0        # mechanic-dashboard.js
+JOB_POLL = 5.0              # mechanic-active-job.js
+LOCATION_PING = 3.0         # mechanic-active-job.js tracking
+ARRIVAL_PINGS = 4           # location pings before the owner enters the OTP
+ACCEPT_TIMEOUT = 120.0      # owner cancels if nobody accepts (scaled)
+THINK_TIME = 5.0            # owner pause between jobs (scaled)
+
+CENTER = (12.9716, 77.5946)
+SPREAD_DEG = 0.05           # ≈ 5 km around the centre
+
+VEHICLES = ["BIKE", "CAR", "AUTO"]
+SERVICES = ["PUNCTURE", "BATTERY", "ENGINE"]
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+BATCH_LIMIT = 400
+
+
+def random_point(rng):
+    return (
+        CENTER[0] + rng.uniform(-SPREAD_DEG, SPREAD_DEG),
+        CENTER[1] + rng.uniform(-SPREAD_DEG, SPREAD_DEG),
+    )
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+# -----------------------------
+# SEEDING
+# -----------------------------
+def seed(args, rng):
+    batch = db.batch()
+    pending = 0
+
+    def queue(ref, data):
+        nonlocal batch, pending
+        batch.set(ref, data)
+        pending += 1
+        if pending >= BATCH_LIMIT:
+            batch.commit()
+            batch = db.batch()
+            pending = 0
+
+    owners = [f"8{args.run_id}{i:05d}" for i in range(args.owners)]
+    mechanics = [f"9{args.run_id}{i:05d}" for i in range(args.mechanics)]
+
+    for phone in owners:
+        queue(new_account_ref(OWNERS, phone), {
+            "name": "Load Owner",
+            "phone": phone,
+            "password_hash": "",
+            "active_request_id": None,
+        })
+
+    for phone in mechanics:
+        queue(new_account_ref(MECHANICS, phone), {
+            "name": "Load Mechanic",
+            "phone": phone,
+            "password_hash": "",
+            "verified": True,
+            "is_available": False,
+            "skills": {
+                "vehicle_types": rng.sample(VEHICLES, 2),
+                "service_types": rng.sample(SERVICES, 2),
+            },
+            "location": None,
+            "active_request_id": None,
+        })
+
+    now = datetime.now(timezone.utc)
+    for i in range(args.searching):
+        lat, lng = random_point(rng)
+        vehicle_type, service_type = rng.choice(VEHICLES), rng.choice(SERVICES)
+        queue(db.collection("requests").document(f"load-{args.run_id}-{i}"), {
+            "owner_phone": f"7{args.run_id}{i:05d}",
+            "mechanic_phone": None,
+            "vehicle_type": vehicle_type,
+            "service_type": service_type,
+            "skill_key": skill_key(vehicle_type, service_type),
+            "owner_location": {"lat": lat, "lng": lng},
+            "mechanic_location": None,
+            **geo_fields(lat, lng),
+            "search_radius_km": 3,
+            "radius_expanded_count": 0,
+            "timeout_at": now + timedelta(days=1),
+            "status": "SEARCHING",
+            "offered_to": [],
+            "created_at": now,
+        })
+
+    if pending:
+        batch.commit()
+
+    return owners, mechanics
+
+
+# -----------------------------
+# MEASUREMENT
+# -----------------------------
+class Recorder:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = defaultdict(list)     # endpoint → [(ms, status, reads, writes)]
+        self.jobs = defaultdict(int)
+        self.accept_seconds = []
+
+    def record(self, endpoint, ms, status, usage):
+        with self._lock:
+            self._calls[endpoint].append((
+                ms, status,
+                usage["reads"] if usage else None,
+                usage["writes"] if usage else None,
+            ))
+
+    def job(self, event, accept_seconds=None):
+        with self._lock:
+            self.jobs[event] += 1
+            if accept_seconds is not None:
+                self.accept_seconds.append(accept_seconds)
+
+    def endpoints(self, duration):
+        report = {}
+        with self._lock:
+            calls = {name: list(samples) for name, samples in self._calls.items()}
+
+        for name, samples in sorted(calls.items()):
+            latencies = [s[0] for s in samples]
+            statuses = defaultdict(int)
+            for s in samples:
+                statuses[str(s[1])] += 1
+
+            reads = [s[2] for s in samples if s[2] is not None]
+            writes = [s[3] for s in samples if s[3] is not None]
+
+            report[name] = {
+                "count": len(samples),
+                "rps": round(len(samples) / duration, 2),
+                "errors": sum(1 for s in samples if s[1] >= 500),
+                "statuses": dict(statuses),
+                "p50_ms": round(percentile(latencies, 50), 3),
+                "p95_ms": round(percentile(latencies, 95), 3),
+                "p99_ms": round(percentile(latencies, 99), 3),
+                "max_ms": round(max(latencies), 3),
+                "reads_per_op": round(statistics.mean(reads), 2) if reads else None,
+                "writes_per_op": round(statistics.mean(writes), 2) if writes else None,
+                "reads_total": sum(reads),
+                "writes_total": sum(writes),
+            }
+        return report
+
+
+class Client:
+    """
+    One simulated browser: its own test client and ETag cache.
+    """
+
+    def __init__(self, recorder):
+        self.http = app.test_client()
+        self.recorder = recorder
+        self.etags = {}
+
+    def call(self, endpoint, method, url, body=None, conditional=False):
+        headers = {}
+        if conditional and url in self.etags:
+            headers["If-None-Match"] = self.etags[url]
+
+        usage = getattr(db, "usage", None)
+        before = usage() if usage else None
+        start = time.perf_counter()
+
+        try:
+            res = self.http.open(url, method=method, json=body, headers=headers)
+            status = res.status_code
+        except Exception as e:
+            print(f"❌ {endpoint}: {e}")
+            res, status = None, 599
+
+        elapsed_ms = (time.perf_counter() - start) * 1000
+
+        delta = None
+        if usage:
+            after = usage()
+            delta = {k: after[k] - before[k] for k in after}
+        self.recorder.record(endpoint, elapsed_ms, status, delta)
+
+        if res is None or status == 304:
+            return status, None
+
+        if conditional and res.headers.get("ETag"):
+            self.etags[url] = res.headers["ETag"]
+
+        return status, res.get_json(silent=True)
+
+
+# -----------------------------
+# SIMULATED USERS
+# -----------------------------
+class Simulation:
+    def __init__(self, args, recorder):
+        self.args = args
+        self.recorder = recorder
+        self.stop = threading.Event()
+        self.otps = {}                      # request_id → OTP the mechanic shows the owner
+        self._otp_lock = threading.Lock()
+
+    def pause(self, seconds):
+        return self.stop.wait(seconds / self.args.speed)
+
+    def share_otp(self, request_id, otp):
+        with self._otp_lock:
+            self.otps[request_id] = otp
+
+    def take_otp(self, request_id):
+        with self._otp_lock:
+            return self.otps.pop(request_id, None)
+
+    # --- owner ---
+    def owner(self, phone, seed):
+        rng = random.Random(seed)
+        client = Client(self.recorder)
+        self.pause(rng.uniform(0, OWNER_POLL))
+
+        while not self.stop.is_set():
+            lat, lng = random_point(rng)
+            status, data = client.call(
+                "POST /owner/request/create", "POST", "/owner/request/create", {
+                    "owner_phone": phone,
+                    "vehicle_type": rng.choice(VEHICLES),
+                    "service_type": rng.choice(SERVICES),
+                    "description": "load test",
+                    "lat": lat,
+                    "lng": lng,
+                }
+            )
+            if status != 201:
+                self.pause(OWNER_POLL)
+                continue
+
+            self.recorder.job("created")
+            self.owner_job(client, phone, data["request_id"], rng)
+            self.pause(THINK_TIME)
+
+    def owner_job(self, client, phone, request_id, rng):
+        status_url = f"/owner/request/{request_id}?phone={phone}"
+        created = time.monotonic()
+        accepted = False
+        polls_since_accept = 0
+
+        while not self.stop.is_set():
+            status, data = client.call(
+                "GET /owner/request/<id>", "GET", status_url, conditional=True
+            )
+            data = data or {}
+            state = data.get("status")
+
+            if state in ("CANCELLED", "TIMEOUT"):
+                return
+
+            if state == "SEARCHING" and time.monotonic() - created > ACCEPT_TIMEOUT / self.args.speed:
+                client.call(
+                    "POST /owner/request/cancel/<id>", "POST",
+                    f"/owner/request/cancel/{request_id}", {"phone": phone}
+                )
+                self.recorder.job("cancelled")
+                return
+
+            if state == "ACCEPTED" and not accepted:
+                accepted = True
+                self.recorder.job("accepted", time.monotonic() - created)
+
+            if accepted and state == "ACCEPTED":
+                polls_since_accept += 1
+                arrived = polls_since_accept >= ARRIVAL_PINGS * LOCATION_PING / OWNER_POLL
+                otp = self.take_otp(request_id) if arrived else None
+                if otp:
+                    client.call(
+                        "POST /owner/verify-otp/<id>", "POST",
+                        f"/owner/verify-otp/{request_id}", {"otp": otp}
+                    )
+
+            if data.get("bill_status") == "AWAITING_BILL_CONFIRMATION":
+                break
+
+            self.pause(OWNER_POLL)
+
+        if self.stop.is_set():
+            return
+
+        client.call("GET /owner/bill/<id>", "GET", f"/owner/bill/{request_id}", conditional=True)
+        status, _ = client.call(
+            "POST /owner/bill/confirm", "POST", "/owner/bill/confirm", {"request_id": request_id}
+        )
+        if status != 200:
+            return
+
+        self.recorder.job("confirmed")
+        client.call(
+            "POST /owner/request/feedback/<id>", "POST",
+            f"/owner/request/feedback/{request_id}",
+            {"rating": rng.randint(3, 5), "feedback": "load test"}
+        )
+
+    # --- mechanic ---
+    def mechanic(self, phone, seed):
+        rng = random.Random(seed)
+        client = Client(self.recorder)
+        self.pause(rng.uniform(0, DASHBOARD_POLL))
+
+        while not self.stop.is_set():
+            lat, lng = random_point(rng)
+            status, _ = client.call(
+                "POST /mechanic/availability", "POST", "/mechanic/availability",
+                {"phone": phone, "is_available": True, "lat": lat, "lng": lng}
+            )
+            if status != 200:
+                self.pause(DASHBOARD_POLL)
+                continue
+
+            request_id = self.find_job(client, phone)
+            if request_id:
+                self.mechanic_job(client, phone, request_id, (lat, lng))
+
+    def find_job(self, client, phone):
+        url = f"/mechanic/dashboard?phone={phone}"
+
+        while not self.stop.is_set():
+            status, data = client.call("GET /mechanic/dashboard", "GET", url, conditional=True)
+
+            if data and data.get("active_request_id"):
+                return data["active_request_id"]
+
+            for offer in (data or {}).get("requests") or []:
+                # Standing requests have no simulated owner to finish the job
+                if offer["request_id"].startswith(f"load-{self.args.run_id}-"):
+                    continue
+                status, accepted = client.call(
+                    "POST /mechanic/accept/<id>", "POST",
+                    f"/mechanic/accept/{offer['request_id']}", {"phone": phone}
+                )
+                if status == 200:
+                    self.share_otp(offer["request_id"], accepted["otp"])
+                    return offer["request_id"]
+
+            self.pause(DASHBOARD_POLL)
+        return None
+
+    def mechanic_job(self, client, phone, request_id, position):
+        job_url = f"/mechanic/request/{request_id}?phone={phone}"
+        lat, lng = position
+        since_poll = JOB_POLL
+
+        # 🚗 Drive (location pings) until the owner has verified the OTP
+        while not self.stop.is_set():
+            lat += 0.0005
+            lng += 0.0005
+            client.call(
+                "POST /mechanic/update-location", "POST", "/mechanic/update-location",
+                {"request_id": request_id, "phone": phone, "lat": lat, "lng": lng}
+            )
+
+            if since_poll >= JOB_POLL:
+                since_poll = 0
+                status, data = client.call(
+                    "GET /mechanic/request/<id>", "GET", job_url, conditional=True
+                )
+                state = (data or {}).get("status")
+                if state == "IN_PROGRESS":
+                    break
+                if state in ("CANCELLED", "TIMEOUT", "COMPLETED"):
+                    return
+
+            self.pause(LOCATION_PING)
+            since_poll += LOCATION_PING
+
+        if self.stop.is_set():
+            return
+
+        client.call("POST /mechanic/bill/create", "POST", "/mechanic/bill/create", {
+            "request_id": request_id,
+            "items": [{"name": "Tube", "quantity": 1, "price": 250}],
+            "services": [{"name": "Labour", "price": 150}],
+        })
+
+        status_url = f"/mechanic/bill/status/{request_id}"
+        while not self.pause(JOB_POLL):
+            status, data = client.call(
+                "GET /mechanic/bill/status/<id>", "GET", status_url, conditional=True
+            )
+            if status == 404 or (data or {}).get("bill_status") == "CONFIRMED":
+                return
+
+
+# -----------------------------
+# REPORTING
+# -----------------------------
+def build_report(args, recorder, duration, started_at, totals_before):
+    endpoints = recorder.endpoints(duration)
+    count = sum(e["count"] for e in endpoints.values())
+
+    report = {
+        "config": {
+            k: v for k, v in vars(args).items() if k not in ("out", "baseline", "verbose")
+        },
+        "storage": "emulator" if os.environ.get("FIRESTORE_EMULATOR_HOST") else "memory",
+        "started_at": started_at.isoformat(),
+        "duration_s": round(duration, 2),
+        "totals": {
+            "requests": count,
+            "rps": round(count / duration, 2),
+            "errors": sum(e["errors"] for e in endpoints.values()),
+            "not_modified": sum(e["statuses"].get("304", 0) for e in endpoints.values()),
+        },
+        "jobs": {
+            **dict(recorder.jobs),
+            "accept_p50_s": round(percentile(recorder.accept_seconds, 50), 3)
+            if recorder.accept_seconds else None,
+        },
+        "endpoints": endpoints,
+    }
+
+    if hasattr(db, "usage"):
+        after = db.stats()
+
+        report["datastore"] = {
+            kind: after[kind] - totals_before[kind]
+            for kind in ("reads", "writes", "queries", "commits")
+        }
+        # Listener / flush threads, not charged to any request. From the
+        # exact per-call totals: the rounded per-op means don't add up.
+        for kind in ("reads", "writes"):
+            attributed = sum(e[f"{kind}_total"] for e in endpoints.values())
+            report["datastore"][f"background_{kind}"] = (
+                report["datastore"][kind] - attributed
+            )
+
+    return report
+
+
+def _change(now, before):
+    if now is None or before in (None, 0):
+        return "   n/a"
+    return f"{(now - before) / before * 100:+6.1f}%"
+
+
+def print_report(report, baseline=None):
+    totals = report["totals"]
+    print(f"storage        : {report['storage']}")
+    print(f"duration (s)   : {report['duration_s']}")
+    print(f"requests       : {totals['requests']}  ({totals['rps']} req/s, "
+          f"{totals['not_modified']} × 304, {totals['errors']} errors)")
+    print(f"jobs           : {report['jobs']}")
+    if "datastore" in report:
+        print(f"datastore      : {report['datastore']}")
+
+    print()
+    header = f"{'endpoint':36} {'count':>7} {'rps':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'reads':>6} {'writes':>6}"
+    if baseline:
+        header += f" {'Δp95':>8} {'Δreads':>8}"
+    print(header)
+
+    for name, e in report["endpoints"].items():
+        line = (
+            f"{name:36} {e['count']:>7} {e['rps']:>8} {e['p50_ms']:>8.2f} "
+            f"{e['p95_ms']:>8.2f} {e['p99_ms']:>8.2f} "
+            f"{e['reads_per_op'] if e['reads_per_op'] is not None else '-':>6} "
+            f"{e['writes_per_op'] if e['writes_per_op'] is not None else '-':>6}"
+        )
+        if baseline:
+            old = baseline.get("endpoints", {}).get(name, {})
+            line += f" {_change(e['p95_ms'], old.get('p95_ms')):>8} "
+            line += f"{_change(e['reads_per_op'], old.get('reads_per_op')):>8}"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--owners", type=int, default=50)
+    parser.add_argument("--mechanics", type=int, default=200)
+    parser.add_argument("--searching", type=int, default=500,
+                        help="extra SEARCHING requests seeded as standing load")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds of load")
+    parser.add_argument("--speed", type=float, default=10.0,
+                        help="divide frontend poll intervals by this")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", help="report path (default benchmarks/results/load-<time>.json)")
+    parser.add_argument("--baseline", help="earlier report to compare against")
+    parser.add_argument("--verbose", action="store_true", help="keep route logging")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    args.run_id = f"{rng.randrange(10 ** 4):04d}"
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    owners, mechanics = seed(args, rng)
+    recorder = Recorder()
+    sim = Simulation(args, recorder)
+
+    threads = [
+        threading.Thread(target=sim.mechanic, args=(phone, rng.random()), daemon=True)
+        for phone in mechanics
+    ] + [
+        threading.Thread(target=sim.owner, args=(phone, rng.random()), daemon=True)
+        for phone in owners
+    ]
+
+    print(f"🚦 {len(owners)} owners, {len(mechanics)} mechanics, "
+          f"{args.searching} standing requests, {args.duration}s at {args.speed}x")
+
+    totals_before = db.stats() if hasattr(db, "usage") else None
+    started_at = datetime.now(timezone.utc)
+    start = time.perf_counter()
+
+    # Routes log every call; keep the console for the report
+    quiet = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(open(os.devnull, "w"))
+    with quiet:
+        for t in threads:
+            t.start()
+        sim.stop.wait(args.duration)
+        sim.stop.set()
+        for t in threads:
+            t.join(timeout=10)
+
+    duration = time.perf_counter() - start
+    report = build_report(args, recorder, duration, started_at, totals_before)
+
+    out = args.out or os.path.join(
+        RESULTS_DIR, f"load-{started_at.strftime('%Y%m%d-%H%M%S')}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+
+    print_report(report, baseline)
+    print(f"\n📄 saved {out}")
+
+
+if __name__ == "__main__":
+    main()
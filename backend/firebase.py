@@ -1,15 +1,170 @@
+import itertools
 import os
 import json
+import threading
+import time
 from google.cloud import firestore
 from google.oauth2 import service_account
 
+_memory_db = None
+_db = None
+
+READY_TTL_SECONDS = float(os.environ.get("READY_TTL_SECONDS", 10))
+READY_TIMEOUT_SECONDS = float(os.environ.get("READY_TIMEOUT_SECONDS", 3))
+
+
 def get_db():
+    """
+    The process-wide Firestore handle. Modules call this at import time,
+    so it only builds a cheap SharedClient: credentials are parsed and
+    channels opened on first use, once per process.
+    """
+    global _db
+    if _db is None:
+        client = SharedClient(_connect, size=_pool_size())
+
+        # 📈 Per-endpoint reads / writes / latency (/metrics); FIXIT_DB_METRICS=0 opts out
+        if os.environ.get("FIXIT_DB_METRICS", "1") == "1":
+            from utils.instrumentation import instrument
+            client = instrument(client)
+
+        _db = client
+    return _db
+
+
+def _pool_size():
+    # 🔌 FIRESTORE_CHANNELS clients (one gRPC channel each) per process
+    if os.environ.get("FIXIT_STORAGE") == "memory":
+        return 1
+    return max(1, int(os.environ.get("FIRESTORE_CHANNELS", 1)))
+
+
+# -----------------------------
+# SHARED CLIENT
+# -----------------------------
+class SharedClient:
+    """
+    Lazily connected pool of `size` clients, handed out round-robin per
+    call (collection / document / batch / transaction / get_all).
+
+    Fork-safe for `gunicorn --preload`: a child never reuses the parent's
+    channels, it reconnects on its first call.
+    """
+
+    def __init__(self, factory, size=1):
+        self._factory = factory
+        self._size = size
+        self._lock = threading.Lock()
+        self._clients = None
+        self._pid = None
+        self._next = itertools.count()
+
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def __getattr__(self, name):
+        return getattr(self._client(), name)
+
+    def _client(self):
+        clients = self._clients
+        if clients is None or self._pid != os.getpid():
+            clients = self._connect()
+        if len(clients) == 1:
+            return clients[0]
+        return clients[next(self._next) % len(clients)]
+
+    def _connect(self):
+        with self._lock:
+            if self._clients is None or self._pid != os.getpid():
+                started = time.perf_counter()
+                credentials = _credentials()
+                self._clients = [self._factory(credentials) for _ in range(self._size)]
+                self._pid = os.getpid()
+                print(f"🔌 Firestore connected ({self._size} channel(s), "
+                      f"{(time.perf_counter() - started) * 1000:.0f} ms, pid {self._pid})")
+            return self._clients
+
+    def _after_fork(self):
+        # Locks held by other threads at fork time are never released in the child
+        self._lock = threading.Lock()
+        self._clients = None
+        self._pid = None
+
+    @property
+    def connected(self):
+        return self._clients is not None and self._pid == os.getpid()
+
+
+def _credentials():
+    if os.environ.get("FIXIT_STORAGE") == "memory" or os.environ.get("FIRESTORE_EMULATOR_HOST"):
+        return None
+
     firebase_json = os.environ.get("FIREBASE_SERVICE_ACCOUNT")
 
     if not firebase_json:
         raise RuntimeError("FIREBASE_SERVICE_ACCOUNT env variable not set")
 
     creds_dict = json.loads(firebase_json)
-    credentials = service_account.Credentials.from_service_account_info(creds_dict)
+    return service_account.Credentials.from_service_account_info(creds_dict)
+
+
+def _connect(credentials):
+    _enable_gevent_grpc()
+
+    # 🧠 In-memory engine (offline load tests / benchmarks): one shared store per process
+    if os.environ.get("FIXIT_STORAGE") == "memory":
+        global _memory_db
+        if _memory_db is None:
+            from utils.memory_store import MemoryClient
+            _memory_db = MemoryClient()
+        return _memory_db
+
+    # 🧪 Local Firestore emulator (benchmarks / local dev): no credentials needed
+    if os.environ.get("FIRESTORE_EMULATOR_HOST"):
+        return firestore.Client(project=os.environ.get("FIRESTORE_PROJECT_ID", "fixit-local"))
+
+    return firestore.Client(credentials=credentials, project=credentials.project_id)
+
+
+def _enable_gevent_grpc():
+    # 🌿 Async serving mode (gevent workers): gRPC must yield to the hub
+    # instead of blocking it. No-op unless gevent has patched sockets.
+    try:
+        from gevent import monkey
+    except ImportError:
+        return
+
+    if monkey.is_module_patched("socket"):
+        import grpc.experimental.gevent as grpc_gevent
+        grpc_gevent.init_gevent()
+
+
+# -----------------------------
+# READINESS
+# -----------------------------
+_ready = {"checked_at": 0.0, "error": None}
+_ready_lock = threading.Lock()
+
+
+def readiness():
+    """
+    (ready, details) for /ready: one Firestore round trip, cached for
+    READY_TTL_SECONDS so load-balancer probes don't turn into reads.
+    """
+    with _ready_lock:
+        age = time.monotonic() - _ready["checked_at"]
+        if age < READY_TTL_SECONDS and _ready["error"] is None:
+            return True, {"checked_seconds_ago": round(age, 1)}
+
+        started = time.perf_counter()
+        try:
+            get_db().collection("_health").document("ready").get(timeout=READY_TIMEOUT_SECONDS)
+            _ready["checked_at"] = time.monotonic()
+            _ready["error"] = None
+        except Exception as e:
+            _ready["error"] = str(e)
 
-    return firestore.Client(credentials=credentials, project=creds_dict["project_id"])
\ No newline at end of file
+        details = {"datastore_ms": round((time.perf_counter() - started) * 1000, 1)}
+        if _ready["error"] is not None:
+            details["error"] = _ready["error"]
+        return _ready["error"] is None, details
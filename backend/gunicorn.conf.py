@@ -0,0 +1,45 @@
+"""
+gunicorn settings (loaded automatically from backend/):
+    gunicorn app:app
+
+FIXIT_SERVE_MODE picks how a worker serves concurrent connections:
+    sync  (default)  gthread: one OS thread per in-flight request or open
+                     SSE stream, capped at THREADS per worker
+    async            gevent: one greenlet per connection, so open streams
+                     and requests waiting on Firestore cost kilobytes, not
+                     a thread (Firestore's gRPC runs on gevent too, see
+                     firebase.py)
+
+WEB_CONCURRENCY sets the worker processes (memory scales with it, not
+with THREADS / WORKER_CONNECTIONS).
+
+PRELOAD=1 (sync mode) imports the app once in the master and forks ready workers
+(faster cold starts, shared import memory). Nothing connects to
+Firestore at import, and background threads start per worker in
+post_fork, so workers never inherit channels or threads.
+"""
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 5002)}"
+workers = int(os.environ.get("WEB_CONCURRENCY", 2))
+timeout = 120
+
+if os.environ.get("FIXIT_SERVE_MODE", "sync") == "async":
+    worker_class = "gevent"
+    worker_connections = int(os.environ.get("WORKER_CONNECTIONS", 1000))
+else:
+    worker_class = "gthread"
+    threads = int(os.environ.get("THREADS", 50))
+
+# gevent patches sockets / threading in the worker, after fork: importing
+# the app before that would leave it on the unpatched modules
+preload_app = os.environ.get("PRELOAD", "0") == "1" and worker_class != "gevent"
+
+if preload_app:
+    os.environ["FIXIT_PRELOADED"] = "1"
+
+
+def post_fork(server, worker):
+    if preload_app:
+        from app import start_background_services
+        start_background_services()
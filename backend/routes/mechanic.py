@@ -4,13 +4,30 @@ from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime
 import random
 from google.cloud import firestore
-from utils.request_logic import maybe_expand_radius
-from math import radians, cos, sin, asin, sqrt
+from utils.request_logic import MAX_SEARCH_RADIUS_KM, skill_keys
+from utils.geo import haversine_many, cells_covering, chunked, chunked_pairs
+from utils.live import stream_request
+from utils.dispatch import mechanic_index
+from utils.board import request_board
+from utils.history import page_args, page_query, stream_page
+from utils.stats import get_mechanic_stats
+from utils.conditional import conditional_json, not_modified, version_etag
+from utils.tracking import active_assignments, location_buffer, TRACKABLE_STATUSES
+from utils.transactions import run_transaction, TransactionRejected, TransactionContention
+from utils import metrics
+from utils.accounts import (
+    MECHANICS, get_mechanic_doc, get_mechanic_ref, get_owner_ref, new_account_ref,
+    get_mechanic_profile, get_owner_profile, invalidate_mechanic, invalidate_owner
+)
+from google.api_core.exceptions import AlreadyExists
 
 
 mechanic_bp = Blueprint("mechanic", __name__)
 db = get_db()
 
+MAX_STATS_DAYS = 90
+MAX_NEARBY_QUERIES = 8        # skill_key × geocell queries per poll before falling back
+
 # -----------------------------
 # MECHANIC REGISTRATION
 # -----------------------------
@@ -60,13 +77,11 @@ def mechanic_register():
             "error": f"Invalid service types: {invalid_services}. Must be one of: {', '.join(valid_services)}"
         }), 400
 
-    mechanics_ref = db.collection("mechanics")
-    existing = mechanics_ref.where("phone", "==", phone).limit(1).get()
-
-    if existing:
+    if get_mechanic_doc(phone):
         return jsonify({"error": "Mechanic already exists"}), 409
 
-    mechanics_ref.add({
+    # 📇 Phone-keyed document → direct lookups later
+    mechanic_data = {
         "name": name,
         "phone": phone,
         "password_hash": generate_password_hash(password),
@@ -83,7 +98,12 @@ def mechanic_register():
         "location": None,
         "active_request_id": None,
         "created_at": datetime.utcnow()
-    })
+    }
+
+    try:
+        new_account_ref(MECHANICS, phone).create(mechanic_data)
+    except AlreadyExists:
+        return jsonify({"error": "Mechanic already exists"}), 409
 
     return jsonify({
         "message": "Mechanic registered. Awaiting admin verification."
@@ -104,13 +124,11 @@ def mechanic_login():
     if not phone or not password:
         return jsonify({"error": "Phone and password required"}), 400
 
-    mechanics_ref = db.collection("mechanics")
-    docs = mechanics_ref.where("phone", "==", phone).limit(1).get()
+    mechanic_doc = get_mechanic_doc(phone)
 
-    if not docs:
+    if not mechanic_doc:
         return jsonify({"error": "Mechanic not found"}), 404
 
-    mechanic_doc = docs[0]
     mechanic = mechanic_doc.to_dict()
 
     if not check_password_hash(mechanic["password_hash"], password):
@@ -141,15 +159,11 @@ def toggle_availability():
     if phone is None or is_available is None:
         return jsonify({"error": "Phone and availability required"}), 400
 
-    mechanics_ref = db.collection("mechanics")
-    docs = mechanics_ref.where("phone", "==", phone).limit(1).get()
+    mechanic = get_mechanic_profile(phone)
 
-    if not docs:
+    if not mechanic:
         return jsonify({"error": "Mechanic not found"}), 404
 
-    mechanic_doc = docs[0]
-    mechanic = mechanic_doc.to_dict()
-
     if not mechanic.get("verified"):
         return jsonify({"error": "Mechanic not verified"}), 403
 
@@ -170,23 +184,17 @@ def toggle_availability():
             "updated_at": firestore.SERVER_TIMESTAMP
         }
 
-    mechanic_doc.reference.update(update_data)
+    get_mechanic_ref(phone).update(update_data)
+    invalidate_mechanic(phone)
+
+    # 🧭 Online mechanics join the dispatch index, offline ones leave it
+    mechanic_index.upsert({**mechanic, **update_data})
 
     return jsonify({
         "message": "Availability updated",
         "is_available": is_available
     }), 200
 
-# Utility: distance between two lat/lng points (km)
-def haversine(lat1, lon1, lat2, lon2):
-    lon1, lat1, lon2, lat2 = map(radians, [lon1, lat1, lon2, lat2])
-    dlon = lon2 - lon1
-    dlat = lat2 - lat1
-    a = sin(dlat/2)**2 + cos(lat1) * cos(lat2) * sin(dlon/2)**2
-    c = 2 * asin(sqrt(a))
-    return 6371 * c  # km
-
-
 # -----------------------------
 # FETCH NEARBY REQUESTS
 # -----------------------------
@@ -197,19 +205,12 @@ def fetch_nearby_requests():
     if not phone:
         return jsonify({"error": "Phone required"}), 400
 
-    # Fetch mechanic
-    mech_docs = (
-        db.collection("mechanics")
-        .where("phone", "==", phone)
-        .limit(1)
-        .get()
-    )
+    # Fetch mechanic (cached profile)
+    mechanic = get_mechanic_profile(phone)
 
-    if not mech_docs:
+    if not mechanic:
         return jsonify({"error": "Mechanic not found"}), 404
 
-    mechanic = mech_docs[0].to_dict()
-
     # Eligibility checks
     if not mechanic.get("verified") or not mechanic.get("is_available"):
         return jsonify({"error": "Mechanic not eligible"}), 403
@@ -219,6 +220,19 @@ def fetch_nearby_requests():
         return jsonify({"error": "Mechanic location not set"}), 400
 
     # ✅ READ & NORMALIZE SKILLS (CORE FIX)
+    vehicle_types, service_types = _skill_lists(mechanic)
+
+    if not vehicle_types or not service_types:
+        return jsonify({
+            "error": "Mechanic skills not configured"
+        }), 400
+
+    return jsonify({
+        "requests": _nearby_for(mech_loc, vehicle_types, service_types)
+    }), 200
+
+
+def _skill_lists(mechanic):
     skills = mechanic.get("skills", {})
 
     vehicle_types = [
@@ -229,64 +243,204 @@ def fetch_nearby_requests():
         s.upper() for s in skills.get("service_types", [])
     ]
 
-    if not vehicle_types or not service_types:
-        return jsonify({
-            "error": "Mechanic skills not configured"
-        }), 400
+    return vehicle_types, service_types
+
 
+def _nearby_for(mech_loc, vehicle_types, service_types):
+    """
+    SEARCHING requests this mechanic can serve whose search radius
+    reaches mech_loc.
+    """
     results = []
+    if not vehicle_types or not service_types:
+        return results
 
-    # Fetch all SEARCHING requests
-    req_docs = (
-        db.collection("requests")
-        .where("status", "==", "SEARCHING")
-        .get()
+    # 🗺️ Only the geocells the largest search radius can reach
+    cells = cells_covering(
+        mech_loc["lat"], mech_loc["lng"], MAX_SEARCH_RADIUS_KM
     )
 
-    for doc in req_docs:
-        req = doc.to_dict()
-
-        # 🔁 Auto-timeout + radius expansion
-        maybe_expand_radius(doc.reference, req)
+    # 🧰 ...and only the skills this mechanic has
+    keys = skill_keys(vehicle_types, service_types)
 
-        # Re-fetch updated request
-        req = doc.reference.get().to_dict()
-        if req.get("status") != "SEARCHING":
-            continue
+    # 📋 Live board (REQUEST_BOARD=1): a memory lookup, no reads.
+    # None while it can't be trusted → query Firestore directly.
+    board = request_board.lookup(cells, keys)
+    if board is not None:
+        candidates = [(entry["request_id"], entry) for entry in board]
+    else:
+        candidates = _query_nearby(cells, keys)
 
+    matches = []
+    for request_id, req in candidates:
+        # ⏰ Radius expansion / timeout are driven by utils.scheduler
         owner_loc = req.get("owner_location")
         if not owner_loc:
             continue
 
-        # ✅ NORMALIZE REQUEST VALUES
-        req_vehicle = req.get("vehicle_type", "").upper()
-        req_service = req.get("service_type", "").upper()
-
-        # ✅ SKILL MATCH (CASE SAFE)
-        if req_vehicle not in vehicle_types:
-            continue
-
-        if req_service not in service_types:
-            continue
+        matches.append((request_id, req))
 
-        # Distance check
-        distance = haversine(
-            mech_loc["lat"], mech_loc["lng"],
-            owner_loc["lat"], owner_loc["lng"]
-        )
+    # 📏 Distance check for all matches in one vectorised call
+    distances, in_radius = haversine_many(
+        mech_loc["lat"], mech_loc["lng"],
+        [req["owner_location"]["lat"] for _, req in matches],
+        [req["owner_location"]["lng"] for _, req in matches],
+        radius_km=[req.get("search_radius_km", 3) for _, req in matches]
+    )
 
-        if distance <= req.get("search_radius_km", 3):
+    for (request_id, req), distance, ok in zip(matches, distances, in_radius):
+        if ok:
             results.append({
-                "request_id": doc.id,
+                "request_id": request_id,
                 "vehicle_type": req.get("vehicle_type"),
                 "service_type": req.get("service_type"),
-                "distance_km": round(distance, 2),
+                "distance_km": round(float(distance), 2),
                 "issue_description": req.get("description", "")
             })
 
-    return jsonify({"requests": results}), 200
+    return results
+
+
+def _query_nearby(cells, keys):
+    """
+    (request_id, req) for SEARCHING requests in `cells` with a skill_key
+    in `keys`. Skill matching normally happens in the index (status,
+    skill_key, geocell), so nothing unservable is read.
+
+    Both filters are "in" lists and their product must stay within the
+    disjunction limit, so many skills × many cells means many queries,
+    each billed at least one read even when empty. Past
+    MAX_NEARBY_QUERIES the query filters by geocell only (status,
+    geocell index, a couple of queries) and skills are matched here
+    instead: that reads unservable requests in the area, which beats a
+    dozen or more mostly-empty queries on every poll.
+    """
+    pairs = chunked_pairs(cells, keys)
+    wanted = None
 
+    if len(pairs) > MAX_NEARBY_QUERIES:
+        metrics.incr("nearby_geocell_only")
+        pairs = [(cell_chunk, None) for cell_chunk in chunked(cells)]
+        wanted = set(keys)
 
+    found = []
+    for cell_chunk, key_chunk in pairs:
+        query = db.collection("requests").where("status", "==", "SEARCHING")
+        if key_chunk is not None:
+            query = query.where("skill_key", "in", key_chunk)
+
+        for doc in query.where("geocell", "in", cell_chunk).get():
+            req = doc.to_dict()
+            if wanted is None or req.get("skill_key") in wanted:
+                found.append((doc.id, req))
+    return found
+
+
+# -----------------------------
+# FETCH DISPATCHED OFFERS
+# -----------------------------
+@mechanic_bp.route("/offers", methods=["GET"])
+def fetch_offers():
+    """
+    Requests the dispatcher offered to this mechanic (utils.dispatch):
+    one array_contains query instead of scanning every nearby cell.
+    """
+    phone = request.args.get("phone")
+    if not phone:
+        return jsonify({"error": "Phone required"}), 400
+
+    mechanic = get_mechanic_profile(phone)
+
+    if not mechanic:
+        return jsonify({"error": "Mechanic not found"}), 404
+
+    if not mechanic.get("verified") or not mechanic.get("is_available"):
+        return jsonify({"error": "Mechanic not eligible"}), 403
+
+    return jsonify({"requests": _offers_for(phone)}), 200
+
+
+def _offers_for(phone):
+    req_docs = (
+        db.collection("requests")
+        .where("offered_to", "array_contains", phone)
+        .where("status", "==", "SEARCHING")
+        .get()
+    )
+
+    results = []
+    for doc in req_docs:
+        req = doc.to_dict()
+
+        candidate = next(
+            (c for c in req.get("dispatch_candidates", []) if c.get("phone") == phone),
+            {}
+        )
+
+        results.append({
+            "request_id": doc.id,
+            "vehicle_type": req.get("vehicle_type"),
+            "service_type": req.get("service_type"),
+            "distance_km": candidate.get("distance_km"),
+            "issue_description": req.get("description", "")
+        })
+
+    results.sort(key=lambda r: r["distance_km"] if r["distance_km"] is not None else float("inf"))
+
+    return results
+
+
+# -----------------------------
+# DASHBOARD SNAPSHOT (ONE POLL)
+# -----------------------------
+@mechanic_bp.route("/dashboard", methods=["GET"])
+def mechanic_dashboard():
+    """
+    Profile, availability, active job and nearby requests (the same
+    set as GET /requests) in one response. Unchanged polls get a 304
+    (ETag / If-None-Match).
+    """
+    phone = request.args.get("phone")
+    if not phone:
+        return jsonify({"error": "Phone required"}), 400
+
+    mechanic = get_mechanic_profile(phone)
+
+    if not mechanic:
+        return jsonify({"error": "Mechanic not found"}), 404
+
+    active_request_id = mechanic.get("active_request_id")
+    active_job = None
+    nearby = []
+
+    if active_request_id:
+        req_doc = db.collection("requests").document(active_request_id).get()
+        req = req_doc.to_dict() if req_doc.exists else {}
+        active_job = {
+            "request_id": active_request_id,
+            "status": req.get("status"),
+            "vehicle_type": req.get("vehicle_type"),
+            "service_type": req.get("service_type")
+        }
+    elif (
+        mechanic.get("verified")
+        and mechanic.get("is_available")
+        and mechanic.get("location")
+    ):
+        nearby = _nearby_for(mechanic["location"], *_skill_lists(mechanic))
+
+    return conditional_json({
+        "profile": {
+            "phone": mechanic.get("phone"),
+            "name": mechanic.get("name"),
+            "verified": mechanic.get("verified"),
+            "skills": mechanic.get("skills")
+        },
+        "is_available": mechanic.get("is_available"),
+        "active_request_id": active_request_id,
+        "active_job": active_job,
+        "requests": nearby
+    })
 
 
 # -----------------------------
@@ -300,69 +454,88 @@ def accept_request(request_id):
     if not phone:
         return jsonify({"error": "Mechanic phone required"}), 400
 
-    # Fetch mechanic
-    mechanics_ref = db.collection("mechanics")
-    mech_docs = mechanics_ref.where("phone", "==", phone).limit(1).get()
+    mechanic_ref = get_mechanic_ref(phone)
 
-    if not mech_docs:
+    if not mechanic_ref:
         return jsonify({"error": "Mechanic not found"}), 404
 
-    mechanic_doc = mech_docs[0]
-    mechanic = mechanic_doc.to_dict()
+    req_ref = db.collection("requests").document(request_id)
 
-    if not mechanic.get("verified") or not mechanic.get("is_available"):
-        return jsonify({"error": "Mechanic not eligible"}), 403
+    # 🔐 Generate OTP
+    otp = str(random.randint(100000, 999999))
 
-    if mechanic.get("active_request_id"):
-        return jsonify({"error": "Mechanic already has an active job"}), 409
+    # 🔒 Request, mechanic and owner change together or not at all.
+    # Read both docs in one round trip inside the transaction; a mechanic
+    # who loses the race sees the request already ACCEPTED and gets a 409.
+    def accept_txn(transaction):
+        snaps = {
+            snap.reference.path: snap
+            for snap in db.get_all([req_ref, mechanic_ref], transaction=transaction)
+        }
+        req_doc = snaps.get(req_ref.path)
+        mechanic_doc = snaps.get(mechanic_ref.path)
 
-    # Fetch request
-    req_ref = db.collection("requests").document(request_id)
-    req_doc = req_ref.get()
+        if not mechanic_doc or not mechanic_doc.exists:
+            raise TransactionRejected("Mechanic not found", 404)
 
-    if not req_doc.exists:
-        return jsonify({"error": "Request not found"}), 404
+        mechanic = mechanic_doc.to_dict()
 
-    req = req_doc.to_dict()
+        if not mechanic.get("verified") or not mechanic.get("is_available"):
+            raise TransactionRejected("Mechanic not eligible", 403)
 
-    if req.get("status") != "SEARCHING":
-        return jsonify({
-            "error": f"Request cannot be accepted. Current status: {req.get('status')}"
-        }), 409
+        if mechanic.get("active_request_id"):
+            raise TransactionRejected("Mechanic already has an active job")
 
-    # 🔐 Generate OTP
-    otp = str(random.randint(100000, 999999))
+        if not req_doc or not req_doc.exists:
+            raise TransactionRejected("Request not found", 404)
 
-    # ✅ UPDATE REQUEST (LOCK IT)
-    req_ref.update({
-        "mechanic_phone": phone,
-        "status": "ACCEPTED",
-        "otp": otp,
-        "otp_verified": False,
-        "accepted_at": datetime.utcnow()
-    })
+        req = req_doc.to_dict()
 
-    # ✅ UPDATE MECHANIC
-    mechanic_doc.reference.update({
-        "active_request_id": request_id,
-        "is_available": False
-    })
+        if req.get("status") != "SEARCHING":
+            metrics.incr("accept_lost")
+            raise TransactionRejected(
+                f"Request cannot be accepted. Current status: {req.get('status')}"
+            )
+
+        # ✅ UPDATE REQUEST (LOCK IT)
+        transaction.update(req_ref, {
+            "mechanic_phone": phone,
+            "status": "ACCEPTED",
+            "otp": otp,
+            "otp_verified": False,
+            "accepted_at": datetime.utcnow()
+        })
 
-    # 🔥🔥🔥 CRITICAL FIX (STEP 4) 🔥🔥🔥
-    # ✅ SYNC OWNER ACTIVE REQUEST
-    owner_phone = req.get("owner_phone")
+        # ✅ UPDATE MECHANIC
+        transaction.update(mechanic_ref, {
+            "active_request_id": request_id,
+            "is_available": False
+        })
 
-    owner_docs = (
-        db.collection("owners")
-        .where("phone", "==", owner_phone)
-        .limit(1)
-        .get()
-    )
+        # ✅ SYNC OWNER ACTIVE REQUEST
+        owner_phone = req.get("owner_phone")
+        owner_ref = get_owner_ref(owner_phone)
 
-    if owner_docs:
-        owner_docs[0].reference.update({
-            "active_request_id": request_id
-        })
+        if owner_ref:
+            transaction.update(owner_ref, {
+                "active_request_id": request_id
+            })
+
+        return owner_phone
+
+    try:
+        owner_phone = run_transaction(accept_txn, "accept")
+    except TransactionRejected as e:
+        return jsonify({"error": e.message}), e.status
+    except TransactionContention:
+        return jsonify({"error": "Request is busy, please try again"}), 409
+
+    metrics.incr("accept_success")
+    invalidate_mechanic(phone)
+    invalidate_owner(owner_phone)
+
+    mechanic_index.remove(phone)
+    mechanic_index.release_offers(request_id)
 
     return jsonify({
         "message": "Request accepted",
@@ -382,27 +555,34 @@ def mechanic_history():
     if not phone:
         return jsonify({"error": "Phone required"}), 400
 
-    reqs = (
+    try:
+        limit, cursor = page_args(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    # 📄 One projected, cursor-paginated page (constant cost per page)
+    query = page_query(
         db.collection("requests")
         .where("mechanic_phone", "==", phone)
-        .where("status", "==", "COMPLETED")
-        .order_by("completed_at", direction="DESCENDING")
-        .get()
+        .where("status", "==", "COMPLETED"),
+        order_field="completed_at",
+        fields=["vehicle_type", "service_type", "rating", "feedback"],
+        limit=limit,
+        cursor=cursor
     )
 
-    history = []
-    for d in reqs:
+    def to_item(d):
         r = d.to_dict()
-        history.append({
+        return {
             "request_id": d.id,
             "vehicle_type": r.get("vehicle_type"),
             "service_type": r.get("service_type"),
             "rating": r.get("rating"),
             "feedback": r.get("feedback"),
             "completed_at": r.get("completed_at")
-        })
+        }
 
-    return jsonify({"history": history}), 200
+    return stream_page(query, "completed_at", limit, to_item)
 
 #UPDATE-LOCATION
 @mechanic_bp.route("/update-location", methods=["POST"])
@@ -417,30 +597,22 @@ def update_location():
     if not request_id or not phone or lat is None or lng is None:
         return jsonify({"error": "Missing fields"}), 400
 
-    req_ref = db.collection("requests").document(request_id)
-    req_doc = req_ref.get()
+    # ⚡ Assignment from a short-lived cache, not a read per ping
+    assignment = active_assignments.get(request_id)
 
-    if not req_doc.exists:
+    if not assignment:
         return jsonify({"error": "Request not found"}), 404
 
-    req = req_doc.to_dict()
-
     # 🔐 Only assigned mechanic can update location
-    if req.get("mechanic_phone") != phone:
+    if assignment.get("mechanic_phone") != phone:
         return jsonify({"error": "Unauthorized mechanic"}), 403
 
     # ✅ TRACKING ALLOWED BEFORE & AFTER OTP
-    if req.get("status") not in ["ACCEPTED", "IN_PROGRESS"]:
+    if assignment.get("status") not in TRACKABLE_STATUSES:
         return jsonify({"error": "Tracking not allowed"}), 403
 
-    # ✅ UPDATE ONLY LOCATION (NO STATUS CHANGE)
-    req_ref.update({
-        "mechanic_location": {
-            "lat": lat,
-            "lng": lng,
-            "updated_at": datetime.utcnow().isoformat()
-        }
-    })
+    # ✅ BUFFERED: latest position per request is flushed in batches
+    location_buffer.offer(request_id, lat, lng)
 
     return jsonify({"message": "Location updated"}), 200
 
@@ -454,11 +626,10 @@ def mechanic_logout():
     if not phone:
         return jsonify({"error": "Phone required"}), 400
 
-    docs = db.collection("mechanics").where("phone", "==", phone).limit(1).get()
-    if not docs:
+    mechanic_doc = get_mechanic_doc(phone)
+    if not mechanic_doc:
         return jsonify({"error": "Mechanic not found"}), 404
 
-    mechanic_doc = docs[0]
     mechanic = mechanic_doc.to_dict()
 
     # ❌ Block logout if active job exists
@@ -471,6 +642,8 @@ def mechanic_logout():
     mechanic_doc.reference.update({
         "is_available": False
     })
+    invalidate_mechanic(phone)
+    mechanic_index.remove(phone)
 
     return jsonify({
         "message": "Mechanic logged out successfully"
@@ -514,26 +687,20 @@ def configure_mechanic():
             "error": f"Invalid service types: {invalid_services}. Must be one of: {', '.join(valid_services)}"
         }), 400
 
-    # Fetch mechanic
-    mech_docs = (
-        db.collection("mechanics")
-        .where("phone", "==", phone)
-        .limit(1)
-        .get()
-    )
+    # Resolve mechanic (no read when the ref is cached)
+    mechanic_ref = get_mechanic_ref(phone)
 
-    if not mech_docs:
+    if not mechanic_ref:
         return jsonify({"error": "Mechanic not found"}), 404
 
-    mechanic_doc = mech_docs[0]
-
     # Update skills (normalized to uppercase)
-    mechanic_doc.reference.update({
+    mechanic_ref.update({
         "skills": {
             "vehicle_types": normalized_vehicles,
             "service_types": normalized_services
         }
     })
+    invalidate_mechanic(phone)
 
     return jsonify({
         "message": "Mechanic configuration updated successfully",
@@ -558,22 +725,62 @@ def get_mechanic_request_status(request_id):
     if req.get("mechanic_phone") != phone:
         return jsonify({"error": "Unauthorized"}), 403
 
-    owner_data = None
-    if req.get("owner_phone"):
-        owner_docs = (
-            db.collection("owners")
-            .where("phone", "==", req["owner_phone"])
-            .limit(1)
-            .get()
-        )
-        if owner_docs:
-            o = owner_docs[0].to_dict()
-            owner_data = {
-                "name": o.get("name"),
-                "phone": o.get("phone")
-            }
+    # 🏷️ Unchanged since the client's last poll → 304 before any work
+    etag = version_etag(req_doc)
+    unchanged = not_modified(etag)
+    if unchanged:
+        return unchanged
 
-    return jsonify({
+    owner_data = _owner_summary(req.get("owner_phone"))
+
+    return conditional_json(
+        _job_status_payload(request_id, req, owner_data), etag, weak=True
+    )
+
+
+# -----------------------------
+# STREAM JOB STATUS (SSE)
+# -----------------------------
+@mechanic_bp.route("/request/<request_id>/stream", methods=["GET"])
+def stream_mechanic_request_status(request_id):
+    phone = request.args.get("phone")
+
+    req_doc = db.collection("requests").document(request_id).get()
+
+    if not req_doc.exists:
+        return jsonify({"error": "Request not found"}), 404
+
+    req = req_doc.to_dict()
+
+    if req.get("mechanic_phone") != phone:
+        return jsonify({"error": "Unauthorized"}), 403
+
+    # Owner never changes for a request → resolve once per stream
+    owner_data = _owner_summary(req.get("owner_phone"))
+
+    def build_payload(req):
+        return _job_status_payload(request_id, req, owner_data)
+
+    return stream_request(request_id, build_payload)
+
+
+def _owner_summary(owner_phone):
+    if not owner_phone:
+        return None
+
+    o = get_owner_profile(owner_phone)
+
+    if not o:
+        return None
+
+    return {
+        "name": o.get("name"),
+        "phone": o.get("phone")
+    }
+
+
+def _job_status_payload(request_id, req, owner_data):
+    return {
         "request_id": request_id,
         "status": req.get("status"),
 
@@ -585,7 +792,7 @@ def get_mechanic_request_status(request_id):
         "ownerLocation": req.get("owner_location"),
         "mechanicLocation": req.get("mechanic_location"),
         "owner": owner_data
-    }), 200
+    }
 
 
 @mechanic_bp.route("/profile", methods=["GET"])
@@ -594,12 +801,10 @@ def mechanic_profile():
     if not phone:
         return jsonify({"error": "Phone required"}), 400
 
-    docs = db.collection("mechanics").where("phone", "==", phone).limit(1).get()
-    if not docs:
+    m = get_mechanic_profile(phone)
+    if not m:
         return jsonify({"error": "Mechanic not found"}), 404
 
-    m = docs[0].to_dict()
-
     return jsonify({
         "phone": m.get("phone"),
         "verified": m.get("verified"),
@@ -608,6 +813,24 @@ def mechanic_profile():
     }), 200
 
 
+# -----------------------------
+# MECHANIC STATS (PRECOMPUTED)
+# -----------------------------
+@mechanic_bp.route("/stats", methods=["GET"])
+def mechanic_stats():
+    phone = request.args.get("phone")
+    if not phone:
+        return jsonify({"error": "Phone required"}), 400
+
+    try:
+        days = min(int(request.args.get("days", 0)), MAX_STATS_DAYS)
+    except ValueError:
+        return jsonify({"error": "days must be a number"}), 400
+
+    # 📊 One aggregate document (+ one per requested day)
+    return jsonify(get_mechanic_stats(phone, days=max(days, 0))), 200
+
+
 
 @mechanic_bp.route("/bill/create", methods=["POST"])
 def create_bill():
@@ -660,8 +883,10 @@ def create_bill():
 
     db.collection("bills").document(request_id).set(bill_data)
 
+    # grand_total on the request lets confirm_bill update stats without a bill read
     req_ref.update({
-        "bill_status": "AWAITING_BILL_CONFIRMATION"
+        "bill_status": "AWAITING_BILL_CONFIRMATION",
+        "grand_total": grand_total
     })
 
     return jsonify({
@@ -678,7 +903,12 @@ def mechanic_get_bill(request_id):
     if not bill_doc.exists:
         return jsonify({"error": "Bill not found"}), 404
 
-    return jsonify(bill_doc.to_dict()), 200
+    etag = version_etag(bill_doc)
+    unchanged = not_modified(etag)
+    if unchanged:
+        return unchanged
+
+    return conditional_json(bill_doc.to_dict(), etag, weak=True)
 
 
 @mechanic_bp.route("/bill/status/<request_id>", methods=["GET"])
@@ -689,9 +919,14 @@ def mechanic_bill_status(request_id):
     if not req_doc.exists:
         return jsonify({"error": "Request not found"}), 404
 
+    etag = version_etag(req_doc)
+    unchanged = not_modified(etag)
+    if unchanged:
+        return unchanged
+
     req = req_doc.to_dict()
 
-    return jsonify({
+    return conditional_json({
         "request_id": request_id,
         "bill_status": req.get("bill_status", "NOT_CREATED")
-    }), 200
\ No newline at end of file
+    }, etag, weak=True)
\ No newline at end of file
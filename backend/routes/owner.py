@@ -1,9 +1,25 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify
 from firebase import get_db
+import json
 from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime
 from datetime import timedelta, timezone
-from utils.request_logic import maybe_expand_radius
+from utils.geo import geo_fields
+from utils.request_logic import skill_key
+from utils.live import stream_request
+from utils.dispatch import mechanic_index
+from utils.tracking import end_tracking
+from utils.history import page_args, page_query, stream_page
+from utils.trail import iter_trail
+from utils.eta import get_eta
+from utils.conditional import conditional_json, not_modified, version_etag
+from utils.stats import queue_job_completed, queue_earnings, queue_rating
+from utils.transactions import run_transaction, TransactionRejected, TransactionContention
+from utils.accounts import (
+    OWNERS, get_owner_doc, get_owner_ref, get_mechanic_ref, new_account_ref,
+    get_owner_profile, get_mechanic_profile, invalidate_owner, invalidate_mechanic
+)
+from google.api_core.exceptions import AlreadyExists
 from flask_cors import CORS
 from flask_cors import cross_origin
 from google.cloud import firestore
@@ -37,19 +53,20 @@ def owner_register():
     if password != confirm_password:
         return jsonify({"error": "Passwords do not match"}), 400
 
-    owners_ref = db.collection("owners")
-    existing = owners_ref.where("phone", "==", phone).limit(1).get()
-
-    if existing:
+    if get_owner_doc(phone):
         return jsonify({"error": "Owner already exists"}), 409
 
-    owners_ref.add({
-        "name": name,
-        "phone": phone,
-        "password_hash": generate_password_hash(password),
-        "active_request_id": None,
-        "created_at": datetime.utcnow()
-    })
+    # 📇 Phone-keyed document → direct lookups later
+    try:
+        new_account_ref(OWNERS, phone).create({
+            "name": name,
+            "phone": phone,
+            "password_hash": generate_password_hash(password),
+            "active_request_id": None,
+            "created_at": datetime.utcnow()
+        })
+    except AlreadyExists:
+        return jsonify({"error": "Owner already exists"}), 409
 
     return jsonify({"message": "Owner registered successfully"}), 201
 
@@ -64,13 +81,12 @@ def owner_login():
     if not phone or not password:
         return jsonify({"error": "Phone and password required"}), 400
 
-    owners_ref = db.collection("owners")
-    docs = owners_ref.where("phone", "==", phone).limit(1).get()
+    owner_doc = get_owner_doc(phone)
 
-    if not docs:
+    if not owner_doc:
         return jsonify({"error": "Owner not found"}), 404
 
-    owner = docs[0].to_dict()
+    owner = owner_doc.to_dict()
 
     if not check_password_hash(owner["password_hash"], password):
         return jsonify({"error": "Invalid credentials"}), 401
@@ -99,68 +115,73 @@ def create_request():
     vehicle_type = vehicle_type.upper()
     service_type = service_type.upper()
 
-    transaction = db.transaction()
+    now = datetime.now(timezone.utc)
 
-    @firestore.transactional
-    def txn(transaction):
-        # 🔒 LOCK OWNER
-        owner_q = (
-            db.collection("owners")
-            .where("phone", "==", phone)
-            .limit(1)
-        )
-
-        owner_docs = list(owner_q.stream(transaction=transaction))
-        if not owner_docs:
-            raise ValueError("Owner not found")
+    req_ref = db.collection("requests").document()
 
-        owner_ref = owner_docs[0].reference
-        owner_data = owner_docs[0].to_dict()
+    print("🔥 CREATE_REQUEST CALLED")
+    print("🔥 RADIUS_STEPS =", RADIUS_STEPS)
+    print("🔥 EXPANSION_INTERVAL =", EXPANSION_INTERVAL)
+    print("🔥 NOW =", now)
 
-        # 🚫 PREVENT MULTIPLE ACTIVE REQUESTS
-        if owner_data.get("active_request_id"):
-            raise ValueError("Active request already exists")
 
-        now = datetime.now(timezone.utc)
+    req_data = {
+        "owner_phone": phone,
+        "mechanic_phone": None,
 
-        req_ref = db.collection("requests").document()
+        "vehicle_type": vehicle_type,
+        "service_type": service_type,
+        # 🧰 Lets mechanics query only requests they can serve
+        "skill_key": skill_key(vehicle_type, service_type),
+        "description": description,
 
-        print("🔥 CREATE_REQUEST CALLED")
-        print("🔥 RADIUS_STEPS =", RADIUS_STEPS)
-        print("🔥 EXPANSION_INTERVAL =", EXPANSION_INTERVAL)
-        print("🔥 NOW =", now)
+        "owner_location": {
+            "lat": lat,
+            "lng": lng
+        },
+        "mechanic_location": None,
 
+        # 🗺️ GEOCELL INDEX (mechanics query by cell)
+        **geo_fields(lat, lng),
 
-        transaction.set(req_ref, {
-            "owner_phone": phone,
-            "mechanic_phone": None,
+        # 🔥 REQUIRED FOR RADIUS EXPANSION
+        "search_radius_km": RADIUS_STEPS[0],      # 3 km
+        "radius_expanded_count": 0,
+        "timeout_at": now + timedelta(seconds=EXPANSION_INTERVAL),
 
-            "vehicle_type": vehicle_type,
-            "service_type": service_type,
-            "description": description,
+        "status": "SEARCHING",
 
-            "owner_location": {
-                "lat": lat,
-                "lng": lng
-            },
-            "mechanic_location": None,
+        "otp": None,
+        "otp_verified": False,
 
-            # 🔥 REQUIRED FOR RADIUS EXPANSION
-            "search_radius_km": RADIUS_STEPS[0],      # 3 km
-            "radius_expanded_count": 0,
-            "timeout_at": now + timedelta(seconds=EXPANSION_INTERVAL),
+        "rating": None,
+        "feedback": None,
 
-            "status": "SEARCHING",
+        "created_at": now,
+        "completed_at": None
+    }
 
-            "otp": None,
-            "otp_verified": False,
+    # 🧭 OFFER TO THE BEST-RANKED NEARBY MECHANICS
+    # Ranked once, outside the transaction, so a retry reuses the same offers
+    req_data.update(mechanic_index.dispatch(req_data))
 
-            "rating": None,
-            "feedback": None,
+    transaction = db.transaction()
 
-            "created_at": now,
-            "completed_at": None
-        })
+    @firestore.transactional
+    def txn(transaction):
+        # 🔒 LOCK OWNER
+        owner_doc = get_owner_doc(phone, transaction=transaction)
+        if not owner_doc:
+            raise ValueError("Owner not found")
+
+        owner_ref = owner_doc.reference
+        owner_data = owner_doc.to_dict()
+
+        # 🚫 PREVENT MULTIPLE ACTIVE REQUESTS
+        if owner_data.get("active_request_id"):
+            raise ValueError("Active request already exists")
+
+        transaction.set(req_ref, req_data)
 
         print("🔥 REQUEST WRITTEN:", req_ref.id)
 
@@ -173,6 +194,8 @@ def create_request():
 
     try:
         request_id = txn(transaction)
+        invalidate_owner(phone)
+        mechanic_index.record_offers(request_id, req_data)
         return jsonify({
             "message": "Request created successfully",
             "request_id": request_id,
@@ -201,45 +224,114 @@ def get_request(request_id):
     if not req_doc.exists:
         return jsonify({"error": "Request not found"}), 404
 
+    # 🏷️ Unchanged since the client's last poll → 304 before any work
+    etag = version_etag(req_doc)
+    unchanged = not_modified(etag)
+    if unchanged:
+        return unchanged
+
     req = req_doc.to_dict()
 
-    # 🔁 Auto timeout / radius expansion
-    maybe_expand_radius(req_ref, req)
-    req = req_ref.get(retry=None).to_dict()
+    # ⏰ Radius expansion / timeout are driven by utils.scheduler (pure read here)
+
+    mechanic_data = _mechanic_summary(req.get("mechanic_phone"))
+
+    return conditional_json(
+        _request_status_payload(request_id, req, mechanic_data), etag, weak=True
+    )
 
-    mechanic_data = None
-    mechanic_location = None
 
-    if req.get("mechanic_phone"):
-        mech_docs = (
-            db.collection("mechanics")
-            .where("phone", "==", req["mechanic_phone"])
-            .limit(1)
-            .get()
-        )
+# -----------------------------
+# STREAM REQUEST STATUS (SSE)
+# -----------------------------
+@owner_bp.route("/request/<request_id>/stream", methods=["GET"])
+def stream_request_status(request_id):
+    # Mechanic name only changes when a (different) mechanic is assigned
+    mechanic_cache = {}
 
-        if mech_docs:
-            mechanic = mech_docs[0].to_dict()
-            mechanic_data = {
-                "name": mechanic.get("name"),
-                "phone": mechanic.get("phone")
-            }
+    def build_payload(req):
+        mechanic_phone = req.get("mechanic_phone")
+        if mechanic_phone not in mechanic_cache:
+            mechanic_cache[mechanic_phone] = _mechanic_summary(mechanic_phone)
+        return _request_status_payload(request_id, req, mechanic_cache[mechanic_phone])
 
-    # ✅ READ MECHANIC LOCATION DIRECTLY FROM REQUEST
-    mechanic_location = req.get("mechanic_location")
+    return stream_request(request_id, build_payload)
 
-    return jsonify({
-    "request_id": request_id,
-    "status": req.get("status"),
-    "bill_status": req.get("bill_status"),  # 🔥 REQUIRED
-    "ownerLocation": req.get("owner_location"),
-    "mechanic": mechanic_data,
-    "mechanicLocation": mechanic_location,
-    "search_radius_km": req.get("search_radius_km"),
-    "radius_expanded_count": req.get("radius_expanded_count", 0),
-    "timeout_at": req.get("timeout_at"),
-    "created_at": req.get("created_at"),
-}), 200
+
+def _mechanic_summary(mechanic_phone):
+    if not mechanic_phone:
+        return None
+
+    mechanic = get_mechanic_profile(mechanic_phone)
+
+    if not mechanic:
+        return None
+
+    return {
+        "name": mechanic.get("name"),
+        "phone": mechanic.get("phone")
+    }
+
+
+def _request_status_payload(request_id, req, mechanic_data):
+    return {
+        "request_id": request_id,
+        "status": req.get("status"),
+        "bill_status": req.get("bill_status"),  # 🔥 REQUIRED
+        "ownerLocation": req.get("owner_location"),
+        "mechanic": mechanic_data,
+        # ✅ READ MECHANIC LOCATION DIRECTLY FROM REQUEST
+        "mechanicLocation": req.get("mechanic_location"),
+        # ⏱️ SERVER ETA (memoised per request, only while en route)
+        "eta": get_eta(
+            request_id, req.get("mechanic_location"), req.get("owner_location")
+        ) if req.get("status") == "ACCEPTED" else None,
+        "search_radius_km": req.get("search_radius_km"),
+        "radius_expanded_count": req.get("radius_expanded_count", 0),
+        "timeout_at": req.get("timeout_at"),
+        "created_at": req.get("created_at"),
+    }
+
+
+# -----------------------------
+# ROUTE TRAIL (REPLAY)
+# -----------------------------
+@owner_bp.route("/request/<request_id>/trail", methods=["GET"])
+def request_trail(request_id):
+    """
+    Streams the mechanic's recorded route as
+        {"request_id": ..., "points": [[lat, lng, unix_ts], ...]}
+    ?interval=<seconds> downsamples, ?since=<unix_ts> resumes.
+    """
+    phone = request.args.get("phone")
+
+    try:
+        interval = float(request.args.get("interval", 0))
+        since = request.args.get("since")
+        since = int(since) if since is not None else None
+    except ValueError:
+        return jsonify({"error": "interval and since must be numbers"}), 400
+
+    req_doc = db.collection("requests").document(request_id).get()
+
+    if not req_doc.exists:
+        return jsonify({"error": "Request not found"}), 404
+
+    req = req_doc.to_dict()
+
+    # 🔐 Only the owner or the assigned mechanic
+    if not phone or phone not in (req.get("owner_phone"), req.get("mechanic_phone")):
+        return jsonify({"error": "Unauthorized"}), 403
+
+    def generate():
+        yield '{"request_id": %s, "points": [' % json.dumps(request_id)
+        sep = ""
+        for point in iter_trail(request_id, interval=interval, since=since):
+            yield sep + json.dumps(point)
+            sep = ","
+        yield "]}"
+
+    return Response(generate(), mimetype="application/json")
 
 
 
@@ -285,62 +377,89 @@ def complete_job(request_id):
         return {"error": "Owner phone required"}, 400
 
     req_ref = db.collection("requests").document(request_id)
-    req_doc = req_ref.get()
 
-    if not req_doc.exists:
-        return {"error": "Request not found"}, 404
+    # ===============================
+    # ✅ COMPLETE JOB (AUTHORITATIVE) — ONE TRANSACTION
+    # Status is re-checked on every attempt, so a concurrent write to an
+    # unrelated field (location pings) retries instead of failing.
+    # ===============================
+    def complete_txn(transaction):
+        req_doc = req_ref.get(transaction=transaction)
 
-    req = req_doc.to_dict()
+        if not req_doc.exists:
+            raise TransactionRejected("Request not found", 404)
 
-    # ✅ STATUS GUARD
-    if req.get("status") != "IN_PROGRESS":
-        return {"error": "Job can only be completed after OTP verification"}, 403
+        req = req_doc.to_dict()
 
-    # ✅ OWNER AUTH
-    if req.get("owner_phone") != phone:
-        return {"error": "Unauthorized owner"}, 403
+        # ✅ STATUS GUARD
+        if req.get("status") != "IN_PROGRESS":
+            raise TransactionRejected("Job can only be completed after OTP verification", 403)
 
-    # ===============================
-    # ✅ COMPLETE JOB (AUTHORITATIVE)
-    # ===============================
-    req_ref.update({
-        "status": "COMPLETED",
-        "completed_at": datetime.utcnow(),
-        "job_closed": True   # 🔥 ADD THIS (important but safe)
-    })
+        # ✅ OWNER AUTH
+        if req.get("owner_phone") != phone:
+            raise TransactionRejected("Unauthorized owner", 403)
 
-    # ===============================
-    # ✅ RELEASE MECHANIC COMPLETELY
-    # ===============================
-    mechanic_phone = req.get("mechanic_phone")
-    if mechanic_phone:
-        mech_docs = (
-            db.collection("mechanics")
-            .where("phone", "==", mechanic_phone)
-            .limit(1)
-            .get()
-        )
-        if mech_docs:
-            mech_docs[0].reference.update({
-                "active_request_id": None,
-                "is_available": True
-            })
+        transaction.update(req_ref, {
+            "status": "COMPLETED",
+            "completed_at": datetime.utcnow(),
+            "job_closed": True   # 🔥 ADD THIS (important but safe)
+        })
 
-    # ===============================
-    # ✅ CLEAR OWNER ACTIVE REQUEST
-    # ===============================
-    owner_docs = (
-        db.collection("owners")
-        .where("phone", "==", phone)
-        .limit(1)
-        .get()
-    )
-    if owner_docs:
-        owner_docs[0].reference.update({
+        # ✅ RELEASE MECHANIC + CLEAR OWNER ACTIVE REQUEST
+        _release_accounts(transaction, phone, req.get("mechanic_phone"))
+
+        # 📊 MECHANIC STATS (once: the status guard fails on a replay)
+        queue_job_completed(transaction, req.get("mechanic_phone"))
+
+        return req.get("mechanic_phone")
+
+    try:
+        mechanic_phone = run_transaction(complete_txn, "complete")
+    except TransactionRejected as e:
+        return {"error": e.message}, e.status
+    except TransactionContention:
+        return {"error": "Request is busy, please try again"}, 409
+
+    _invalidate_accounts(phone, mechanic_phone)
+    end_tracking(request_id)
+
+    return {"message": "Job completed successfully"}, 200
+
+
+def _release_accounts(batch, owner_phone, mechanic_phone):
+    """
+    Queue the owner / mechanic release writes on `batch` (or transaction).
+    Refs come from the accounts cache, so this normally costs no reads.
+    """
+    owner_ref = get_owner_ref(owner_phone)
+    if owner_ref:
+        batch.update(owner_ref, {
             "active_request_id": None
         })
 
-    return {"message": "Job completed successfully"}, 200
+    mechanic_ref = get_mechanic_ref(mechanic_phone)
+    if mechanic_ref:
+        batch.update(mechanic_ref, {
+            "active_request_id": None,
+            "is_available": True
+        })
+
+
+def _invalidate_accounts(owner_phone, mechanic_phone):
+    invalidate_owner(owner_phone)
+    _refresh_mechanic(mechanic_phone)
+
+
+def _refresh_mechanic(mechanic_phone):
+    """
+    Drop the cached profile and put the (released / re-rated) mechanic
+    back in this process's dispatch index right away, instead of at the
+    next index refresh.
+    """
+    if not mechanic_phone:
+        return
+    invalidate_mechanic(mechanic_phone)
+    mechanic_index.upsert(get_mechanic_profile(mechanic_phone))
 
 
 @owner_bp.route("/request/feedback/<request_id>", methods=["POST"])
@@ -356,24 +475,56 @@ def submit_feedback(request_id):
         return jsonify({"error": "Rating must be between 1 and 5"}), 400
 
     req_ref = db.collection("requests").document(request_id)
-    req_doc = req_ref.get()
 
-    if not req_doc.exists:
-        return jsonify({"error": "Request not found"}), 404
+    def feedback_txn(transaction):
+        req_doc = req_ref.get(transaction=transaction)
 
-    req = req_doc.to_dict()
+        if not req_doc.exists:
+            raise TransactionRejected("Request not found", 404)
 
-    if req.get("status") != "COMPLETED":
-        return jsonify({"error": "Feedback allowed only after completion"}), 409
+        req = req_doc.to_dict()
 
-    if req.get("rating") is not None:
-        return jsonify({"error": "Feedback already submitted"}), 409
+        if req.get("status") != "COMPLETED":
+            raise TransactionRejected("Feedback allowed only after completion")
 
-    req_ref.update({
-        "rating": int(rating),
-        "feedback": feedback,
-        "rated_at": firestore.SERVER_TIMESTAMP
-    })
+        if req.get("rating") is not None:
+            raise TransactionRejected("Feedback already submitted")
+
+        # ⭐ Running average on the mechanic (dispatch ranks by it);
+        # read before any write, as transactions require
+        mechanic_phone = req.get("mechanic_phone")
+        mechanic_ref = get_mechanic_ref(mechanic_phone)
+        mechanic_doc = mechanic_ref.get(transaction=transaction) if mechanic_ref else None
+
+        transaction.update(req_ref, {
+            "rating": int(rating),
+            "feedback": feedback,
+            "rated_at": firestore.SERVER_TIMESTAMP
+        })
+
+        if mechanic_doc and mechanic_doc.exists:
+            mechanic = mechanic_doc.to_dict()
+            rating_sum = (mechanic.get("rating_sum") or 0) + int(rating)
+            rating_count = (mechanic.get("rating_count") or 0) + 1
+            transaction.update(mechanic_ref, {
+                "rating_sum": rating_sum,
+                "rating_count": rating_count,
+                "avg_rating": round(rating_sum / rating_count, 2)
+            })
+
+        # 📊 MECHANIC STATS
+        queue_rating(transaction, mechanic_phone, int(rating))
+
+        return mechanic_phone
+
+    try:
+        mechanic_phone = run_transaction(feedback_txn, "feedback")
+    except TransactionRejected as e:
+        return jsonify({"error": e.message}), e.status
+    except TransactionContention:
+        return jsonify({"error": "Request is busy, please try again"}), 409
+
+    _refresh_mechanic(mechanic_phone)
 
     return jsonify({"message": "Feedback submitted successfully"}), 200
 
@@ -387,18 +538,25 @@ def owner_history():
     if not phone:
         return jsonify({"error": "Phone required"}), 400
 
-    reqs = (
+    try:
+        limit, cursor = page_args(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    # 📄 One projected, cursor-paginated page (constant cost per page)
+    query = page_query(
         db.collection("requests")
         .where("owner_phone", "==", phone)
-        .where("status", "in", ["COMPLETED", "CANCELLED", "TIMEOUT"])
-        .order_by("created_at", direction="DESCENDING")
-        .get()
+        .where("status", "in", ["COMPLETED", "CANCELLED", "TIMEOUT"]),
+        order_field="created_at",
+        fields=["vehicle_type", "service_type", "status", "rating", "feedback", "completed_at"],
+        limit=limit,
+        cursor=cursor
     )
 
-    history = []
-    for d in reqs:
+    def to_item(d):
         r = d.to_dict()
-        history.append({
+        return {
             "request_id": d.id,
             "vehicle_type": r.get("vehicle_type"),
             "service_type": r.get("service_type"),
@@ -406,9 +564,9 @@ def owner_history():
             "rating": r.get("rating"),
             "feedback": r.get("feedback"),
             "completed_at": r.get("completed_at")
-        })
+        }
 
-    return jsonify({"history": history}), 200
+    return stream_page(query, "created_at", limit, to_item)
 
 
 
@@ -423,7 +581,12 @@ def owner_request_details(request_id):
         return "", 200
 
     req_ref = db.collection("requests").document(request_id)
-    req_doc = req_ref.get()
+    bill_ref = db.collection("bills").document(request_id)
+
+    # ⚡ Request + (optional) bill in ONE round trip
+    docs = {snap.reference.path: snap for snap in db.get_all([req_ref, bill_ref])}
+    req_doc = docs[req_ref.path]
+    bill_doc = docs[bill_ref.path]
 
     if not req_doc.exists:
         return jsonify({"error": "Request not found"}), 404
@@ -431,14 +594,9 @@ def owner_request_details(request_id):
     req = req_doc.to_dict()
 
     # -----------------------------
-    # FETCH BILL (OPTIONAL)
+    # BILL (OPTIONAL)
     # -----------------------------
-    bill_data = None
-    bill_ref = db.collection("bills").document(request_id)
-    bill_doc = bill_ref.get()
-
-    if bill_doc.exists:
-        bill_data = bill_doc.to_dict()
+    bill_data = bill_doc.to_dict() if bill_doc.exists else None
 
     return jsonify({
         "request_id": request_id,
@@ -474,51 +632,46 @@ def cancel_request(request_id):
     phone = data.get("phone")
 
     req_ref = db.collection("requests").document(request_id)
-    req_doc = req_ref.get()
-
-    if not req_doc.exists:
-        return {"error": "Request not found"}, 404
 
-    req = req_doc.to_dict()
+    # ✅ CANCEL REQUEST — ONE TRANSACTION
+    # Status and assignment are re-read on every attempt: an accept that
+    # commits first is seen here, and its mechanic is released with it.
+    def cancel_txn(transaction):
+        req_doc = req_ref.get(transaction=transaction)
 
-    if req["status"] == "IN_PROGRESS":
-        return {"error": "Cannot cancel after service has started"}, 403
+        if not req_doc.exists:
+            raise TransactionRejected("Request not found", 404)
 
-    if req["status"] in ["COMPLETED", "CANCELLED"]:
-        return {"error": "Request already closed"}, 400
+        req = req_doc.to_dict()
 
-    # ✅ CANCEL REQUEST
-    req_ref.update({
-        "status": "CANCELLED",
-        "cancelled_by": "OWNER"
-    })
+        if req.get("status") == "IN_PROGRESS":
+            raise TransactionRejected("Cannot cancel after service has started", 403)
 
+        if req.get("status") in ["COMPLETED", "CANCELLED"]:
+            raise TransactionRejected("Request already closed", 400)
 
-    # ✅ CLEAR OWNER ACTIVE REQUEST
-    owner_ref = (
-        db.collection("owners")
-        .where("phone", "==", phone)
-        .limit(1)
-        .get()
-    )
-    if owner_ref:
-        owner_ref[0].reference.update({
-            "active_request_id": None
+        transaction.update(req_ref, {
+            "status": "CANCELLED",
+            "cancelled_by": "OWNER"
         })
 
-    # Release mechanic if assigned
-    if req.get("mechanic_phone"):
-        mech_ref = (
-            db.collection("mechanics")
-            .where("phone", "==", req["mechanic_phone"])
-            .limit(1)
-            .get()
-        )
-        if mech_ref:
-            mech_ref[0].reference.update({
-                "is_available": True,
-                "active_request_id": None
-            })
+        # ✅ CLEAR OWNER ACTIVE REQUEST + release mechanic if assigned
+        owner_phone = req.get("owner_phone") or phone
+        mechanic_phone = req.get("mechanic_phone")
+        _release_accounts(transaction, owner_phone, mechanic_phone)
+
+        return owner_phone, mechanic_phone
+
+    try:
+        owner_phone, mechanic_phone = run_transaction(cancel_txn, "cancel")
+    except TransactionRejected as e:
+        return {"error": e.message}, e.status
+    except TransactionContention:
+        return {"error": "Request is busy, please try again"}, 409
+
+    _invalidate_accounts(owner_phone, mechanic_phone)
+    mechanic_index.release_offers(request_id)
+    end_tracking(request_id)
 
     return {"message": "Request cancelled"}, 200
 
@@ -537,8 +690,7 @@ def owner_logout():
     if not phone:
         return jsonify({"error": "Phone required"}), 400
 
-    docs = db.collection("owners").where("phone", "==", phone).limit(1).get()
-    if not docs:
+    if not get_owner_ref(phone):
         return jsonify({"error": "Owner not found"}), 404
 
     # Stateless logout → nothing to clear in DB
@@ -553,12 +705,10 @@ def owner_profile():
     if not phone:
         return jsonify({"error": "Phone required"}), 400
 
-    docs = db.collection("owners").where("phone", "==", phone).limit(1).get()
-    if not docs:
+    owner = get_owner_profile(phone)
+    if not owner:
         return jsonify({"error": "Owner not found"}), 404
 
-    owner = docs[0].to_dict()
-
     return jsonify({
         "phone": owner.get("phone"),
         "active_request_id": owner.get("active_request_id")
@@ -577,7 +727,12 @@ def owner_get_bill(request_id):
     if not bill_doc.exists:
         return jsonify({"error": "Bill not found"}), 404
 
-    return jsonify(bill_doc.to_dict()), 200
+    etag = version_etag(bill_doc)
+    unchanged = not_modified(etag)
+    if unchanged:
+        return unchanged
+
+    return conditional_json(bill_doc.to_dict(), etag, weak=True)
 
 
 @owner_bp.route("/bill/confirm", methods=["POST"])
@@ -589,59 +744,69 @@ def confirm_bill():
         return jsonify({"error": "request_id required"}), 400
 
     req_ref = db.collection("requests").document(request_id)
-    req_doc = req_ref.get()
+    bill_ref = db.collection("bills").document(request_id)
 
-    if not req_doc.exists:
-        return jsonify({"error": "Request not found"}), 404
+    # ONE TRANSACTION: all writes land together or not at all, and the
+    # state guard is re-checked on every attempt
+    def confirm_txn(transaction):
+        # All reads before any write (request + bill in one round trip)
+        snaps = {
+            snap.reference.path: snap
+            for snap in db.get_all([req_ref, bill_ref], transaction=transaction)
+        }
+        req_doc = snaps.get(req_ref.path)
+        bill_doc = snaps.get(bill_ref.path)
+
+        if not req_doc or not req_doc.exists:
+            raise TransactionRejected("Request not found", 404)
+
+        req = req_doc.to_dict()
+
+        # 🔒 BILL STATE GUARD
+        if req.get("bill_status") != "AWAITING_BILL_CONFIRMATION":
+            raise TransactionRejected("Bill not ready", 400)
+
+        owner_phone = req.get("owner_phone")
+        mechanic_phone = req.get("mechanic_phone")
+
+        # 1️⃣ CONFIRM BILL
+        transaction.update(bill_ref, {
+            "status": "CONFIRMED",
+            "confirmed_at": firestore.SERVER_TIMESTAMP
+        })
 
-    req = req_doc.to_dict()
+        # 2️⃣ COMPLETE REQUEST
+        transaction.update(req_ref, {
+            "bill_status": "CONFIRMED",
+            "status": "COMPLETED",
+            "completed_at": firestore.SERVER_TIMESTAMP
+        })
 
-    # 🔒 BILL STATE GUARD
-    if req.get("bill_status") != "AWAITING_BILL_CONFIRMATION":
-        return jsonify({"error": "Bill not ready"}), 400
+        # 3️⃣ CLEAR OWNER ACTIVE REQUEST + 4️⃣ RELEASE MECHANIC COMPLETELY
+        _release_accounts(transaction, owner_phone, mechanic_phone)
 
-    owner_phone = req.get("owner_phone")
-    mechanic_phone = req.get("mechanic_phone")
+        # 5️⃣ MECHANIC STATS (job may already be counted by complete_job)
+        if req.get("status") != "COMPLETED":
+            queue_job_completed(transaction, mechanic_phone)
 
-    # 1️⃣ CONFIRM BILL
-    db.collection("bills").document(request_id).update({
-        "status": "CONFIRMED",
-        "confirmed_at": firestore.SERVER_TIMESTAMP
-    })
+        grand_total = req.get("grand_total")
+        if grand_total is None:
+            bill = bill_doc.to_dict() if bill_doc and bill_doc.exists else None
+            grand_total = (bill or {}).get("grand_total") or 0
 
-    # 2️⃣ COMPLETE REQUEST
-    req_ref.update({
-        "bill_status": "CONFIRMED",
-        "status": "COMPLETED",
-        "completed_at": firestore.SERVER_TIMESTAMP
-    })
+        queue_earnings(transaction, mechanic_phone, grand_total)
 
-    # 3️⃣ CLEAR OWNER ACTIVE REQUEST
-    if owner_phone:
-        owner_docs = (
-            db.collection("owners")
-            .where("phone", "==", owner_phone)
-            .limit(1)
-            .get()
-        )
-        if owner_docs:
-            owner_docs[0].reference.update({
-                "active_request_id": None
-            })
+        return owner_phone, mechanic_phone
 
-    # 4️⃣ RELEASE MECHANIC COMPLETELY
-    if mechanic_phone:
-        mech_docs = (
-            db.collection("mechanics")
-            .where("phone", "==", mechanic_phone)
-            .limit(1)
-            .get()
-        )
-        if mech_docs:
-            mech_docs[0].reference.update({
-                "active_request_id": None,
-                "is_available": True
-            })
+    try:
+        owner_phone, mechanic_phone = run_transaction(confirm_txn, "confirm_bill")
+    except TransactionRejected as e:
+        return jsonify({"error": e.message}), e.status
+    except TransactionContention:
+        return jsonify({"error": "Request is busy, please try again"}), 409
+
+    _invalidate_accounts(owner_phone, mechanic_phone)
+    end_tracking(request_id)
 
     return jsonify({
         "message": "Bill confirmed. Job closed successfully."
@@ -0,0 +1,143 @@
+"""
+Rebuild mechanic_stats (totals and per-day) from requests and bills.
+
+Reads COMPLETED requests and CONFIRMED bills in pages, aggregates in
+memory, then overwrites every mechanic_stats document in batches. Safe to
+re-run; run it once after deploying incremental stats, or to repair
+drift.
+
+Run from backend/ (dry run by default):
+    python -m scripts.backfill_mechanic_stats
+    python -m scripts.backfill_mechanic_stats --apply
+"""
+import argparse
+from collections import defaultdict
+
+from google.cloud import firestore
+
+from firebase import get_db
+from utils.stats import COUNTERS, STATS, DAYS, day_key
+
+PAGE_SIZE = 500
+BATCH_LIMIT = 400
+
+
+def iter_docs(db, collection, field, value, fields):
+    last = None
+    while True:
+        query = (
+            db.collection(collection)
+            .where(field, "==", value)
+            .select(fields)
+            .order_by("__name__")
+            .limit(PAGE_SIZE)
+        )
+        if last is not None:
+            query = query.start_after({"__name__": last.id})
+
+        docs = query.get()
+        if not docs:
+            return
+
+        yield from docs
+        last = docs[-1]
+
+
+def _new_counters():
+    return dict.fromkeys(COUNTERS, 0)
+
+
+def aggregate(db):
+    totals = defaultdict(_new_counters)
+    days = defaultdict(lambda: defaultdict(_new_counters))
+
+    def bump(phone, when, **counters):
+        day = day_key(when) if when else None
+        for name, value in counters.items():
+            totals[phone][name] += value
+            if day:
+                days[phone][day][name] += value
+
+    requests_seen = 0
+    for doc in iter_docs(
+        db, "requests", "status", "COMPLETED",
+        ["mechanic_phone", "completed_at", "rating", "rated_at"]
+    ):
+        r = doc.to_dict()
+        phone = r.get("mechanic_phone")
+        if not phone:
+            continue
+
+        requests_seen += 1
+        bump(phone, r.get("completed_at"), jobs_completed=1)
+
+        if r.get("rating") is not None:
+            bump(
+                phone, r.get("rated_at") or r.get("completed_at"),
+                rating_sum=int(r["rating"]), rating_count=1
+            )
+
+    bills_seen = 0
+    for doc in iter_docs(
+        db, "bills", "status", "CONFIRMED",
+        ["mechanic_phone", "grand_total", "confirmed_at", "created_at"]
+    ):
+        b = doc.to_dict()
+        phone = b.get("mechanic_phone")
+        if not phone:
+            continue
+
+        bills_seen += 1
+        bump(
+            phone, b.get("confirmed_at") or b.get("created_at"),
+            earnings_total=b.get("grand_total") or 0
+        )
+
+    print(f"📊 read {requests_seen} completed requests, {bills_seen} confirmed bills")
+    return totals, days
+
+
+def write(db, totals, days):
+    batch = db.batch()
+    pending = 0
+
+    def queue(ref, data):
+        nonlocal batch, pending
+        batch.set(ref, {**data, "updated_at": firestore.SERVER_TIMESTAMP})
+        pending += 1
+        if pending >= BATCH_LIMIT:
+            batch.commit()
+            batch = db.batch()
+            pending = 0
+
+    for phone, counters in totals.items():
+        stats_ref = db.collection(STATS).document(phone)
+        queue(stats_ref, {"phone": phone, **counters})
+
+        for day, day_counters in days[phone].items():
+            queue(stats_ref.collection(DAYS).document(day), {"day": day, **day_counters})
+
+    if pending:
+        batch.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--apply", action="store_true", help="write changes (default: dry run)")
+    args = parser.parse_args()
+
+    db = get_db()
+    totals, days = aggregate(db)
+
+    for phone, counters in sorted(totals.items()):
+        print(f"➡️ {phone}: {counters} across {len(days[phone])} days")
+
+    if args.apply:
+        write(db, totals, days)
+        print(f"✅ wrote stats for {len(totals)} mechanics")
+    else:
+        print("Dry run only. Re-run with --apply to write stats.")
+
+
+if __name__ == "__main__":
+    main()
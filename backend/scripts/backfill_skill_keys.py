@@ -0,0 +1,82 @@
+"""
+Add skill_key ("CAR#BATTERY") to requests created before it existed.
+
+/mechanic/requests now filters on skill_key in the query, so a SEARCHING
+request without one is invisible to mechanics. Only SEARCHING requests
+are read by that query; --all also fills in closed ones for consistency.
+Safe to re-run.
+
+Run from backend/ (dry run by default):
+    python -m scripts.backfill_skill_keys
+    python -m scripts.backfill_skill_keys --apply
+"""
+import argparse
+
+from firebase import get_db
+from utils.request_logic import skill_key
+
+PAGE_SIZE = 500
+BATCH_LIMIT = 400
+
+
+def iter_requests(db, searching_only):
+    last = None
+    while True:
+        query = db.collection("requests")
+        if searching_only:
+            query = query.where("status", "==", "SEARCHING")
+        query = (
+            query.select(["vehicle_type", "service_type", "skill_key"])
+            .order_by("__name__")
+            .limit(PAGE_SIZE)
+        )
+        if last is not None:
+            query = query.start_after({"__name__": last.id})
+
+        docs = query.get()
+        if not docs:
+            return
+
+        yield from docs
+        last = docs[-1]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--apply", action="store_true", help="write changes (default: dry run)")
+    parser.add_argument("--all", action="store_true", help="every request, not just SEARCHING ones")
+    args = parser.parse_args()
+
+    db = get_db()
+    batch = db.batch()
+    pending = seen = stale = 0
+
+    for doc in iter_requests(db, searching_only=not args.all):
+        seen += 1
+        r = doc.to_dict()
+        key = skill_key(r.get("vehicle_type"), r.get("service_type"))
+        if r.get("skill_key") == key:
+            continue
+
+        stale += 1
+        print(f"➡️ {doc.id}: {r.get('skill_key')} → {key}")
+        if not args.apply:
+            continue
+
+        batch.update(doc.reference, {"skill_key": key})
+        pending += 1
+        if pending >= BATCH_LIMIT:
+            batch.commit()
+            batch = db.batch()
+            pending = 0
+
+    if args.apply and pending:
+        batch.commit()
+
+    print(f"📊 {seen} requests read, {stale} without a current skill_key")
+    if not args.apply and stale:
+        print("Dry run only. Re-run with --apply to write skill keys.")
+
+
+if __name__ == "__main__":
+    main()
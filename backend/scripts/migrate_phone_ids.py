@@ -0,0 +1,93 @@
+"""
+Move owner / mechanic documents to phone-keyed document IDs.
+
+Accounts registered before phone-keyed IDs live under random IDs and are
+only reachable through a `where("phone", "==", ...)` query. This copies
+each one to `<collection>/<phone>` and deletes the old document in the
+same batch. Requests and bills reference accounts by phone, not by ID,
+so nothing else needs rewriting.
+
+Run from backend/ (dry run by default):
+    python -m scripts.migrate_phone_ids
+    python -m scripts.migrate_phone_ids --apply
+
+Restart the app afterwards so cached document references are dropped.
+"""
+import argparse
+
+from firebase import get_db
+from utils.accounts import OWNERS, MECHANICS, phone_doc_id
+
+PAGE_SIZE = 200
+BATCH_LIMIT = 400     # Firestore allows 500 writes per batch; each move is 2
+
+
+def iter_pages(db, collection):
+    last = None
+    while True:
+        query = db.collection(collection).order_by("__name__").limit(PAGE_SIZE)
+        if last is not None:
+            query = query.start_after(last)
+
+        docs = query.get()
+        if not docs:
+            return
+
+        yield docs
+        last = docs[-1]
+
+
+def migrate(db, collection, apply):
+    moved = skipped = conflicts = 0
+    batch = db.batch()
+    pending = 0
+
+    for page in iter_pages(db, collection):
+        for doc in page:
+            data = doc.to_dict()
+            target_id = phone_doc_id(data.get("phone"))
+
+            if not target_id or doc.id == target_id:
+                skipped += 1
+                continue
+
+            target = db.collection(collection).document(target_id)
+            if target.get().exists:
+                print(f"⚠️ {collection}/{doc.id}: {collection}/{target_id} already exists, skipping")
+                conflicts += 1
+                continue
+
+            print(f"➡️ {collection}/{doc.id} → {collection}/{target_id}")
+            moved += 1
+
+            if apply:
+                batch.create(target, data)
+                batch.delete(doc.reference)
+                pending += 2
+
+                if pending >= BATCH_LIMIT:
+                    batch.commit()
+                    batch = db.batch()
+                    pending = 0
+
+    if apply and pending:
+        batch.commit()
+
+    print(f"✅ {collection}: moved={moved} already_keyed_or_invalid={skipped} conflicts={conflicts}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--apply", action="store_true", help="write changes (default: dry run)")
+    args = parser.parse_args()
+
+    db = get_db()
+    for collection in (OWNERS, MECHANICS):
+        migrate(db, collection, args.apply)
+
+    if not args.apply:
+        print("Dry run only. Re-run with --apply to move documents.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""
+Tests run the real app on the in-memory engine (utils.memory_store).
+
+Run from backend/ (pip install pytest):
+    python -m pytest -q
+"""
+import os
+import sys
+
+# Before anything imports firebase: never touch a real project from tests
+os.environ["FIXIT_STORAGE"] = "memory"
+os.environ["RUN_SCHEDULER"] = "0"
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest  # noqa: E402
+
+from app import app as flask_app  # noqa: E402
+from firebase import get_db  # noqa: E402
+from utils import accounts  # noqa: E402
+from utils.dispatch import mechanic_index  # noqa: E402
+
+
+@pytest.fixture
+def db():
+    return get_db()
+
+
+@pytest.fixture(autouse=True)
+def clean_store():
+    """
+    Every test starts from an empty store and empty process caches.
+    """
+    client = get_db()
+    client.clear()
+    client.reset_counters()
+    accounts._profiles.clear()
+    mechanic_index.warm()
+    yield
+
+
+@pytest.fixture
+def client():
+    return flask_app.test_client()
+
+
+@pytest.fixture
+def app():
+    return flask_app
@@ -0,0 +1,155 @@
+"""
+POST /mechanic/accept/<id>: however many mechanics race, exactly one wins.
+"""
+import threading
+
+from utils import memory_store
+
+
+def _seed(db, mechanics):
+    db.collection("owners").document("o1").set({
+        "phone": "o1", "active_request_id": "r1"
+    })
+    for phone in mechanics:
+        db.collection("mechanics").document(phone).set({
+            "phone": phone, "verified": True, "is_available": True
+        })
+    db.collection("requests").document("r1").set({
+        "owner_phone": "o1", "status": "SEARCHING"
+    })
+
+
+def _assert_single_winner(db, results, mechanics):
+    winners = [phone for phone, status in results.items() if status == 200]
+    assert len(winners) == 1
+    assert all(status == 409 for phone, status in results.items() if phone not in winners)
+
+    req = db.collection("requests").document("r1").get().to_dict()
+    assert req["status"] == "ACCEPTED"
+    assert req["mechanic_phone"] == winners[0]
+
+    for phone in mechanics:
+        mechanic = db.collection("mechanics").document(phone).get().to_dict()
+        if phone == winners[0]:
+            assert mechanic["active_request_id"] == "r1"
+            assert mechanic["is_available"] is False
+        else:
+            assert not mechanic.get("active_request_id")
+            assert mechanic["is_available"] is True
+
+
+def test_concurrent_accept_has_one_winner(db, app):
+    mechanics = [f"m{i}" for i in range(8)]
+    _seed(db, mechanics)
+
+    start = threading.Barrier(len(mechanics))
+    results = {}
+
+    def accept(phone):
+        client = app.test_client()
+        start.wait()
+        response = client.post("/mechanic/accept/r1", json={"phone": phone})
+        results[phone] = response.status_code
+
+    threads = [threading.Thread(target=accept, args=(m,)) for m in mechanics]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    _assert_single_winner(db, results, mechanics)
+
+
+def test_accept_loses_to_a_commit_between_its_read_and_write(db, client, monkeypatch):
+    """
+    m2 accepts while m1's transaction is between its reads and its
+    commit: m1's commit aborts, the retry sees ACCEPTED and answers 409.
+    """
+    _seed(db, ["m1", "m2"])
+
+    results = {}
+    commit = memory_store.Transaction._commit
+
+    def interleaved(self):
+        if "m2" not in results:
+            results["m2"] = None        # m2's own commit goes straight through
+            results["m2"] = client.post(
+                "/mechanic/accept/r1", json={"phone": "m2"}
+            ).status_code
+        return commit(self)
+
+    monkeypatch.setattr(memory_store.Transaction, "_commit", interleaved)
+
+    response = client.post("/mechanic/accept/r1", json={"phone": "m1"})
+    results["m1"] = response.status_code
+
+    assert results == {"m1": 409, "m2": 200}
+    _assert_single_winner(db, results, ["m1", "m2"])
+
+
+def _assert_cancelled_and_released(db, mechanics):
+    req = db.collection("requests").document("r1").get().to_dict()
+    assert req["status"] == "CANCELLED"
+
+    owner = db.collection("owners").document("o1").get().to_dict()
+    assert owner["active_request_id"] is None
+
+    for phone in mechanics:
+        mechanic = db.collection("mechanics").document(phone).get().to_dict()
+        assert mechanic.get("active_request_id") != "r1"
+        assert mechanic["is_available"] is True
+
+
+def test_cancel_racing_accepts_leaves_no_mechanic_on_a_cancelled_job(db, app):
+    mechanics = [f"m{i}" for i in range(4)]
+    _seed(db, mechanics)
+
+    start = threading.Barrier(len(mechanics) + 1)
+    results = {}
+
+    def accept(phone):
+        client = app.test_client()
+        start.wait()
+        results[phone] = client.post("/mechanic/accept/r1", json={"phone": phone}).status_code
+
+    def cancel():
+        client = app.test_client()
+        start.wait()
+        results["cancel"] = client.post("/owner/request/cancel/r1", json={"phone": "o1"}).status_code
+
+    threads = [threading.Thread(target=accept, args=(m,)) for m in mechanics]
+    threads.append(threading.Thread(target=cancel))
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert results["cancel"] == 200
+    assert sum(1 for m in mechanics if results[m] == 200) <= 1
+    _assert_cancelled_and_released(db, mechanics)
+
+
+def test_cancel_releases_a_mechanic_who_accepted_after_its_read(db, client, monkeypatch):
+    """
+    m1 accepts while the cancel is between its read and its commit: the
+    cancel retries, sees ACCEPTED and releases m1 along with the request.
+    """
+    _seed(db, ["m1"])
+
+    results = {}
+    commit = memory_store.Transaction._commit
+
+    def interleaved(self):
+        if "m1" not in results:
+            results["m1"] = None        # the accept's own commit goes straight through
+            results["m1"] = client.post(
+                "/mechanic/accept/r1", json={"phone": "m1"}
+            ).status_code
+        return commit(self)
+
+    monkeypatch.setattr(memory_store.Transaction, "_commit", interleaved)
+
+    response = client.post("/owner/request/cancel/r1", json={"phone": "o1"})
+
+    assert (response.status_code, results["m1"]) == (200, 200)
+    _assert_cancelled_and_released(db, ["m1"])
@@ -0,0 +1,78 @@
+"""
+ETag / If-None-Match on the polled endpoints: unchanged polls get a
+header-only 304, any change gets a 200 with a new ETag.
+"""
+import pytest
+
+SKILLS = {"vehicle_types": ["CAR"], "service_types": ["BATTERY"]}
+
+
+@pytest.fixture
+def accounts(db):
+    db.collection("owners").document("o1").set({"phone": "o1", "name": "Owner"})
+    db.collection("mechanics").document("m1").set({
+        "phone": "m1",
+        "name": "Mechanic",
+        "verified": True,
+        "is_available": True,
+        "skills": SKILLS,
+        "location": {"lat": 12.97, "lng": 77.59}
+    })
+
+
+def _get(client, url, etag=None):
+    headers = {"If-None-Match": etag} if etag else {}
+    return client.get(url, headers=headers)
+
+
+def test_request_status_revalidates_on_version(client, db, accounts):
+    db.collection("requests").document("r1").set({
+        "owner_phone": "o1", "status": "SEARCHING"
+    })
+    url = "/owner/request/r1"
+
+    first = _get(client, url)
+    etag = first.headers["ETag"]
+    assert first.status_code == 200
+    assert etag.startswith("W/")
+
+    again = _get(client, url, etag)
+    assert again.status_code == 304
+    assert again.data == b""
+    assert again.headers["ETag"] == etag
+
+    db.collection("requests").document("r1").update({"status": "ACCEPTED"})
+
+    changed = _get(client, url, etag)
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+    assert changed.get_json()["status"] == "ACCEPTED"
+
+
+def test_missing_request_is_never_304(client):
+    response = _get(client, "/owner/request/nope", '"anything"')
+    assert response.status_code == 404
+
+
+def test_dashboard_304_until_a_nearby_request_appears(client, accounts):
+    url = "/mechanic/dashboard?phone=m1"
+
+    first = _get(client, url)
+    etag = first.headers["ETag"]
+    assert first.status_code == 200
+    assert first.get_json()["requests"] == []
+
+    assert _get(client, url, etag).status_code == 304
+
+    created = client.post("/owner/request/create", json={
+        "owner_phone": "o1", "vehicle_type": "car", "service_type": "battery",
+        "lat": 12.971, "lng": 77.591
+    })
+    assert created.status_code == 201
+
+    changed = _get(client, url, etag)
+    assert changed.status_code == 200
+    assert [r["request_id"] for r in changed.get_json()["requests"]] == [
+        created.get_json()["request_id"]
+    ]
+    assert changed.headers["ETag"] != etag
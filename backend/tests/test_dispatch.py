@@ -0,0 +1,88 @@
+"""
+MechanicIndex: warm-ups never expose a half-built index, refreshes are
+single-flight, and the offer table stays bounded.
+"""
+import threading
+
+from utils import memory_store
+from utils.dispatch import OFFER_TTL, MechanicIndex
+
+SKILLS = {"vehicle_types": ["CAR"], "service_types": ["BATTERY"]}
+
+
+def _mechanic(phone, lat=12.97, lng=77.59):
+    return {
+        "phone": phone, "verified": True, "is_available": True,
+        "skills": SKILLS, "location": {"lat": lat, "lng": lng}
+    }
+
+
+def _seed(db, count):
+    for i in range(count):
+        db.collection("mechanics").document(f"m{i}").set(_mechanic(f"m{i}"))
+
+
+def _ranked(index):
+    return [c["phone"] for c in index.rank(12.97, 77.59, 3, "CAR", "BATTERY", limit=100)]
+
+
+def test_warm_swaps_in_a_complete_index(db, monkeypatch):
+    _seed(db, 5)
+    index = MechanicIndex(db)
+    index.warm()
+
+    seen_during_query = []
+    stream = memory_store.Query.stream
+
+    def slow_query(self, *args, **kwargs):
+        # Index as rank() would see it while the warm query runs, plus
+        # a write-through that lands meanwhile
+        seen_during_query.append(index.stats()["mechanics"])
+        index.upsert(_mechanic("late"))
+        index.remove("m0")
+        return stream(self, *args, **kwargs)
+
+    monkeypatch.setattr(memory_store.Query, "stream", slow_query)
+    index.warm()
+
+    assert seen_during_query == [5]
+    assert sorted(_ranked(index)) == ["late", "m1", "m2", "m3", "m4"]
+
+
+def test_concurrent_refresh_runs_one_query(db):
+    _seed(db, 3)
+    index = MechanicIndex(db)
+    db.reset_counters()
+
+    start = threading.Barrier(8)
+    results = []
+
+    def rank():
+        start.wait()
+        results.append(len(_ranked(index)))
+
+    threads = [threading.Thread(target=rank) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert db.stats()["queries"] == 1
+    assert results == [3] * 8
+
+
+def test_offer_table_is_pruned(db):
+    now = [1000.0]
+    index = MechanicIndex(db, clock=lambda: now[0])
+    candidates = {"dispatch_candidates": [{"phone": "m1"}, {"phone": "m2"}]}
+
+    index.record_offers("r1", candidates)
+    index.release_offers("r1")
+    assert index._offers == {}
+
+    index.record_offers("r2", candidates)
+    now[0] += OFFER_TTL + 1
+    index.record_offers("r3", {"dispatch_candidates": [{"phone": "m3"}]})
+
+    assert list(index._offers) == ["m3"]
+    assert index.stats()["open_offers"] == 1
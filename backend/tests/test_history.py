@@ -0,0 +1,103 @@
+"""
+Cursor pagination of /owner/requests/history and /mechanic/jobs/history.
+"""
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from utils import memory_store
+
+BASE = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def closed_requests(db):
+    """
+    45 closed jobs, two per minute so created_at ties are ordered by ID.
+    """
+    ids = []
+    for i in range(45):
+        request_id = f"r{i:03d}"
+        created_at = BASE + timedelta(minutes=i // 2)
+        db.collection("requests").document(request_id).set({
+            "owner_phone": "o1",
+            "mechanic_phone": "m1",
+            "status": "COMPLETED",
+            "vehicle_type": "CAR",
+            "service_type": "BATTERY",
+            "description": "flat battery",
+            "created_at": created_at,
+            "completed_at": created_at
+        })
+        ids.append(request_id)
+
+    # A job of someone else and one still open: never listed
+    db.collection("requests").document("other").set({
+        "owner_phone": "o2", "mechanic_phone": "m2", "status": "COMPLETED",
+        "created_at": BASE
+    })
+    db.collection("requests").document("open").set({
+        "owner_phone": "o1", "mechanic_phone": "m1", "status": "IN_PROGRESS",
+        "created_at": BASE + timedelta(hours=1)
+    })
+    return ids
+
+
+def _walk(client, url, limit):
+    pages, cursor = [], None
+    while True:
+        query = f"{url}&limit={limit}" + (f"&cursor={cursor}" if cursor else "")
+        response = client.get(query)
+        assert response.status_code == 200
+
+        body = response.get_json()
+        pages.append([item["request_id"] for item in body["history"]])
+        cursor = body["next_cursor"]
+        if cursor is None:
+            return pages
+
+
+@pytest.mark.parametrize("url", [
+    "/owner/requests/history?phone=o1",
+    "/mechanic/jobs/history?phone=m1"
+])
+def test_pages_cover_every_job_once_newest_first(client, closed_requests, url):
+    pages = _walk(client, url, limit=20)
+
+    assert [len(page) for page in pages] == [20, 20, 5]
+    assert sum(pages, []) == sorted(closed_requests, reverse=True)
+
+
+def test_exact_multiple_ends_with_an_empty_page(client, closed_requests, db):
+    db.collection("requests").document("r044").delete()
+
+    pages = _walk(client, "/owner/requests/history?phone=o1", limit=11)
+
+    assert [len(page) for page in pages] == [11, 11, 11, 11, 0]
+
+
+def test_projected_fields_only(client, closed_requests):
+    body = client.get("/owner/requests/history?phone=o1&limit=1").get_json()
+
+    assert body["history"][0].keys() == {
+        "request_id", "vehicle_type", "service_type", "status",
+        "rating", "feedback", "completed_at"
+    }
+
+
+def test_bad_cursor_and_limit(client):
+    assert client.get("/owner/requests/history?phone=o1&cursor=zz").status_code == 400
+    assert client.get("/owner/requests/history?phone=o1&limit=0").status_code == 400
+    assert client.get("/owner/requests/history?phone=o1&limit=x").status_code == 400
+
+
+def test_failed_query_is_not_a_truncated_200(client, monkeypatch):
+    def missing_index(self, *args, **kwargs):
+        raise memory_store.FailedPrecondition("The query requires an index")
+
+    monkeypatch.setattr(memory_store.Query, "stream", missing_index)
+
+    response = client.get("/owner/requests/history?phone=o1")
+
+    assert response.status_code == 500
+    assert response.get_json() == {"error": "Failed to load history"}
@@ -0,0 +1,121 @@
+"""
+GET /mechanic/requests: SEARCHING requests in reach whose skill_key the
+mechanic can serve, from the geocell/skill_key query or the live board.
+"""
+import time
+
+import pytest
+
+from routes import mechanic as mechanic_routes
+from utils.board import RequestBoard
+from utils.geo import cells_covering, chunked, geo_fields
+from utils.request_logic import MAX_SEARCH_RADIUS_KM, skill_key
+
+HOME = (12.9700, 77.5900)
+
+
+def _request(db, request_id, lat, lng, vehicle="CAR", service="BATTERY",
+             status="SEARCHING", radius=3):
+    db.collection("requests").document(request_id).set({
+        "owner_phone": f"o-{request_id}",
+        "vehicle_type": vehicle,
+        "service_type": service,
+        "skill_key": skill_key(vehicle, service),
+        "owner_location": {"lat": lat, "lng": lng},
+        **geo_fields(lat, lng),
+        "search_radius_km": radius,
+        "status": status
+    })
+
+
+@pytest.fixture
+def requests(db):
+    db.collection("mechanics").document("m1").set({
+        "phone": "m1",
+        "verified": True,
+        "is_available": True,
+        "skills": {"vehicle_types": ["car", "bike"], "service_types": ["battery"]},
+        "location": {"lat": HOME[0], "lng": HOME[1]}
+    })
+
+    _request(db, "near", HOME[0] + 0.005, HOME[1])                  # ~0.6 km
+    _request(db, "bike", HOME[0], HOME[1] + 0.01, vehicle="BIKE")   # ~1.1 km
+    _request(db, "wide", HOME[0] + 0.06, HOME[1], radius=8)         # ~6.7 km, 8 km radius
+    _request(db, "far", HOME[0] + 0.06, HOME[1])                    # ~6.7 km, 3 km radius
+    _request(db, "tyre", HOME[0] + 0.005, HOME[1], service="TYRE")  # no such skill
+    _request(db, "taken", HOME[0] + 0.005, HOME[1], status="ACCEPTED")
+
+
+def _nearby(client):
+    response = client.get("/mechanic/requests?phone=m1")
+    assert response.status_code == 200
+    return {r["request_id"]: r for r in response.get_json()["requests"]}
+
+
+def test_query_returns_only_servable_requests_in_radius(client, requests):
+    found = _nearby(client)
+
+    assert set(found) == {"near", "bike", "wide"}
+    assert found["near"]["distance_km"] == pytest.approx(0.56, abs=0.01)
+
+
+def test_live_board_matches_the_query_without_reads(client, db, requests, monkeypatch):
+    board = RequestBoard(db)
+    board.start_listener()
+    monkeypatch.setattr(mechanic_routes, "request_board", board)
+
+    deadline = time.monotonic() + 2
+    while not board.healthy() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert board.healthy()
+
+    try:
+        db.reset_counters()
+        from_board = _nearby(client)
+        assert db.stats()["queries"] == 0
+
+        board._watch.unsubscribe()          # dead listener → direct query
+        from_query = _nearby(client)
+    finally:
+        board._watch.unsubscribe()
+
+    assert from_board == from_query
+    assert set(from_board) == {"near", "bike", "wide"}
+
+
+def test_mechanic_without_skills_is_rejected(client, db):
+    db.collection("mechanics").document("m2").set({
+        "phone": "m2", "verified": True, "is_available": True,
+        "skills": {}, "location": {"lat": HOME[0], "lng": HOME[1]}
+    })
+
+    response = client.get("/mechanic/requests?phone=m2")
+
+    assert response.status_code == 400
+
+
+def test_many_skills_cap_the_query_fan_out(client, db, requests):
+    db.collection("mechanics").document("m3").set({
+        "phone": "m3",
+        "verified": True,
+        "is_available": True,
+        "skills": {
+            "vehicle_types": ["car", "bike", "truck"],
+            "service_types": ["battery", "engine", "towing"]
+        },
+        "location": {"lat": HOME[0], "lng": HOME[1]}
+    })
+    _request(db, "truck", HOME[0], HOME[1] - 0.01, vehicle="TRUCK", service="TOWING")
+
+    db.reset_counters()
+    response = client.get("/mechanic/requests?phone=m3")
+
+    assert response.status_code == 200
+    # 9 skill keys × 36 cells would take 12 queries; geocell-only takes 2
+    cells = cells_covering(HOME[0], HOME[1], MAX_SEARCH_RADIUS_KM)
+    assert db.stats()["queries"] == len(list(chunked(cells)))
+    assert db.stats()["queries"] <= mechanic_routes.MAX_NEARBY_QUERIES
+    # "tyre" is in reach but not a skill of m3: filtered after the query
+    assert {r["request_id"] for r in response.get_json()["requests"]} == {
+        "near", "bike", "wide", "truck"
+    }
@@ -0,0 +1,77 @@
+"""
+ExpansionScheduler: rescans between full scans only read requests whose
+window is about to expire, and nothing due is missed.
+"""
+from datetime import datetime, timedelta, timezone
+
+from utils.request_logic import EXPANSION_INTERVAL
+from utils.scheduler import FULL_RESCAN_INTERVAL, ExpansionScheduler
+
+START = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+def _searching(db, request_id, timeout_at):
+    db.collection("requests").document(request_id).set({
+        "owner_phone": f"o-{request_id}",
+        "status": "SEARCHING",
+        "search_radius_km": 3,
+        "radius_expanded_count": 0,
+        "timeout_at": timeout_at
+    })
+
+
+def _status(db, request_id):
+    return db.collection("requests").document(request_id).get().to_dict()
+
+
+def test_rescans_read_only_requests_entering_the_window(db):
+    now = [START]
+    scheduler = ExpansionScheduler(db, clock=lambda: now[0])
+
+    # Plenty of open requests whose windows are far off
+    for i in range(50):
+        _searching(db, f"idle{i}", START + timedelta(seconds=EXPANSION_INTERVAL + i))
+
+    scheduler.tick()                        # first scan as leader reads them all
+    db.reset_counters()
+
+    for _ in range(EXPANSION_INTERVAL // scheduler.rescan_interval - 1):
+        now[0] += timedelta(seconds=scheduler.rescan_interval)
+        scheduler.tick()
+
+    # Windowed rescans only, and no request read twice by them
+    assert db.stats()["reads"] <= 50
+    assert db.stats()["queries"] == EXPANSION_INTERVAL // scheduler.rescan_interval - 1
+
+
+def test_request_created_between_rescans_is_expanded(db):
+    now = [START]
+    scheduler = ExpansionScheduler(db, clock=lambda: now[0])
+    scheduler.tick()
+
+    _searching(db, "new", START + timedelta(seconds=EXPANSION_INTERVAL))
+
+    while now[0] <= START + timedelta(seconds=EXPANSION_INTERVAL + 1):
+        now[0] += timedelta(seconds=1)
+        scheduler.tick()
+
+    req = _status(db, "new")
+    assert req["radius_expanded_count"] == 1
+    assert req["search_radius_km"] > 3
+
+
+def test_leadership_change_and_periodic_full_rescan(db):
+    now = [START]
+    scheduler = ExpansionScheduler(db, clock=lambda: now[0])
+    scheduler.tick()
+
+    # Overdue and outside every incremental window (e.g. written while
+    # this process was not the leader)
+    _searching(db, "stale", START - timedelta(seconds=5))
+    now[0] += timedelta(seconds=scheduler.rescan_interval)
+    scheduler.tick()
+    assert _status(db, "stale")["radius_expanded_count"] == 0
+
+    now[0] = START + timedelta(seconds=FULL_RESCAN_INTERVAL)
+    scheduler.tick()
+    assert _status(db, "stale")["radius_expanded_count"] == 1
@@ -0,0 +1,80 @@
+"""
+Location flush: small transactions, no writes onto closed jobs, and
+nothing lost when a write fails.
+"""
+import pytest
+
+from utils import tracking
+from utils.tracking import FLUSH_TXN_SIZE, LocationBuffer
+from utils.transactions import TransactionContention
+
+
+@pytest.fixture
+def buffer(db):
+    # Flushed by the tests only, not by its background thread
+    return LocationBuffer(db, flush_interval=3600)
+
+
+def _job(db, request_id, status="IN_PROGRESS"):
+    db.collection("requests").document(request_id).set({
+        "mechanic_phone": "m1", "status": status
+    })
+
+
+def _location(db, request_id):
+    return db.collection("requests").document(request_id).get().to_dict().get("mechanic_location")
+
+
+def test_closed_jobs_are_skipped(db, buffer):
+    _job(db, "open")
+    _job(db, "closed")
+    buffer.offer("open", 12.97, 77.59)
+    buffer.offer("closed", 12.97, 77.59)
+
+    # Closed by another worker after the ping was buffered
+    db.collection("requests").document("closed").update({"status": "COMPLETED"})
+
+    assert buffer.flush() == 1
+    assert _location(db, "open")["lat"] == 12.97
+    assert _location(db, "closed") is None
+
+
+def test_flush_uses_small_transactions(db, buffer, monkeypatch):
+    request_ids = [f"r{i}" for i in range(2 * FLUSH_TXN_SIZE + 5)]
+    for rid in request_ids:
+        _job(db, rid)
+        buffer.offer(rid, 12.97, 77.59)
+
+    sizes = []
+    run_transaction = tracking.run_transaction
+
+    def counting(fn, name, **kwargs):
+        def wrapped(transaction):
+            written = fn(transaction)
+            sizes.append(len(written))
+            return written
+        return run_transaction(wrapped, name, **kwargs)
+
+    monkeypatch.setattr(tracking, "run_transaction", counting)
+
+    assert buffer.flush() == len(request_ids)
+    assert sizes == [FLUSH_TXN_SIZE, FLUSH_TXN_SIZE, 5]
+
+
+def test_failed_write_is_requeued_unless_a_newer_ping_arrived(db, buffer, monkeypatch):
+    _job(db, "r1")
+    _job(db, "r2")
+    buffer.offer("r1", 12.97, 77.59)
+    buffer.offer("r2", 12.97, 77.59)
+
+    def contended(fn, name, **kwargs):
+        buffer.offer("r2", 12.98, 77.60)        # newer ping while the write fails
+        raise TransactionContention(name)
+
+    monkeypatch.setattr(tracking, "run_transaction", contended)
+    assert buffer.flush() == 0
+    monkeypatch.undo()
+
+    assert buffer.flush() == 2
+    assert _location(db, "r1")["lat"] == 12.97
+    assert _location(db, "r2")["lat"] == 12.98
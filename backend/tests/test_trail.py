@@ -0,0 +1,63 @@
+"""
+Route trail: chunked writes within Firestore's batch limit, and replay
+in time order across chunks from different workers.
+"""
+from utils import memory_store
+from utils.trail import BATCH_LIMIT, TrailRecorder, iter_trail
+
+
+def _chunks_written(db, request_ids):
+    return sum(
+        len(db.collection("requests").document(rid).collection("trail").get())
+        for rid in request_ids
+    )
+
+
+def test_more_due_chunks_than_one_batch_all_drain(db):
+    recorder = TrailRecorder(db, clock=lambda: 2000)
+    request_ids = [f"r{i}" for i in range(BATCH_LIMIT + 100)]
+    for rid in request_ids:
+        recorder.add(rid, 12.97, 77.59, ts=1000)       # older than CHUNK_MAX_AGE → due
+
+    assert recorder.write() == len(request_ids)
+    assert recorder.pending() == 0
+    assert _chunks_written(db, request_ids) == len(request_ids)
+
+
+def test_failed_batch_puts_back_only_its_own_points(db, monkeypatch):
+    recorder = TrailRecorder(db, clock=lambda: 2000)
+    request_ids = [f"r{i}" for i in range(BATCH_LIMIT + 100)]
+    for rid in request_ids:
+        recorder.add(rid, 12.97, 77.59, ts=1000)
+
+    commits = []
+    commit = memory_store.WriteBatch.commit
+
+    def second_fails(self, **kwargs):
+        commits.append(self)
+        if len(commits) == 2:
+            raise memory_store.Aborted("unavailable")
+        return commit(self, **kwargs)
+
+    monkeypatch.setattr(memory_store.WriteBatch, "commit", second_fails)
+
+    assert recorder.write() == BATCH_LIMIT
+    assert recorder.pending() == 100
+
+    assert recorder.write() == 100
+    assert recorder.pending() == 0
+    assert _chunks_written(db, request_ids) == len(request_ids)
+
+
+def test_replay_merges_overlapping_chunks_by_time(db):
+    first, second = TrailRecorder(db), TrailRecorder(db)
+    for i in range(0, 20, 2):
+        first.add("r1", 12.97 + i * 1e-4, 77.59, ts=1000 + i)
+    for i in range(1, 20, 2):
+        second.add("r1", 12.97 + i * 1e-4, 77.59, ts=1000 + i)
+    first.flush()
+    second.flush()
+
+    assert [ts for _, _, ts in iter_trail("r1")] == list(range(1000, 1020))
+    assert [ts for _, _, ts in iter_trail("r1", interval=5)] == [1000, 1005, 1010, 1015]
+    assert [ts for _, _, ts in iter_trail("r1", since=1015)] == list(range(1015, 1020))
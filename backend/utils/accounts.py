@@ -0,0 +1,197 @@
+"""
+Phone → owner / mechanic document lookup.
+
+New accounts are stored with the phone number as the document ID, so a
+lookup is a direct point read instead of a `where("phone", "==", ...)`
+query. Accounts created before that (random IDs) are still found through
+the old query, and scripts/migrate_phone_ids.py moves them over.
+
+Resolved references are cached per process; `get_*_ref` returns a cached
+reference with no read at all. A ref can only go stale if a document is
+moved by the migration script — stale refs are dropped on the next
+`get_*_doc`, and processes should be restarted after running the migration.
+
+Profile data is cached separately (LRU + TTL). Write endpoints in this
+process invalidate it via `invalidate_owner` / `invalidate_mechanic`;
+other processes see the change after PROFILE_CACHE_TTL, or immediately
+when the optional snapshot listener is running.
+"""
+import os
+
+from firebase import get_db
+from utils.cache import LRUCache
+
+db = get_db()
+
+OWNERS = "owners"
+MECHANICS = "mechanics"
+
+REF_CACHE_SIZE = 10000
+
+# Profile data (name, skills, verified, availability...) — read-only copies
+PROFILE_CACHE_SIZE = 5000
+PROFILE_CACHE_TTL = float(os.environ.get("PROFILE_CACHE_TTL", 30))   # seconds
+
+_refs = LRUCache(REF_CACHE_SIZE)
+_profiles = LRUCache(PROFILE_CACHE_SIZE, ttl=PROFILE_CACHE_TTL)
+
+
+def phone_doc_id(phone):
+    """
+    Document ID for a phone number, or None if it can't be used as one.
+    """
+    if not isinstance(phone, str) or not phone:
+        return None
+    if "/" in phone or phone in (".", "..") or phone.startswith("__"):
+        return None
+    return phone
+
+
+def find_account(collection, phone, transaction=None):
+    """
+    DocumentSnapshot for the account with this phone, or None.
+    """
+    if not phone:
+        return None
+
+    key = (collection, phone)
+
+    # 1️⃣ CACHED REF → point read
+    ref = _refs.get(key)
+    if ref is not None:
+        snap = ref.get(transaction=transaction)
+        if snap.exists and snap.get("phone") == phone:
+            _profiles.set(key, snap.to_dict())
+            return snap
+        _refs.pop(key)
+
+    # 2️⃣ PHONE-KEYED DOC → point read
+    doc_id = phone_doc_id(phone)
+    if doc_id:
+        snap = db.collection(collection).document(doc_id).get(transaction=transaction)
+        if snap.exists:
+            _refs.set(key, snap.reference)
+            _profiles.set(key, snap.to_dict())
+            return snap
+
+    # 3️⃣ LEGACY (random ID) → query
+    docs = (
+        db.collection(collection)
+        .where("phone", "==", phone)
+        .limit(1)
+        .get(transaction=transaction)
+    )
+    if not docs:
+        return None
+
+    _refs.set(key, docs[0].reference)
+    _profiles.set(key, docs[0].to_dict())
+    return docs[0]
+
+
+def account_ref(collection, phone):
+    """
+    DocumentReference for the account (no read on cache hit), or None.
+    """
+    if not phone:
+        return None
+
+    ref = _refs.get((collection, phone))
+    if ref is not None:
+        return ref
+
+    snap = find_account(collection, phone)
+    return snap.reference if snap else None
+
+
+def new_account_ref(collection, phone):
+    """
+    Reference a new account should be created at (phone-keyed when possible).
+    """
+    doc_id = phone_doc_id(phone)
+    if doc_id:
+        return db.collection(collection).document(doc_id)
+    return db.collection(collection).document()
+
+
+def get_profile(collection, phone):
+    """
+    Cached account data (dict, treat as read-only), or None.
+    May be up to PROFILE_CACHE_TTL seconds stale for changes made by
+    other processes; use get_*_doc where a fresh read matters.
+    """
+    if not phone:
+        return None
+
+    profile = _profiles.get((collection, phone))
+    if profile is not None:
+        return profile
+
+    snap = find_account(collection, phone)
+    return snap.to_dict() if snap else None
+
+
+def invalidate_profile(collection, phone):
+    """
+    Call after writing to an account document.
+    """
+    if phone:
+        _profiles.pop((collection, phone))
+
+
+def get_owner_doc(phone, transaction=None):
+    return find_account(OWNERS, phone, transaction)
+
+
+def get_mechanic_doc(phone, transaction=None):
+    return find_account(MECHANICS, phone, transaction)
+
+
+def get_owner_ref(phone):
+    return account_ref(OWNERS, phone)
+
+
+def get_mechanic_ref(phone):
+    return account_ref(MECHANICS, phone)
+
+
+def get_owner_profile(phone):
+    return get_profile(OWNERS, phone)
+
+
+def get_mechanic_profile(phone):
+    return get_profile(MECHANICS, phone)
+
+
+def invalidate_owner(phone):
+    invalidate_profile(OWNERS, phone)
+
+
+def invalidate_mechanic(phone):
+    invalidate_profile(MECHANICS, phone)
+
+
+def start_profile_listener():
+    """
+    Cross-process invalidation: drop cached profiles whenever an owner or
+    mechanic document changes anywhere. Opt-in (PROFILE_CACHE_LISTENER=1)
+    since the initial snapshot reads both collections once per process.
+    """
+    def on_change(collection):
+        def callback(doc_snapshots, changes, read_time):
+            for change in changes:
+                phone = change.document.get("phone")
+                invalidate_profile(collection, phone)
+        return callback
+
+    return [
+        db.collection(collection).on_snapshot(on_change(collection))
+        for collection in (OWNERS, MECHANICS)
+    ]
+
+
+def cache_stats():
+    return {
+        "profiles": _profiles.stats(),
+        "refs": _refs.stats()
+    }
@@ -0,0 +1,251 @@
+"""
+Live board of open (SEARCHING) requests, served from memory.
+
+Every /mechanic/requests poll used to rebuild the same view with
+Firestore queries. RequestBoard keeps it in process instead: one
+snapshot listener on SEARCHING requests feeds entries keyed by request
+ID and bucketed by geocell, then skill_key, so a poll is a dict lookup
+over the cells and skills the mechanic can serve.
+
+Each worker process holds one board and one listener. The initial
+snapshot reads every SEARCHING request once, then each change costs one
+read per process, however many mechanics poll.
+
+Consistency:
+- Changes normally land within the listener's latency (about a second).
+  A request accepted elsewhere can still be listed for that long;
+  accepting it is transactional and answers 409.
+- Firestore reconnects a dropped listener by itself. So that a listener
+  that silently stops delivering can't leave the board wrong for long,
+  the board is re-read with one query every RESYNC_SECONDS. That is the
+  maximum staleness.
+- lookup() returns None (caller reads Firestore directly) until the
+  initial snapshot arrives, once the listener is closed or errored, and
+  when a resync fails or is overdue by more than RESYNC_SECONDS.
+
+Opt-in: REQUEST_BOARD=1 (see app.py).
+"""
+import os
+import threading
+import time
+
+from firebase import get_db
+from utils import metrics
+from utils.request_logic import skill_key
+
+db = get_db()
+
+RESYNC_SECONDS = int(os.environ.get("BOARD_RESYNC_SECONDS", 300))
+RESYNC_RETRY_SECONDS = 10     # after a failed resync (direct reads meanwhile)
+
+
+def _entry(request_id, req, update_time):
+    loc = req.get("owner_location") or {}
+    if loc.get("lat") is None or loc.get("lng") is None or not req.get("geocell"):
+        return None
+
+    return {
+        "request_id": request_id,
+        "vehicle_type": req.get("vehicle_type"),
+        "service_type": req.get("service_type"),
+        "skill_key": skill_key(req.get("vehicle_type"), req.get("service_type")),
+        "cell": req["geocell"],
+        "owner_location": {"lat": loc["lat"], "lng": loc["lng"]},
+        "search_radius_km": req.get("search_radius_km", 3),
+        "description": req.get("description", ""),
+        "update_time": update_time
+    }
+
+
+class RequestBoard:
+    """
+    SEARCHING requests keyed by ID, bucketed by geocell → skill_key.
+    """
+
+    def __init__(self, db, clock=time.monotonic, resync=RESYNC_SECONDS):
+        self.db = db
+        self.clock = clock
+        self.resync_interval = resync
+
+        self._lock = threading.Lock()
+        self._resync_lock = threading.Lock()
+        self._entries = {}          # request_id -> entry
+        self._cells = {}            # geocell -> {skill_key -> set(request_id)}
+
+        self._watch = None
+        self._synced_at = None      # initial snapshot / last successful resync
+        self._next_resync = None
+        self._resync_failed = False
+        self._touched = None        # IDs the listener applied while a resync query runs
+
+    # ---------- maintenance ----------
+
+    def _query(self):
+        return self.db.collection("requests").where("status", "==", "SEARCHING")
+
+    def _put(self, entry):
+        self._discard(entry["request_id"])
+        self._entries[entry["request_id"]] = entry
+        self._cells.setdefault(entry["cell"], {}).setdefault(
+            entry["skill_key"], set()
+        ).add(entry["request_id"])
+
+    def _discard(self, request_id):
+        old = self._entries.pop(request_id, None)
+        if not old:
+            return
+        skills = self._cells.get(old["cell"], {})
+        bucket = skills.get(old["skill_key"])
+        if bucket is not None:
+            bucket.discard(request_id)
+            if not bucket:
+                del skills[old["skill_key"]]
+            if not skills:
+                self._cells.pop(old["cell"], None)
+
+    def apply(self, request_id, req, update_time=None):
+        """
+        Upsert (req is a SEARCHING request dict) or remove (req is None).
+        """
+        entry = _entry(request_id, req, update_time) if req else None
+
+        with self._lock:
+            if self._touched is not None:
+                self._touched.add(request_id)
+
+            if entry is None:
+                self._discard(request_id)
+                return
+
+            old = self._entries.get(request_id)
+            if old and old["update_time"] and update_time and old["update_time"] > update_time:
+                return
+            self._put(entry)
+
+    def start_listener(self):
+        """
+        Keep the board live from a snapshot listener on SEARCHING requests.
+        """
+        def callback(doc_snapshots, changes, read_time):
+            for change in changes:
+                doc = change.document
+                if change.type.name == "REMOVED":
+                    self.apply(doc.id, None)
+                else:
+                    self.apply(doc.id, doc.to_dict(), doc.update_time)
+
+            if self._synced_at is None:
+                self._synced_at = self.clock()
+                self._next_resync = self._synced_at + self.resync_interval
+                print(f"📋 REQUEST BOARD LIVE: {len(self._entries)} open requests")
+
+        self._watch = self._query().on_snapshot(callback)
+        return self._watch
+
+    def resync(self):
+        """
+        Re-read every SEARCHING request with one query. Requests the
+        listener touched while the query ran keep the listener's version.
+        """
+        started = self.clock()
+        with self._lock:
+            self._touched = set()
+
+        try:
+            docs = self._query().get()
+        except Exception as e:
+            print("📋 REQUEST BOARD RESYNC ERROR:", e)
+            metrics.incr("board_resync_errors")
+            with self._lock:
+                self._touched = None
+            self._resync_failed = True
+            self._next_resync = self.clock() + RESYNC_RETRY_SECONDS
+            return False
+
+        with self._lock:
+            touched, self._touched = self._touched, None
+            seen = set()
+            for doc in docs:
+                if doc.id in touched:
+                    continue
+                seen.add(doc.id)
+                entry = _entry(doc.id, doc.to_dict(), doc.update_time)
+                if entry is None:
+                    self._discard(doc.id)
+                else:
+                    self._put(entry)
+
+            for request_id in [r for r in self._entries if r not in seen and r not in touched]:
+                self._discard(request_id)
+
+        self._synced_at = started
+        self._next_resync = started + self.resync_interval
+        self._resync_failed = False
+        metrics.incr("board_resyncs")
+        return True
+
+    # ---------- reads ----------
+
+    def healthy(self):
+        if self._watch is None or self._synced_at is None or self._resync_failed:
+            return False
+        if not getattr(self._watch, "is_active", True):
+            return False
+        return self.clock() - self._synced_at < 2 * self.resync_interval
+
+    def _maybe_resync(self):
+        if self._next_resync is None or self.clock() < self._next_resync:
+            return
+        # One caller re-reads; the rest keep serving the current board
+        if self._resync_lock.acquire(blocking=False):
+            try:
+                self.resync()
+            finally:
+                self._resync_lock.release()
+
+    def lookup(self, cells, keys):
+        """
+        Entries in `cells` whose skill_key is in `keys`, or None when the
+        board can't be trusted (caller falls back to Firestore).
+        """
+        if self._watch is None:
+            return None
+
+        self._maybe_resync()
+        if not self.healthy():
+            metrics.incr("board_fallbacks")
+            return None
+
+        found = []
+        with self._lock:
+            for cell in cells:
+                skills = self._cells.get(cell)
+                if not skills:
+                    continue
+                for key in keys:
+                    for request_id in skills.get(key, ()):
+                        found.append(self._entries[request_id])
+
+        metrics.incr("board_lookups")
+        return found
+
+    def stats(self):
+        with self._lock:
+            return {
+                "requests": len(self._entries),
+                "cells": len(self._cells),
+                "listening": self._watch is not None,
+                "healthy": self.healthy(),
+                "synced_seconds_ago": (
+                    round(self.clock() - self._synced_at, 1)
+                    if self._synced_at is not None else None
+                ),
+                "resync_seconds": self.resync_interval
+            }
+
+
+request_board = RequestBoard(db)
+
+
+def start_board_listener():
+    return request_board.start_listener()
@@ -0,0 +1,63 @@
+"""
+ETag / If-None-Match helpers for polled GET endpoints.
+
+Responses carry `Cache-Control: no-cache`, so browsers always revalidate
+and an unchanged poll costs a header-only 304.
+
+Two kinds of tag:
+- json_etag: hash of the payload (built first, then compared)
+- version_etag: weak tag from the documents' update_time, so a matching
+  poll is answered by not_modified() before any payload is built
+"""
+import hashlib
+import json
+
+from flask import Response, jsonify, request
+
+
+def json_etag(payload):
+    """
+    Strong ETag from the payload's content.
+    """
+    raw = json.dumps(payload, sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+
+def version_etag(*snapshots):
+    """
+    Weak ETag from the snapshots' update_time, or None if any lacks one.
+    """
+    parts = []
+    for snap in snapshots:
+        update_time = getattr(snap, "update_time", None)
+        if update_time is None:
+            return None
+        parts.append(f"{snap.id}@{update_time.isoformat()}")
+
+    return hashlib.sha1("|".join(parts).encode()).hexdigest()
+
+
+def not_modified(etag):
+    """
+    Header-only 304 if the client's If-None-Match matches, else None.
+    """
+    if not etag or not request.if_none_match.contains_weak(etag):
+        return None
+
+    response = Response(status=304)
+    response.set_etag(etag, weak=True)
+    response.headers["Cache-Control"] = "no-cache"
+    return response
+
+
+def conditional_json(payload, etag=None, weak=False):
+    """
+    200 with the payload and an ETag, or 304 if the client already has it.
+    """
+    response = jsonify(payload)
+    if etag:
+        response.set_etag(etag, weak=weak)
+    else:
+        response.set_etag(json_etag(payload))
+    response.headers["Cache-Control"] = "no-cache"
+    return response.make_conditional(request)
@@ -0,0 +1,333 @@
+"""
+Push-based matching: rank available mechanics for a request and write
+the top candidates onto the request as offers.
+
+Instead of every online mechanic scanning every SEARCHING request, each
+request does one lookup in an in-memory spatial index of available
+mechanics (bucketed by geocell) when it is created and again on every
+radius expansion. Mechanics then read only the requests offered to them
+(GET /mechanic/offers).
+
+The index is per process. It is warmed with one query and re-warmed every
+INDEX_REFRESH seconds; routes in this process write through on
+availability changes, and start_index_listener() (DISPATCH_LISTENER=1)
+keeps it live across processes instead.
+"""
+import threading
+import time
+
+from firebase import get_db
+from utils import metrics
+from utils.geo import haversine_many, geohash_encode, cells_covering, GEOCELL_PRECISION
+
+db = get_db()
+
+MAX_OFFERS = 5
+INDEX_REFRESH = 60          # seconds between warm-up queries (no listener)
+OFFER_TTL = 120             # seconds an offer counts towards a mechanic's load
+
+NEUTRAL_RATING = 4.0        # for mechanics with no ratings yet
+RATING_WEIGHT = 1.0         # km of distance one rating star is worth
+LOAD_WEIGHT = 1.5           # km of distance one open offer is worth
+
+
+def _skills(mechanic):
+    skills = mechanic.get("skills") or {}
+    return (
+        {v.upper() for v in skills.get("vehicle_types", [])},
+        {s.upper() for s in skills.get("service_types", [])}
+    )
+
+
+def is_dispatchable(mechanic):
+    return bool(
+        mechanic
+        and mechanic.get("verified")
+        and mechanic.get("is_available")
+        and not mechanic.get("active_request_id")
+        and mechanic.get("location")
+    )
+
+
+def _entry(mechanic):
+    """
+    Index entry for a dispatchable mechanic, else None.
+    """
+    if not is_dispatchable(mechanic) or not mechanic.get("phone"):
+        return None
+
+    loc = mechanic["location"]
+    vehicles, services = _skills(mechanic)
+    return {
+        "phone": mechanic["phone"],
+        "lat": loc["lat"],
+        "lng": loc["lng"],
+        "cell": geohash_encode(loc["lat"], loc["lng"], GEOCELL_PRECISION),
+        "vehicle_types": vehicles,
+        "service_types": services,
+        "rating": mechanic.get("avg_rating") or NEUTRAL_RATING
+    }
+
+
+def _place(entries, cells, entry):
+    entries[entry["phone"]] = entry
+    cells.setdefault(entry["cell"], set()).add(entry["phone"])
+
+
+def _discard(entries, cells, phone):
+    old = entries.pop(phone, None)
+    if old:
+        bucket = cells.get(old["cell"])
+        if bucket:
+            bucket.discard(phone)
+            if not bucket:
+                del cells[old["cell"]]
+
+
+class MechanicIndex:
+    """
+    Available mechanics keyed by phone and bucketed by geocell.
+    """
+
+    def __init__(self, db, clock=time.monotonic, refresh=INDEX_REFRESH):
+        self.db = db
+        self.clock = clock
+        self.refresh = refresh
+        self.listening = False
+
+        self._lock = threading.Lock()
+        self._warm_lock = threading.Lock()
+        self._entries = {}          # phone -> entry dict
+        self._cells = {}            # geocell -> set(phone)
+        self._offers = {}           # phone -> {request_id: expires_at}
+        self._warmed_at = None
+        self._touched = None        # phones upserted / removed while a warm query runs
+
+    # ---------- index maintenance ----------
+
+    def upsert(self, mechanic):
+        phone = mechanic.get("phone") if mechanic else None
+        if not phone:
+            return
+
+        entry = _entry(mechanic)
+        with self._lock:
+            if self._touched is not None:
+                self._touched.add(phone)
+            _discard(self._entries, self._cells, phone)
+            if entry is not None:
+                _place(self._entries, self._cells, entry)
+
+    def remove(self, phone):
+        with self._lock:
+            if self._touched is not None:
+                self._touched.add(phone)
+            _discard(self._entries, self._cells, phone)
+
+    def warm(self):
+        """
+        Rebuild the index from one query. The new index is built aside
+        and swapped in whole, so rank() never sees it half-filled; phones
+        written through while the query ran keep their newer state.
+        """
+        with self._lock:
+            self._touched = set()
+
+        try:
+            docs = (
+                self.db.collection("mechanics")
+                .where("is_available", "==", True)
+                .get()
+            )
+        except Exception:
+            with self._lock:
+                self._touched = None
+            raise
+
+        entries, cells = {}, {}
+        for doc in docs:
+            entry = _entry(doc.to_dict())
+            if entry is not None:
+                _place(entries, cells, entry)
+
+        with self._lock:
+            touched, self._touched = self._touched, None
+            for phone in touched:
+                _discard(entries, cells, phone)
+                if phone in self._entries:
+                    _place(entries, cells, self._entries[phone])
+            self._entries, self._cells = entries, cells
+
+        self._warmed_at = self.clock()
+        metrics.incr("dispatch_index_warms")
+
+    def _ensure_fresh(self):
+        if self.listening:
+            return
+        if self._warmed_at is not None and self.clock() - self._warmed_at < self.refresh:
+            return
+
+        # One caller re-warms; the rest rank on the current index, or
+        # wait for the first warm when there is no index yet
+        if self._warm_lock.acquire(blocking=self._warmed_at is None):
+            try:
+                if self._warmed_at is None or self.clock() - self._warmed_at >= self.refresh:
+                    self.warm()
+            finally:
+                self._warm_lock.release()
+
+    def start_listener(self):
+        """
+        Keep the index live from a snapshot listener on available mechanics.
+        """
+        def callback(doc_snapshots, changes, read_time):
+            for change in changes:
+                data = change.document.to_dict() or {}
+                if change.type.name == "REMOVED":
+                    self.remove(data.get("phone"))
+                else:
+                    self.upsert(data)
+
+        watch = (
+            self.db.collection("mechanics")
+            .where("is_available", "==", True)
+            .on_snapshot(callback)
+        )
+        self.listening = True
+        return watch
+
+    # ---------- load ----------
+
+    def _load(self, phone, now):
+        offers = self._offers.get(phone)
+        if not offers:
+            return 0
+        for request_id in [r for r, exp in offers.items() if exp <= now]:
+            del offers[request_id]
+        return len(offers)
+
+    def _prune_offers(self, now):
+        for phone in list(self._offers):
+            if not self._load(phone, now):
+                del self._offers[phone]
+
+    def record_offers(self, request_id, fields):
+        """
+        Count the offers in `fields` (from dispatch()) towards each
+        mechanic's load. Call once, after the fields are committed.
+        Expired offers are dropped here, so the table stays bounded.
+        """
+        phones = [c["phone"] for c in fields.get("dispatch_candidates") or []]
+        with self._lock:
+            now = self.clock()
+            self._prune_offers(now)
+            for phone in phones:
+                self._offers.setdefault(phone, {})[request_id] = now + OFFER_TTL
+        metrics.incr("dispatches")
+
+    def release_offers(self, request_id):
+        with self._lock:
+            for phone in list(self._offers):
+                offers = self._offers[phone]
+                offers.pop(request_id, None)
+                if not offers:
+                    del self._offers[phone]
+
+    # ---------- ranking ----------
+
+    def rank(self, lat, lng, radius_km, vehicle_type, service_type, limit=MAX_OFFERS):
+        """
+        Ranked candidates within radius_km that have the required skills.
+        Lower score is better: distance, plus penalties for a low rating
+        and for offers already outstanding.
+        """
+        self._ensure_fresh()
+        vehicle_type = (vehicle_type or "").upper()
+        service_type = (service_type or "").upper()
+        now = self.clock()
+
+        skilled = []
+        with self._lock:
+            for cell in cells_covering(lat, lng, radius_km):
+                for phone in self._cells.get(cell, ()):
+                    entry = self._entries[phone]
+
+                    if vehicle_type not in entry["vehicle_types"]:
+                        continue
+                    if service_type not in entry["service_types"]:
+                        continue
+
+                    skilled.append((entry, self._load(phone, now)))
+
+        distances, in_radius = haversine_many(
+            lat, lng,
+            [entry["lat"] for entry, _ in skilled],
+            [entry["lng"] for entry, _ in skilled],
+            radius_km=radius_km
+        )
+
+        candidates = []
+        for (entry, load), distance, ok in zip(skilled, distances, in_radius):
+            if not ok:
+                continue
+
+            distance = float(distance)
+            score = (
+                distance
+                + RATING_WEIGHT * (5 - entry["rating"])
+                + LOAD_WEIGHT * load
+            )
+            candidates.append({
+                "phone": entry["phone"],
+                "distance_km": round(distance, 2),
+                "rating": entry["rating"],
+                "load": load,
+                "score": round(score, 3)
+            })
+
+        candidates.sort(key=lambda c: c["score"])
+        return candidates[:limit]
+
+    def dispatch(self, req, radius_km=None):
+        """
+        Fields to write onto the request: ranked candidates plus the
+        `offered_to` array mechanics query with array_contains.
+
+        No side effects, so it is safe inside a transaction that may be
+        retried; call record_offers() after the commit.
+        """
+        loc = req.get("owner_location") or {}
+        if loc.get("lat") is None or loc.get("lng") is None:
+            return {}
+
+        radius_km = radius_km or req.get("search_radius_km")
+        candidates = self.rank(
+            loc["lat"], loc["lng"], radius_km,
+            req.get("vehicle_type"), req.get("service_type")
+        )
+
+        # Mechanics offered at a smaller radius keep their offer
+        previous = list(req.get("offered_to") or [])
+        phones = [c["phone"] for c in candidates]
+        offered_to = previous + [p for p in phones if p not in previous]
+
+        return {
+            "dispatch_candidates": candidates,
+            "offered_to": offered_to
+        }
+
+    def stats(self):
+        with self._lock:
+            return {
+                "mechanics": len(self._entries),
+                "cells": len(self._cells),
+                "listening": self.listening,
+                "open_offers": sum(len(o) for o in self._offers.values())
+            }
+
+
+mechanic_index = MechanicIndex(db)
+
+
+def start_index_listener():
+    return mechanic_index.start_listener()
@@ -0,0 +1,150 @@
+"""
+Server-side ETA for the owner status payload.
+
+    eta = road_distance(mechanic → owner) / recent mechanic speed
+
+Speed comes from the job's location trail (utils.trail): points still
+buffered in this process, else the last written chunk. Road distance is
+pluggable; the default is haversine × a detour factor. Set
+ETA_DISTANCE_MODEL to pick another registered model.
+
+Results are memoised per request and only recomputed when the mechanic
+moved more than RECOMPUTE_METERS or the estimate is older than
+ETA_MAX_AGE, so every viewer polling the same job gets the same ETA
+without repeating the work.
+"""
+import os
+from datetime import datetime, timezone
+
+from utils.cache import LRUCache
+from utils.geo import haversine
+from utils.trail import trail_recorder, latest_points
+
+ETA_CACHE_SIZE = 5000
+ETA_MAX_AGE = 60            # seconds
+RECOMPUTE_METERS = 50
+
+SPEED_WINDOW = 180          # seconds of trail used for the speed estimate
+DEFAULT_SPEED_KMH = 25      # city driving, used without enough trail
+MIN_SPEED_KMH = 8           # stopped at a signal ≠ never arriving
+MAX_SPEED_KMH = 60
+
+DETOUR_FACTOR = 1.3         # typical road / straight-line ratio in cities
+
+
+# ---------- distance models ----------
+
+class HaversineModel:
+    name = "haversine"
+
+    def __init__(self, detour_factor=DETOUR_FACTOR):
+        self.detour_factor = detour_factor
+
+    def distance_km(self, origin, destination):
+        return haversine(
+            origin["lat"], origin["lng"],
+            destination["lat"], destination["lng"]
+        ) * self.detour_factor
+
+
+_models = {}
+
+
+def register_model(model):
+    """
+    A model needs a `name` and distance_km(origin, destination) where
+    both are {"lat", "lng"} dicts.
+    """
+    _models[model.name] = model
+
+
+register_model(HaversineModel())
+
+
+def get_model():
+    name = os.environ.get("ETA_DISTANCE_MODEL", HaversineModel.name)
+    return _models.get(name) or _models[HaversineModel.name]
+
+
+# ---------- speed ----------
+
+def estimate_speed_kmh(points, window=SPEED_WINDOW):
+    """
+    Path speed over the last `window` seconds of (lat, lng, ts) points,
+    clamped to [MIN_SPEED_KMH, MAX_SPEED_KMH]. None without enough data.
+    """
+    if len(points) < 2:
+        return None
+
+    end_ts = points[-1][2]
+    recent = [p for p in points if p[2] >= end_ts - window]
+    if len(recent) < 2:
+        return None
+
+    elapsed_h = (recent[-1][2] - recent[0][2]) / 3600
+    if elapsed_h <= 0:
+        return None
+
+    path_km = sum(
+        haversine(a[0], a[1], b[0], b[1])
+        for a, b in zip(recent, recent[1:])
+    )
+
+    return min(max(path_km / elapsed_h, MIN_SPEED_KMH), MAX_SPEED_KMH)
+
+
+def _recent_points(request_id):
+    points = trail_recorder.recent(request_id)
+    if len(points) >= 2:
+        return points
+    # The last chunk may come from another worker and overlap ours in time
+    return sorted(latest_points(request_id) + points, key=lambda p: p[2])
+
+
+# ---------- memoised estimate ----------
+
+_cache = LRUCache(ETA_CACHE_SIZE, ttl=ETA_MAX_AGE)
+
+
+def get_eta(request_id, mechanic_location, owner_location):
+    """
+    {"minutes", "distance_km", "speed_kmh", "model", "computed_at"}
+    or None when either location is missing.
+    """
+    if not mechanic_location or not owner_location:
+        return None
+    if mechanic_location.get("lat") is None or owner_location.get("lat") is None:
+        return None
+
+    cached = _cache.get(request_id)
+    if cached is not None:
+        anchor, eta = cached
+        moved_m = haversine(
+            anchor["lat"], anchor["lng"],
+            mechanic_location["lat"], mechanic_location["lng"]
+        ) * 1000
+        if moved_m < RECOMPUTE_METERS:
+            return eta
+
+    model = get_model()
+    distance_km = model.distance_km(mechanic_location, owner_location)
+    speed_kmh = estimate_speed_kmh(_recent_points(request_id)) or DEFAULT_SPEED_KMH
+
+    eta = {
+        "minutes": max(1, round(distance_km / speed_kmh * 60)),
+        "distance_km": round(distance_km, 2),
+        "speed_kmh": round(speed_kmh, 1),
+        "model": model.name,
+        "computed_at": datetime.now(timezone.utc).isoformat()
+    }
+
+    _cache.set(request_id, (dict(mechanic_location), eta))
+    return eta
+
+
+def forget_eta(request_id):
+    _cache.pop(request_id)
+
+
+def eta_stats():
+    return _cache.stats()
@@ -0,0 +1,188 @@
+from math import radians, cos, sin, asin, sqrt
+
+import numpy as np
+
+EARTH_RADIUS_KM = 6371
+
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+GEOHASH_PRECISION = 9     # ~5 m cells, stored for future re-bucketing
+GEOCELL_PRECISION = 5     # ~4.9 km cells, used for nearby queries
+
+# Firestore limit on values inside a single "in" filter
+IN_QUERY_LIMIT = 30
+
+# Firestore limit on disjunctions per query (product of all "in" sizes)
+DISJUNCTION_LIMIT = 30
+
+
+# Utility: distance between two lat/lng points (km)
+def haversine(lat1, lon1, lat2, lon2):
+    lon1, lat1, lon2, lat2 = map(radians, [lon1, lat1, lon2, lat2])
+    dlon = lon2 - lon1
+    dlat = lat2 - lat1
+    a = sin(dlat/2)**2 + cos(lat1) * cos(lat2) * sin(dlon/2)**2
+    c = 2 * asin(sqrt(a))
+    return EARTH_RADIUS_KM * c  # km
+
+
+def bbox_deltas(lat, radius_km):
+    """
+    (dlat, dlng) in degrees of a box enclosing a circle of radius_km.
+    """
+    dlat = radius_km / 111.32
+    cos_lat = max(cos(radians(lat)), 0.01)
+    return dlat, radius_km / (111.32 * cos_lat)
+
+
+def haversine_many(lat, lng, lats, lngs, radius_km=None):
+    """
+    Vectorised haversine from one point to many.
+
+    Returns (distances_km, in_radius) as numpy arrays. With radius_km
+    (scalar, or one radius per point) a bounding-box prefilter runs
+    first: points outside the box skip the trig, get distance inf and
+    are never in radius.
+    """
+    lats = np.asarray(lats, dtype=float)
+    lngs = np.asarray(lngs, dtype=float)
+    distances = np.full(lats.shape, np.inf)
+
+    if radius_km is None:
+        candidates = np.ones(lats.shape, dtype=bool)
+    else:
+        radius_km = np.broadcast_to(np.asarray(radius_km, dtype=float), lats.shape)
+        dlat, dlng = bbox_deltas(lat, radius_km)
+        dlng_pts = np.abs((lngs - lng + 180.0) % 360.0 - 180.0)
+        candidates = (np.abs(lats - lat) <= dlat) & (dlng_pts <= dlng)
+
+    if candidates.any():
+        lat1 = np.radians(lat)
+        lat2 = np.radians(lats[candidates])
+        dlat_r = lat2 - lat1
+        dlng_r = np.radians(lngs[candidates] - lng)
+
+        a = np.sin(dlat_r / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlng_r / 2) ** 2
+        distances[candidates] = 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+    if radius_km is None:
+        return distances, np.ones(lats.shape, dtype=bool)
+
+    return distances, distances <= radius_km
+
+
+def geohash_encode(lat, lng, precision=GEOHASH_PRECISION):
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True   # geohash starts with a longitude bit
+
+    while len(chars) < precision:
+        rng, value = (lng_range, lng) if even else (lat_range, lat)
+        mid = (rng[0] + rng[1]) / 2
+
+        bits <<= 1
+        if value >= mid:
+            bits |= 1
+            rng[0] = mid
+        else:
+            rng[1] = mid
+
+        even = not even
+        bit_count += 1
+
+        if bit_count == 5:
+            chars.append(_BASE32[bits])
+            bits = 0
+            bit_count = 0
+
+    return "".join(chars)
+
+
+def cell_size_deg(precision):
+    """
+    (lat_degrees, lng_degrees) spanned by one geohash cell.
+    """
+    total_bits = 5 * precision
+    lng_bits = (total_bits + 1) // 2
+    lat_bits = total_bits // 2
+    return 180.0 / (2 ** lat_bits), 360.0 / (2 ** lng_bits)
+
+
+def cells_covering(lat, lng, radius_km, precision=GEOCELL_PRECISION):
+    """
+    All geohash cells (at `precision`) intersecting the bounding box
+    of a circle of `radius_km` around (lat, lng).
+    """
+    dlat, dlng = bbox_deltas(lat, radius_km)
+
+    lat_min = max(lat - dlat, -90.0)
+    lat_max = min(lat + dlat, 90.0)
+    lng_min = lng - dlng
+    lng_max = lng + dlng
+
+    cell_lat, cell_lng = cell_size_deg(precision)
+
+    lats = _steps(lat_min, lat_max, cell_lat)
+    lngs = _steps(lng_min, lng_max, cell_lng)
+
+    cells = set()
+    for la in lats:
+        for lo in lngs:
+            lo = ((lo + 180.0) % 360.0) - 180.0
+            cells.add(geohash_encode(la, lo, precision))
+
+    return sorted(cells)
+
+
+def _steps(start, stop, step):
+    values = []
+    v = start
+    while v < stop:
+        values.append(v)
+        v += step
+    values.append(stop)
+    return values
+
+
+def geo_fields(lat, lng):
+    """
+    Fields stored on a request document so it can be found by cell.
+    """
+    geohash = geohash_encode(lat, lng)
+    return {
+        "geohash": geohash,
+        "geocell": geohash[:GEOCELL_PRECISION]
+    }
+
+
+def chunked(values, size=IN_QUERY_LIMIT):
+    for i in range(0, len(values), size):
+        yield values[i:i + size]
+
+
+def chunked_pairs(first, second, limit=DISJUNCTION_LIMIT):
+    """
+    (first_chunk, second_chunk) pairs for a query with two "in" filters,
+    each pair within Firestore's disjunction limit, in as few queries as
+    possible.
+    """
+    if not first or not second:
+        return []
+
+    best = None
+    for second_size in range(1, min(len(second), limit) + 1):
+        first_size = limit // second_size
+        queries = -(-len(first) // first_size) * -(-len(second) // second_size)
+        if best is None or queries < best[0]:
+            best = (queries, first_size, second_size)
+
+    _, first_size, second_size = best
+    return [
+        (a, b)
+        for a in chunked(first, first_size)
+        for b in chunked(second, second_size)
+    ]
@@ -0,0 +1,102 @@
+"""
+Cursor pagination for history lists.
+
+Each page is one query: the requested fields only (select), newest
+first, `limit` documents, starting after an opaque cursor that encodes
+the last document's sort value and ID. Cost stays the same on page 1
+and page 100, however old the account is.
+
+The page (≤ MAX_PAGE_SIZE documents) is fetched before the response
+starts, so a failed query (e.g. a missing index) returns a 500 instead
+of a 200 with truncated JSON; only the encoding is streamed:
+    {"history": [...], "next_cursor": "<token>" | null}
+next_cursor is null on the last page.
+"""
+import base64
+import json
+from datetime import datetime
+
+from flask import Response, current_app, jsonify
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+def page_args(args):
+    """
+    (limit, cursor) from request.args. Raises ValueError on bad input.
+    """
+    limit = int(args.get("limit", DEFAULT_PAGE_SIZE))
+    if limit < 1:
+        raise ValueError("limit must be positive")
+
+    return min(limit, MAX_PAGE_SIZE), decode_cursor(args.get("cursor"))
+
+
+def encode_cursor(value, doc_id):
+    if isinstance(value, datetime):
+        value = {"ts": value.isoformat()}
+    raw = json.dumps({"v": value, "id": doc_id}).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token):
+    if not token:
+        return None
+
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        data = json.loads(raw)
+        value = data["v"]
+        if isinstance(value, dict) and "ts" in value:
+            value = datetime.fromisoformat(value["ts"])
+        return value, data["id"]
+    except (ValueError, KeyError, TypeError):
+        raise ValueError("Invalid cursor")
+
+
+def page_query(query, order_field, fields, limit, cursor):
+    """
+    Newest-first page of `query`, projected to `fields` (+ order_field).
+    """
+    fields = list(dict.fromkeys([*fields, order_field]))
+
+    query = (
+        query.select(fields)
+        .order_by(order_field, direction="DESCENDING")
+        .order_by("__name__", direction="DESCENDING")
+    )
+
+    if cursor is not None:
+        value, doc_id = cursor
+        query = query.start_after({order_field: value, "__name__": doc_id})
+
+    return query.limit(limit)
+
+
+def stream_page(query, order_field, limit, to_item):
+    """
+    Fetch one page, then stream it as JSON, converting each snapshot
+    with to_item().
+    """
+    dumps = current_app.json.dumps
+
+    try:
+        docs = query.get()
+    except Exception as e:
+        print("📄 HISTORY QUERY ERROR:", e)
+        return jsonify({"error": "Failed to load history"}), 500
+
+    next_cursor = None
+    if docs and len(docs) == limit:
+        next_cursor = encode_cursor(docs[-1].get(order_field), docs[-1].id)
+
+    def generate():
+        yield '{"history": ['
+
+        for i, doc in enumerate(docs):
+            yield ("," if i else "") + dumps(to_item(doc))
+
+        yield '], "next_cursor": %s}' % json.dumps(next_cursor)
+
+    return Response(generate(), mimetype="application/json")
@@ -0,0 +1,537 @@
+"""
+Per-endpoint datastore accounting.
+
+instrument(client) wraps the client firebase.get_db() returns. Every
+document read, write, query and commit made through it, and the time
+spent in each round trip, is charged to the Flask endpoint that made it
+("background" for scheduler / flush threads, "listener" for snapshot
+listeners). Reads are counted the way Firestore bills them: one per
+document returned, one for a query that matches nothing.
+
+Document reads served by the request-scoped identity map
+(utils.request_cache) cost nothing and are counted as reads_saved.
+
+Exposed as:
+    GET /metrics                Prometheus text format
+    X-Datastore-Usage header    per response, when DB_DEBUG_HEADER=1
+
+Work done inside a streamed response body is charged to the endpoint
+that built the query, but lands after the debug header was sent.
+"""
+import os
+import threading
+import time
+from collections import defaultdict
+
+from flask import g, has_request_context, request
+
+from utils import metrics, request_cache
+
+BACKGROUND = "background"
+LISTENER = "listener"
+
+COUNTERS = ("reads", "writes", "queries", "commits", "reads_saved")
+
+# Seconds; Firestore round trips and whole requests
+RPC_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+HTTP_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+DEBUG_HEADER = "X-Datastore-Usage"
+
+
+# -----------------------------
+# REGISTRY
+# -----------------------------
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+
+
+_lock = threading.Lock()
+_usage = defaultdict(lambda: dict.fromkeys(COUNTERS, 0))     # endpoint → counters
+_rpc = {}                                                     # (endpoint, op) → Histogram
+_http = {}                                                    # endpoint → Histogram
+_http_status = defaultdict(int)                               # (endpoint, status) → count
+
+
+def _endpoint(bound=None):
+    if has_request_context():
+        return request.endpoint or "unmatched"
+    return bound or BACKGROUND
+
+
+def _record(endpoint, op, seconds, **counts):
+    """
+    Charge counts to `endpoint`; op=None for work that made no round trip.
+    """
+    with _lock:
+        usage = _usage[endpoint]
+        for name, value in counts.items():
+            usage[name] += value
+
+        if op is not None:
+            hist = _rpc.get((endpoint, op))
+            if hist is None:
+                hist = _rpc[(endpoint, op)] = Histogram(RPC_BUCKETS)
+            hist.observe(seconds)
+
+    # Per-request tally for the debug header
+    if has_request_context():
+        tally = g.setdefault("_datastore_usage", dict.fromkeys(COUNTERS + ("rpcs", "ms"), 0))
+        for name, value in counts.items():
+            tally[name] += value
+        if op is not None:
+            tally["rpcs"] += 1
+            tally["ms"] += seconds * 1000
+
+
+def _timed(endpoint, op, fn, counts_for):
+    """
+    Run fn(), charge counts_for(result) and the elapsed time to `endpoint`.
+    """
+    start = time.perf_counter()
+    result = fn()
+    _record(endpoint, op, time.perf_counter() - start, **counts_for(result))
+    return result
+
+
+# -----------------------------
+# PROXIES
+# -----------------------------
+class _Proxy:
+    __slots__ = ("_target", "_bound")
+
+    def __init__(self, target, bound=None):
+        object.__setattr__(self, "_target", target)
+        # Endpoint at creation: streamed bodies run outside the request context
+        object.__setattr__(self, "_bound", bound if bound is not None else (
+            request.endpoint if has_request_context() else None
+        ))
+
+    def __getattr__(self, name):
+        return getattr(self._target, name)
+
+    def __eq__(self, other):
+        return self._target == _unwrap(other)
+
+    def __hash__(self):
+        return hash(self._target)
+
+    def __repr__(self):
+        return f"<instrumented {self._target!r}>"
+
+    def _wrap(self, value):
+        return _wrap(value, self._bound)
+
+
+def _unwrap(value):
+    if isinstance(value, _Proxy):
+        return value._target
+    if isinstance(value, (list, tuple)):
+        return type(value)(_unwrap(v) for v in value)
+    return value
+
+
+def _unwrap_all(args, kwargs):
+    return [_unwrap(a) for a in args], {k: _unwrap(v) for k, v in kwargs.items()}
+
+
+def _wrap(value, bound=None):
+    if value is None or isinstance(value, _Proxy):
+        return value
+    if hasattr(value, "stream") and hasattr(value, "where"):
+        return QueryProxy(value, bound)
+    if hasattr(value, "update") and hasattr(value, "collection") and hasattr(value, "path"):
+        return DocumentProxy(value, bound)
+    return value
+
+
+class SnapshotProxy(_Proxy):
+    __slots__ = ()
+
+    @property
+    def reference(self):
+        return self._wrap(self._target.reference)
+
+
+def _snapshots(results, bound):
+    return [SnapshotProxy(s, bound) for s in results]
+
+
+def _track_write(reference, op, args, kwargs, result):
+    """
+    Tell the request's identity map about a committed write.
+    """
+    data = args[0] if args else kwargs.get("document_data", kwargs.get("field_updates"))
+    merge = args[1] if op == "set" and len(args) > 1 else kwargs.get("merge", False)
+    request_cache.written(reference, op, data, merge, getattr(result, "update_time", None))
+
+
+def _listener(callback):
+    def on_snapshot(doc_snapshots, changes, read_time):
+        _record(LISTENER, "listen", 0.0, reads=max(len(changes), 1))
+        return callback(doc_snapshots, changes, read_time)
+    return on_snapshot
+
+
+class DocumentProxy(_Proxy):
+    __slots__ = ()
+
+    @property
+    def parent(self):
+        return self._wrap(self._target.parent)
+
+    def collection(self, *args, **kwargs):
+        return self._wrap(self._target.collection(*args, **kwargs))
+
+    def get(self, *args, **kwargs):
+        args, kwargs = _unwrap_all(args, kwargs)
+        endpoint = _endpoint(self._bound)
+
+        # 🪞 Already read (or written) by this request
+        cacheable = not args and request_cache.cacheable(kwargs)
+        if cacheable:
+            snap = request_cache.lookup(self._target.path)
+            if snap is not None:
+                _record(endpoint, None, 0.0, reads_saved=1)
+                return SnapshotProxy(snap, self._bound)
+
+        snap = _timed(
+            endpoint, "get",
+            lambda: self._target.get(*args, **kwargs),
+            lambda _: {"reads": 1}
+        )
+        if cacheable:
+            request_cache.remember(snap)
+        return SnapshotProxy(snap, self._bound)
+
+    def _write(self, op, *args, **kwargs):
+        args, kwargs = _unwrap_all(args, kwargs)
+        result = _timed(
+            _endpoint(self._bound), "commit",
+            lambda: getattr(self._target, op)(*args, **kwargs),
+            lambda _: {"writes": 1, "commits": 1}
+        )
+        _track_write(self._target, op, args, kwargs, result)
+        return result
+
+    def set(self, *args, **kwargs):
+        return self._write("set", *args, **kwargs)
+
+    def create(self, *args, **kwargs):
+        return self._write("create", *args, **kwargs)
+
+    def update(self, *args, **kwargs):
+        return self._write("update", *args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        return self._write("delete", *args, **kwargs)
+
+    def on_snapshot(self, callback):
+        return self._target.on_snapshot(_listener(callback))
+
+
+class QueryProxy(_Proxy):
+    __slots__ = ()
+
+    def __getattr__(self, name):
+        attr = getattr(self._target, name)
+        if not callable(attr):
+            return attr
+
+        # where / order_by / limit / select / start_after / document / ...
+        def chained(*args, **kwargs):
+            args, kwargs = _unwrap_all(args, kwargs)
+            return self._wrap(attr(*args, **kwargs))
+        return chained
+
+    def get(self, *args, **kwargs):
+        args, kwargs = _unwrap_all(args, kwargs)
+        results = _timed(
+            _endpoint(self._bound), "query",
+            lambda: list(self._target.stream(*args, **kwargs)),
+            lambda docs: {"queries": 1, "reads": max(len(docs), 1)}
+        )
+        return _snapshots(results, self._bound)
+
+    def stream(self, *args, **kwargs):
+        args, kwargs = _unwrap_all(args, kwargs)
+        bound = self._bound
+        endpoint = _endpoint(bound)
+        iterator = self._target.stream(*args, **kwargs)
+
+        def generate():
+            # Only time spent waiting on Firestore, not on the consumer
+            elapsed, count = 0.0, 0
+            try:
+                while True:
+                    start = time.perf_counter()
+                    try:
+                        snap = next(iterator)
+                    except StopIteration:
+                        elapsed += time.perf_counter() - start
+                        break
+                    elapsed += time.perf_counter() - start
+                    count += 1
+                    yield SnapshotProxy(snap, bound)
+            finally:
+                _record(endpoint, "query", elapsed, queries=1, reads=max(count, 1))
+
+        return generate()
+
+    def add(self, *args, **kwargs):
+        args, kwargs = _unwrap_all(args, kwargs)
+        update_time, ref = _timed(
+            _endpoint(self._bound), "commit",
+            lambda: self._target.add(*args, **kwargs),
+            lambda _: {"writes": 1, "commits": 1}
+        )
+        return update_time, self._wrap(ref)
+
+    def on_snapshot(self, callback):
+        return self._target.on_snapshot(_listener(callback))
+
+
+class BatchProxy(_Proxy):
+    """
+    WriteBatch, or a Transaction driven by @firestore.transactional.
+    """
+    __slots__ = ("_writes",)
+
+    def __init__(self, target, bound=None):
+        super().__init__(target, bound)
+        object.__setattr__(self, "_writes", [])
+
+    def __len__(self):
+        return len(self._writes)
+
+    def _queue(self, op, reference, *args, **kwargs):
+        reference = _unwrap(reference)
+        args, kwargs = _unwrap_all(args, kwargs)
+        getattr(self._target, op)(reference, *args, **kwargs)
+        self._writes.append((op, reference, args, kwargs))
+
+    def set(self, *args, **kwargs):
+        self._queue("set", *args, **kwargs)
+
+    def create(self, *args, **kwargs):
+        self._queue("create", *args, **kwargs)
+
+    def update(self, *args, **kwargs):
+        self._queue("update", *args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        self._queue("delete", *args, **kwargs)
+
+    def _flush(self, fn):
+        writes = self._writes
+        object.__setattr__(self, "_writes", [])
+        results = _timed(
+            _endpoint(self._bound), "commit", fn,
+            lambda _: {"writes": len(writes), "commits": 1}
+        )
+
+        # One write result per queued write, in order
+        results_list = list(results or ())
+        for i, (op, reference, args, kwargs) in enumerate(writes):
+            result = results_list[i] if i < len(results_list) else None
+            _track_write(reference, op, args, kwargs, result)
+        return results
+
+    def commit(self, *args, **kwargs):
+        return self._flush(lambda: self._target.commit(*args, **kwargs))
+
+    # --- transaction protocol (google.cloud.firestore.transactional) ---
+    def _commit(self):
+        return self._flush(self._target._commit)
+
+    def _clean_up(self):
+        object.__setattr__(self, "_writes", [])
+        return self._target._clean_up()
+
+    def get(self, ref_or_query, *args, **kwargs):
+        ref_or_query = self._wrap(ref_or_query)
+        if isinstance(ref_or_query, DocumentProxy):
+            return iter([ref_or_query.get(*args, transaction=self, **kwargs)])
+        return ref_or_query.stream(*args, transaction=self, **kwargs)
+
+    def get_all(self, references, *args, **kwargs):
+        return ClientProxy(self._target._client, self._bound).get_all(
+            references, *args, transaction=self, **kwargs
+        )
+
+
+class ClientProxy(_Proxy):
+    __slots__ = ()
+
+    def collection(self, *args, **kwargs):
+        return self._wrap(self._target.collection(*args, **kwargs))
+
+    def document(self, *args, **kwargs):
+        return self._wrap(self._target.document(*args, **kwargs))
+
+    def batch(self, *args, **kwargs):
+        return BatchProxy(self._target.batch(*args, **kwargs))
+
+    def transaction(self, *args, **kwargs):
+        return BatchProxy(self._target.transaction(*args, **kwargs))
+
+    def get_all(self, references, *args, **kwargs):
+        references = [_unwrap(r) for r in references]
+        args, kwargs = _unwrap_all(args, kwargs)
+        endpoint = _endpoint(self._bound)
+
+        # 🪞 Only fetch what this request hasn't read yet
+        cached = []
+        cacheable = not args and request_cache.cacheable(kwargs)
+        if cacheable:
+            missing = []
+            for ref in references:
+                snap = request_cache.lookup(ref.path)
+                if snap is None:
+                    missing.append(ref)
+                else:
+                    cached.append(snap)
+            if cached:
+                _record(endpoint, None, 0.0, reads_saved=len(cached))
+            references = missing
+
+        snaps = []
+        if references:
+            snaps = _timed(
+                endpoint, "get",
+                lambda: list(self._target.get_all(references, *args, **kwargs)),
+                lambda _: {"reads": len(references)}
+            )
+            if cacheable:
+                for snap in snaps:
+                    request_cache.remember(snap)
+
+        return iter(_snapshots(cached + snaps, self._bound))
+
+
+def instrument(client):
+    return ClientProxy(client)
+
+
+# -----------------------------
+# FLASK HOOKS & EXPORT
+# -----------------------------
+def install(app):
+    """
+    Time every request and, with DB_DEBUG_HEADER=1, attach its datastore
+    usage to the response.
+    """
+    debug_header = os.environ.get("DB_DEBUG_HEADER") == "1"
+
+    @app.before_request
+    def _start_timer():
+        g._request_started = time.perf_counter()
+
+    @app.after_request
+    def _finish(response):
+        started = g.pop("_request_started", None)
+        if started is not None:
+            endpoint = request.endpoint or "unmatched"
+            with _lock:
+                hist = _http.get(endpoint)
+                if hist is None:
+                    hist = _http[endpoint] = Histogram(HTTP_BUCKETS)
+                hist.observe(time.perf_counter() - started)
+                _http_status[(endpoint, response.status_code)] += 1
+
+        if debug_header:
+            tally = g.get("_datastore_usage") or dict.fromkeys(COUNTERS + ("rpcs", "ms"), 0)
+            response.headers[DEBUG_HEADER] = "; ".join(
+                f"{k}={round(v, 2) if k == 'ms' else v}" for k, v in tally.items()
+            )
+        return response
+
+
+def usage():
+    with _lock:
+        return {endpoint: dict(counts) for endpoint, counts in _usage.items()}
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(**labels):
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+
+
+def _histogram_lines(name, labels, hist):
+    # observe() already counts every bucket a value falls under (cumulative)
+    for bound, count in zip(hist.buckets, hist.counts):
+        yield f"{name}_bucket{_labels(**labels, le=bound)} {count}"
+    yield f"{name}_bucket{_labels(**labels, le='+Inf')} {hist.count}"
+    yield f"{name}_sum{_labels(**labels)} {hist.sum:.6f}"
+    yield f"{name}_count{_labels(**labels)} {hist.count}"
+
+
+def render_prometheus():
+    """
+    All metrics in Prometheus text exposition format (0.0.4).
+    """
+    with _lock:
+        usage_snapshot = {e: dict(c) for e, c in _usage.items()}
+        rpc = [(key, _copy_hist(h)) for key, h in _rpc.items()]
+        http = [(e, _copy_hist(h)) for e, h in _http.items()]
+        statuses = dict(_http_status)
+
+    lines = []
+
+    for counter in COUNTERS:
+        name = f"fixit_datastore_{counter}_total"
+        if counter == "reads_saved":
+            lines.append(f"# HELP {name} Document reads served by the request-scoped identity map.")
+        else:
+            lines.append(f"# HELP {name} Firestore {counter} made by each endpoint.")
+        lines.append(f"# TYPE {name} counter")
+        for endpoint, counts in sorted(usage_snapshot.items()):
+            lines.append(f"{name}{_labels(endpoint=endpoint)} {counts[counter]}")
+
+    name = "fixit_datastore_rpc_seconds"
+    lines.append(f"# HELP {name} Firestore round-trip latency by endpoint and operation.")
+    lines.append(f"# TYPE {name} histogram")
+    for (endpoint, op), hist in sorted(rpc):
+        lines.extend(_histogram_lines(name, {"endpoint": endpoint, "op": op}, hist))
+
+    name = "fixit_http_requests_total"
+    lines.append(f"# HELP {name} HTTP requests by endpoint and status.")
+    lines.append(f"# TYPE {name} counter")
+    for (endpoint, status), count in sorted(statuses.items()):
+        lines.append(f"{name}{_labels(endpoint=endpoint, status=status)} {count}")
+
+    name = "fixit_http_request_seconds"
+    lines.append(f"# HELP {name} HTTP request latency by endpoint (excludes streamed bodies).")
+    lines.append(f"# TYPE {name} histogram")
+    for endpoint, hist in sorted(http):
+        lines.extend(_histogram_lines(name, {"endpoint": endpoint}, hist))
+
+    name = "fixit_events_total"
+    lines.append(f"# HELP {name} Application event counters (utils.metrics).")
+    lines.append(f"# TYPE {name} counter")
+    for event, count in sorted(metrics.counters().items()):
+        lines.append(f"{name}{_labels(event=event)} {count}")
+
+    return "\n".join(lines) + "\n"
+
+
+def _copy_hist(hist):
+    copy = Histogram(hist.buckets)
+    copy.counts = list(hist.counts)
+    copy.count = hist.count
+    copy.sum = hist.sum
+    return copy
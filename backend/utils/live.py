@@ -0,0 +1,183 @@
+"""
+Push-based request updates (Server-Sent Events).
+
+RequestHub keeps ONE Firestore snapshot listener per request that has at
+least one connected client and fans each change out to every subscriber.
+Subscribers only ever hold the latest request state, so a slow client
+skips intermediate location pings instead of queueing them.
+
+Note: under the default gthread workers each open stream holds a worker
+thread (THREADS per worker, see gunicorn.conf.py). FIXIT_SERVE_MODE=async
+serves them from gevent greenlets instead.
+"""
+import threading
+import time
+
+from flask import Response, current_app, stream_with_context
+
+from firebase import get_db
+from utils import request_cache
+
+db = get_db()
+
+HEARTBEAT_SECONDS = 15        # comment line to keep proxies from closing idle streams
+STREAM_MAX_SECONDS = 300      # client is told to reconnect after this
+CLIENT_RETRY_MS = 3000
+TERMINAL_STATUSES = ("COMPLETED", "CANCELLED", "TIMEOUT")
+
+_EMPTY = object()
+MISSING = object()            # request document does not exist
+
+
+class Subscriber:
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._value = _EMPTY
+
+    def push(self, value):
+        with self._cond:
+            self._value = value
+            self._cond.notify()
+
+    def get(self, timeout):
+        """
+        Latest pushed value, or None if nothing arrived within `timeout`.
+        """
+        with self._cond:
+            if self._value is _EMPTY:
+                self._cond.wait(timeout)
+            value, self._value = self._value, _EMPTY
+        return None if value is _EMPTY else value
+
+
+class _Channel:
+    def __init__(self):
+        self.subscribers = set()
+        self.latest = _EMPTY
+        self.watch = None
+
+
+class RequestHub:
+    def __init__(self, db):
+        self.db = db
+        self._lock = threading.Lock()
+        self._channels = {}
+
+    def subscribe(self, request_id):
+        sub = Subscriber()
+
+        with self._lock:
+            channel = self._channels.get(request_id)
+            if channel is None:
+                channel = _Channel()
+                self._channels[request_id] = channel
+                channel.watch = (
+                    self.db.collection("requests")
+                    .document(request_id)
+                    .on_snapshot(self._callback(request_id))
+                )
+            elif channel.latest is not _EMPTY:
+                sub.push(channel.latest)
+
+            channel.subscribers.add(sub)
+
+        return sub
+
+    def unsubscribe(self, request_id, sub):
+        watch = None
+
+        with self._lock:
+            channel = self._channels.get(request_id)
+            if channel is None:
+                return
+            channel.subscribers.discard(sub)
+            if not channel.subscribers:
+                del self._channels[request_id]
+                watch = channel.watch
+
+        if watch is not None:
+            watch.unsubscribe()
+
+    def _callback(self, request_id):
+        def on_snapshot(doc_snapshots, changes, read_time):
+            snap = doc_snapshots[0] if doc_snapshots else None
+            value = snap.to_dict() if snap is not None and snap.exists else MISSING
+
+            with self._lock:
+                channel = self._channels.get(request_id)
+                if channel is None:
+                    return
+                channel.latest = value
+                subscribers = list(channel.subscribers)
+
+            for sub in subscribers:
+                sub.push(value)
+
+        return on_snapshot
+
+    def stats(self):
+        with self._lock:
+            return {
+                "listeners": len(self._channels),
+                "subscribers": sum(len(c.subscribers) for c in self._channels.values())
+            }
+
+
+request_hub = RequestHub(db)
+
+
+def _event(name, data):
+    return f"event: {name}\ndata: {data}\n\n"
+
+
+def stream_request(request_id, build_payload):
+    """
+    SSE response pushing `build_payload(req_dict)` whenever the request
+    document changes. Payloads identical to the last one sent are skipped.
+    """
+    def generate():
+        # Subscribed on the first chunk, inside the try, so a client that
+        # leaves before the body starts never holds a listener
+        sub = request_hub.subscribe(request_id)
+        try:
+            yield f"retry: {CLIENT_RETRY_MS}\n\n"
+
+            last = None
+            deadline = time.monotonic() + STREAM_MAX_SECONDS
+
+            while time.monotonic() < deadline:
+                req = sub.get(timeout=HEARTBEAT_SECONDS)
+
+                if req is None:
+                    yield ": ping\n\n"
+                    continue
+
+                if req is MISSING:
+                    yield _event("error", current_app.json.dumps({"error": "Request not found"}))
+                    return
+
+                # 🪞 Every event reads fresh (the stream outlives "one request")
+                request_cache.clear()
+                data = current_app.json.dumps(build_payload(req))
+                if data != last:
+                    yield _event("status", data)
+                    last = data
+
+                if req.get("status") in TERMINAL_STATUSES:
+                    yield _event("end", "{}")
+                    return
+
+            # ⏳ Rotate long-lived connections
+            yield _event("reconnect", "{}")
+
+        finally:
+            request_hub.unsubscribe(request_id, sub)
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no"
+        }
+    )
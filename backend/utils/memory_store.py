@@ -0,0 +1,844 @@
+"""
+In-process storage engine with the Firestore client surface the app uses.
+
+FIXIT_STORAGE=memory makes firebase.get_db() return one shared
+MemoryClient, so routes, benchmarks and load tests run with no network
+or credentials. Every module keeps talking the same client API
+(collection / document / query / batch / transaction), so switching
+engines needs no route changes.
+
+Supported:
+- documents and subcollections: get / set (merge) / create / update / delete
+- queries: ==, !=, <, <=, >, >=, in, not-in, array_contains,
+  array_contains_any; order_by, limit, select, start_at / start_after
+- batches (max 500 writes) and transactions that work with
+  @firestore.transactional: optimistic, so a commit raises Aborted if any
+  document read in the transaction changed in the meantime
+- write_option(last_update_time=... | exists=...) preconditions
+- Increment / Maximum / Minimum / ArrayUnion / ArrayRemove,
+  SERVER_TIMESTAMP and DELETE_FIELD
+- on_snapshot for documents and queries, delivered on a background
+  thread like the real watch stream
+
+Reads, writes, queries and commits are counted the way Firestore bills
+them (one read per document returned, one for an empty query), both in
+total and per calling thread (usage()), so a harness can attribute them
+to the request it just made.
+"""
+import copy
+import functools
+import os
+import queue
+import random
+import string
+import threading
+from datetime import datetime, timedelta, timezone
+
+from google.api_core.exceptions import (
+    Aborted, AlreadyExists, FailedPrecondition, InvalidArgument, NotFound
+)
+from google.cloud.firestore_v1 import transforms
+from google.cloud.firestore_v1.watch import ChangeType, DocumentChange
+
+MAX_BATCH_WRITES = 500
+AUTO_ID_CHARS = string.ascii_letters + string.digits
+
+_MISSING = object()
+
+
+# -----------------------------
+# FIELD PATHS & VALUES
+# -----------------------------
+def _get_field(data, field_path):
+    value = data
+    for part in field_path.split("."):
+        if not isinstance(value, dict) or part not in value:
+            return _MISSING
+        value = value[part]
+    return value
+
+
+def _set_field(data, field_path, value):
+    *parents, leaf = field_path.split(".")
+    for part in parents:
+        child = data.get(part)
+        if not isinstance(child, dict):
+            child = data[part] = {}
+        data = child
+
+    if value is transforms.DELETE_FIELD:
+        data.pop(leaf, None)
+    else:
+        data[leaf] = value
+
+
+def _transform(value, current, now):
+    """
+    Resolve sentinels / transforms against the field's current value.
+    """
+    if value is transforms.SERVER_TIMESTAMP:
+        return now
+    if isinstance(value, transforms.Increment):
+        base = current if isinstance(current, (int, float)) and not isinstance(current, bool) else 0
+        return base + value.value
+    if isinstance(value, transforms.Maximum):
+        return value.value if not isinstance(current, (int, float)) else max(current, value.value)
+    if isinstance(value, transforms.Minimum):
+        return value.value if not isinstance(current, (int, float)) else min(current, value.value)
+    if isinstance(value, transforms.ArrayUnion):
+        result = list(current) if isinstance(current, list) else []
+        result.extend(v for v in value.values if v not in result)
+        return result
+    if isinstance(value, transforms.ArrayRemove):
+        result = list(current) if isinstance(current, list) else []
+        return [v for v in result if v not in value.values]
+    if isinstance(value, dict):
+        base = current if isinstance(current, dict) else {}
+        return {k: _transform(v, base.get(k, _MISSING), now) for k, v in value.items()}
+    return copy.deepcopy(value)
+
+
+def _merge(target, data, now):
+    for key, value in data.items():
+        if value is transforms.DELETE_FIELD:
+            target.pop(key, None)
+        elif isinstance(value, dict) and isinstance(target.get(key), dict):
+            _merge(target[key], value, now)
+        else:
+            target[key] = _transform(value, target.get(key, _MISSING), now)
+    return target
+
+
+# Firestore orders values of different types by type first
+_TYPE_RANK = (
+    (type(None), 0), (bool, 1), (int, 2), (float, 2), (datetime, 3),
+    (str, 4), (bytes, 5), (list, 8), (dict, 9),
+)
+
+
+def _sort_value(value):
+    for kind, rank in _TYPE_RANK:
+        if isinstance(value, kind):
+            return (rank, value)
+    return (10, str(value))
+
+
+def _compare(a, b):
+    a, b = _sort_value(a), _sort_value(b)
+    if a[0] != b[0]:
+        return -1 if a[0] < b[0] else 1
+    try:
+        return (a[1] > b[1]) - (a[1] < b[1])
+    except TypeError:
+        return 0
+
+
+def _matches(value, op, expected):
+    if value is _MISSING:
+        return False
+    if op == "==":
+        return value == expected
+    if op == "!=":
+        return value is not None and value != expected
+    if op == "in":
+        return value in expected
+    if op == "not-in":
+        return value is not None and value not in expected
+    if op == "array_contains":
+        return isinstance(value, list) and expected in value
+    if op == "array_contains_any":
+        return isinstance(value, list) and any(v in value for v in expected)
+
+    # Range filters only match values of the same type
+    if _sort_value(value)[0] != _sort_value(expected)[0]:
+        return False
+    cmp = _compare(value, expected)
+    return {
+        "<": cmp < 0, "<=": cmp <= 0, ">": cmp > 0, ">=": cmp >= 0
+    }[op]
+
+
+# -----------------------------
+# SNAPSHOTS
+# -----------------------------
+class DocumentSnapshot:
+    def __init__(self, reference, data, create_time=None, update_time=None, read_time=None):
+        self.reference = reference
+        self.id = reference.id
+        self.exists = data is not None
+        self.create_time = create_time
+        self.update_time = update_time
+        self.read_time = read_time
+        self._data = data
+
+    def to_dict(self):
+        return copy.deepcopy(self._data) if self.exists else None
+
+    def get(self, field_path):
+        if not self.exists:
+            return None
+        value = _get_field(self._data, field_path)
+        if value is _MISSING:
+            raise KeyError(field_path)
+        return copy.deepcopy(value)
+
+
+class WriteResult:
+    def __init__(self, update_time):
+        self.update_time = update_time
+
+
+class _Precondition:
+    def __init__(self, last_update_time=None, exists=None):
+        self.last_update_time = last_update_time
+        self.exists = exists
+
+    def check(self, path, stored):
+        if self.exists is not None and self.exists != (stored is not None):
+            raise FailedPrecondition(f"Document {path} existence precondition failed")
+        if self.last_update_time is not None:
+            if stored is None or stored.update_time != self.last_update_time:
+                raise FailedPrecondition(f"Document {path} changed since it was read")
+
+
+class _Write:
+    def __init__(self, kind, path, data=None, merge=False, option=None):
+        self.kind = kind
+        self.path = path
+        self.data = data
+        self.merge = merge
+        self.option = option
+
+    def apply(self, current, stored, now):
+        """
+        New document data given the staged `current` data (or None).
+        """
+        if self.option is not None:
+            self.option.check(self.path, stored)
+
+        if self.kind == "create":
+            if current is not None:
+                raise AlreadyExists(f"Document already exists: {self.path}")
+            return _merge({}, self.data, now)
+
+        if self.kind == "set":
+            base = copy.deepcopy(current) if self.merge and current is not None else {}
+            return _merge(base, self.data, now)
+
+        if self.kind == "update":
+            if current is None:
+                raise NotFound(f"No document to update: {self.path}")
+            result = copy.deepcopy(current)
+            for field_path, value in self.data.items():
+                existing = _get_field(result, field_path)
+                _set_field(result, field_path, (
+                    value if value is transforms.DELETE_FIELD
+                    else _transform(value, existing, now)
+                ))
+            return result
+
+        return None  # delete
+
+
+class _Stored:
+    __slots__ = ("data", "create_time", "update_time")
+
+    def __init__(self, data, create_time, update_time):
+        self.data = data
+        self.create_time = create_time
+        self.update_time = update_time
+
+
+# -----------------------------
+# REFERENCES & QUERIES
+# -----------------------------
+class DocumentReference:
+    def __init__(self, client, path):
+        self._client = client
+        self.path = path
+        self.id = path.rsplit("/", 1)[-1]
+
+    def __eq__(self, other):
+        return isinstance(other, DocumentReference) and other.path == self.path
+
+    def __hash__(self):
+        return hash(self.path)
+
+    @property
+    def parent(self):
+        return CollectionReference(self._client, self.path.rsplit("/", 1)[0])
+
+    def collection(self, name):
+        return CollectionReference(self._client, f"{self.path}/{name}")
+
+    def get(self, field_paths=None, transaction=None, **kwargs):
+        return self._client._read([self], field_paths, transaction)[0]
+
+    def set(self, document_data, merge=False, **kwargs):
+        return self._client._commit([_Write("set", self.path, document_data, merge)])[0]
+
+    def create(self, document_data, **kwargs):
+        return self._client._commit([_Write("create", self.path, document_data)])[0]
+
+    def update(self, field_updates, option=None, **kwargs):
+        return self._client._commit([_Write("update", self.path, field_updates, option=option)])[0]
+
+    def delete(self, option=None, **kwargs):
+        return self._client._commit([_Write("delete", self.path, option=option)])[0].update_time
+
+    def on_snapshot(self, callback):
+        return self._client._watch(_DocumentWatch(self, callback))
+
+
+class Query:
+    ASCENDING = "ASCENDING"
+    DESCENDING = "DESCENDING"
+
+    def __init__(self, client, path, filters=(), orders=(), limit=None,
+                 fields=None, cursor=None):
+        self._client = client
+        self._path = path
+        self._filters = tuple(filters)
+        self._orders = tuple(orders)
+        self._limit = limit
+        self._fields = fields
+        self._cursor = cursor
+
+    def _copy(self, **changes):
+        state = {
+            "filters": self._filters, "orders": self._orders, "limit": self._limit,
+            "fields": self._fields, "cursor": self._cursor,
+        }
+        state.update(changes)
+        return Query(self._client, self._path, **state)
+
+    def where(self, field_path=None, op_string=None, value=None, filter=None):
+        if filter is not None:
+            field_path, op_string, value = filter.field_path, filter.op_string, filter.value
+        return self._copy(filters=self._filters + ((field_path, op_string, value),))
+
+    def order_by(self, field_path, direction=ASCENDING):
+        return self._copy(orders=self._orders + ((field_path, direction),))
+
+    def limit(self, count):
+        return self._copy(limit=count)
+
+    def select(self, field_paths):
+        return self._copy(fields=list(field_paths))
+
+    def start_at(self, document_fields_or_snapshot):
+        return self._copy(cursor=(document_fields_or_snapshot, False))
+
+    def start_after(self, document_fields_or_snapshot):
+        return self._copy(cursor=(document_fields_or_snapshot, True))
+
+    def get(self, transaction=None, **kwargs):
+        return list(self.stream(transaction=transaction))
+
+    def stream(self, transaction=None, **kwargs):
+        return iter(self._client._run_query(self, transaction))
+
+    def on_snapshot(self, callback):
+        return self._client._watch(_QueryWatch(self, callback))
+
+    # --- evaluation (caller holds the client lock) ---
+    def _effective_orders(self):
+        orders = list(self._orders)
+
+        # Inequality filters imply an order on their field
+        for field_path, op, _ in self._filters:
+            if op in ("<", "<=", ">", ">=", "!=", "not-in") and not orders:
+                orders.append((field_path, self.ASCENDING))
+
+        if not any(field == "__name__" for field, _ in orders):
+            last = orders[-1][1] if orders else self.ASCENDING
+            orders.append(("__name__", last))
+        return orders
+
+    @staticmethod
+    def _value(doc_id, data, field_path):
+        return doc_id if field_path == "__name__" else _get_field(data, field_path)
+
+    def _cursor_values(self, orders):
+        values, _ = self._cursor
+        if isinstance(values, DocumentSnapshot):
+            snap = values
+            return [
+                snap.id if field == "__name__" else _get_field(snap._data or {}, field)
+                for field, _ in orders
+            ]
+
+        result = []
+        for field, _ in orders:
+            if field not in values:
+                break
+            result.append(values[field])
+        return result
+
+    def _evaluate(self, documents):
+        """
+        [(doc_id, stored)] matching this query, ordered, cursored, limited.
+        """
+        orders = self._effective_orders()
+
+        matched = [
+            (doc_id, stored) for doc_id, stored in documents.items()
+            if all(
+                _matches(_get_field(stored.data, field), op, value)
+                for field, op, value in self._filters
+            )
+            # Documents missing an order_by field are not returned
+            and all(
+                field == "__name__" or _get_field(stored.data, field) is not _MISSING
+                for field, _ in orders
+            )
+        ]
+
+        def compare(a, b):
+            for field, direction in orders:
+                cmp = _compare(self._value(a[0], a[1].data, field), self._value(b[0], b[1].data, field))
+                if cmp:
+                    return -cmp if direction == self.DESCENDING else cmp
+            return 0
+
+        matched.sort(key=functools.cmp_to_key(compare))
+
+        if self._cursor is not None:
+            bound = self._cursor_values(orders)
+            exclusive = self._cursor[1]
+
+            def past_cursor(item):
+                for value, (field, direction) in zip(bound, orders):
+                    cmp = _compare(self._value(item[0], item[1].data, field), value)
+                    if cmp:
+                        return (-cmp if direction == self.DESCENDING else cmp) > 0
+                return not exclusive
+
+            matched = [item for item in matched if past_cursor(item)]
+
+        if self._limit is not None:
+            matched = matched[:self._limit]
+        return matched
+
+
+class CollectionReference(Query):
+    def __init__(self, client, path):
+        super().__init__(client, path)
+        self.id = path.rsplit("/", 1)[-1]
+
+    def document(self, document_id=None):
+        document_id = document_id or "".join(random.choices(AUTO_ID_CHARS, k=20))
+        return DocumentReference(self._client, f"{self._path}/{document_id}")
+
+    def add(self, document_data, document_id=None):
+        ref = self.document(document_id)
+        result = ref.create(document_data)
+        return result.update_time, ref
+
+    def list_documents(self, **kwargs):
+        with self._client._lock:
+            ids = list(self._client._collections.get(self._path, {}))
+        return [self.document(doc_id) for doc_id in ids]
+
+
+# -----------------------------
+# BATCHES & TRANSACTIONS
+# -----------------------------
+class WriteBatch:
+    def __init__(self, client):
+        self._client = client
+        self._writes = []
+
+    def __len__(self):
+        return len(self._writes)
+
+    def _add(self, write):
+        self._writes.append(write)
+
+    def set(self, reference, document_data, merge=False):
+        self._add(_Write("set", reference.path, document_data, merge))
+
+    def create(self, reference, document_data):
+        self._add(_Write("create", reference.path, document_data))
+
+    def update(self, reference, field_updates, option=None):
+        self._add(_Write("update", reference.path, field_updates, option=option))
+
+    def delete(self, reference, option=None):
+        self._add(_Write("delete", reference.path, option=option))
+
+    def commit(self, **kwargs):
+        writes, self._writes = self._writes, []
+        return self._client._commit(writes)
+
+
+class Transaction(WriteBatch):
+    """
+    The parts of google.cloud.firestore.Transaction that
+    @firestore.transactional drives. Reads pass `transaction=`; their
+    update_time is checked again at commit.
+    """
+
+    def __init__(self, client, max_attempts=5, read_only=False):
+        super().__init__(client)
+        self._max_attempts = max_attempts
+        self._read_only = read_only
+        self._id = None
+        self._read_versions = {}
+
+    @property
+    def id(self):
+        return self._id
+
+    @property
+    def in_progress(self):
+        return self._id is not None
+
+    def _add(self, write):
+        if self._read_only:
+            raise ValueError("Cannot perform write operation in read-only transaction.")
+        super()._add(write)
+
+    def _record_read(self, path, update_time):
+        self._read_versions.setdefault(path, update_time)
+
+    def _clean_up(self):
+        self._writes = []
+        self._read_versions = {}
+        self._id = None
+
+    def _begin(self, retry_id=None):
+        if self.in_progress:
+            raise ValueError("Transaction already in progress")
+        self._id = self._client._next_transaction_id()
+
+    def _rollback(self):
+        self._clean_up()
+
+    def _commit(self):
+        if not self.in_progress:
+            raise ValueError("Transaction not in progress, cannot be used in API requests.")
+        try:
+            return self._client._commit(self._writes, self._read_versions)
+        finally:
+            self._clean_up()
+
+    def get(self, ref_or_query, **kwargs):
+        if isinstance(ref_or_query, DocumentReference):
+            return iter([ref_or_query.get(transaction=self)])
+        return ref_or_query.stream(transaction=self)
+
+    def get_all(self, references, **kwargs):
+        return self._client.get_all(references, transaction=self, **kwargs)
+
+
+# -----------------------------
+# LISTENERS
+# -----------------------------
+class _Watch:
+    def __init__(self, callback):
+        self._callback = callback
+        self._client = None
+        self._active = True
+        self._delivered = False
+        self._last = {}
+
+    @property
+    def is_active(self):
+        return self._active
+
+    def unsubscribe(self):
+        self._active = False
+        if self._client is not None:
+            self._client._unwatch(self)
+
+    def _diff(self, results, read_time):
+        """
+        (snapshots, changes) against the previous delivery, or None.
+        """
+        current = {snap.reference.path: snap for snap in results}
+        order = list(current)
+        previous_order = list(self._last)
+        changes = []
+
+        for path, snap in self._last.items():
+            if path not in current:
+                changes.append(DocumentChange(ChangeType.REMOVED, snap, previous_order.index(path), -1))
+        for path, snap in current.items():
+            old = self._last.get(path)
+            if old is None:
+                changes.append(DocumentChange(ChangeType.ADDED, snap, -1, order.index(path)))
+            elif old.update_time != snap.update_time:
+                changes.append(DocumentChange(
+                    ChangeType.MODIFIED, snap, previous_order.index(path), order.index(path)
+                ))
+
+        first = not self._delivered
+        self._delivered = True
+        self._last = current
+
+        if not changes and not first:
+            return None
+        return list(current.values()), changes
+
+
+class _DocumentWatch(_Watch):
+    def __init__(self, reference, callback):
+        super().__init__(callback)
+        self.reference = reference
+
+    def affected_by(self, paths):
+        return self.reference.path in paths
+
+    def snapshot(self, client, read_time):
+        snap = client._snapshot(self.reference, client._stored(self.reference.path), read_time)
+        return [snap] if snap.exists else []
+
+
+class _QueryWatch(_Watch):
+    def __init__(self, query, callback):
+        super().__init__(callback)
+        self.query = query
+
+    def affected_by(self, paths):
+        return any(path.rsplit("/", 1)[0] == self.query._path for path in paths)
+
+    def snapshot(self, client, read_time):
+        return client._query_snapshots(self.query, read_time)
+
+
+# -----------------------------
+# CLIENT
+# -----------------------------
+class MemoryClient:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._collections = {}      # collection path → {doc_id: _Stored}
+        self._last_time = None
+        self._txn_counter = 0
+
+        self._watches = []
+        self._events = None
+        self._watch_thread = None
+
+        self._local = threading.local()
+        self.reset_counters()
+
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    # --- public client API ---
+    def collection(self, *path):
+        return CollectionReference(self, "/".join(path))
+
+    def document(self, *path):
+        return DocumentReference(self, "/".join(path))
+
+    def batch(self):
+        return WriteBatch(self)
+
+    def transaction(self, max_attempts=5, read_only=False, **kwargs):
+        return Transaction(self, max_attempts=max_attempts, read_only=read_only)
+
+    def write_option(self, last_update_time=None, exists=None):
+        return _Precondition(last_update_time=last_update_time, exists=exists)
+
+    def get_all(self, references, field_paths=None, transaction=None, **kwargs):
+        return iter(self._read(list(references), field_paths, transaction))
+
+    def collections(self):
+        with self._lock:
+            names = [path for path in self._collections if "/" not in path]
+        return [CollectionReference(self, name) for name in names]
+
+    # --- counters ---
+    def reset_counters(self):
+        self.reads = 0
+        self.writes = 0
+        self.queries = 0
+        self.commits = 0
+
+    def _count(self, **deltas):
+        local = self._local.__dict__
+        for name, value in deltas.items():
+            setattr(self, name, getattr(self, name) + value)
+            local[name] = local.get(name, 0) + value
+
+    def usage(self):
+        """
+        Counters charged to the calling thread since it started.
+        """
+        local = self._local.__dict__
+        return {name: local.get(name, 0) for name in ("reads", "writes", "queries", "commits")}
+
+    def stats(self):
+        with self._lock:
+            return {
+                "documents": sum(len(docs) for docs in self._collections.values()),
+                "collections": len(self._collections),
+                "listeners": len(self._watches),
+                "reads": self.reads,
+                "writes": self.writes,
+                "queries": self.queries,
+                "commits": self.commits,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._collections = {}
+
+    # --- internals ---
+    def _tick(self):
+        now = datetime.now(timezone.utc)
+        if self._last_time is not None and now <= self._last_time:
+            now = self._last_time + timedelta(microseconds=1)
+        self._last_time = now
+        return now
+
+    def _next_transaction_id(self):
+        with self._lock:
+            self._txn_counter += 1
+            return self._txn_counter.to_bytes(8, "big")
+
+    def _stored(self, path):
+        collection, doc_id = path.rsplit("/", 1)
+        return self._collections.get(collection, {}).get(doc_id)
+
+    def _snapshot(self, reference, stored, read_time, field_paths=None):
+        if stored is None:
+            return DocumentSnapshot(reference, None, read_time=read_time)
+
+        data = stored.data
+        if field_paths is not None:
+            data = {}
+            for field_path in field_paths:
+                value = _get_field(stored.data, field_path)
+                if value is not _MISSING:
+                    _set_field(data, field_path, value)
+
+        return DocumentSnapshot(
+            reference, copy.deepcopy(data),
+            create_time=stored.create_time, update_time=stored.update_time,
+            read_time=read_time,
+        )
+
+    def _read(self, references, field_paths, transaction):
+        with self._lock:
+            read_time = datetime.now(timezone.utc)
+            snaps = []
+            for ref in references:
+                stored = self._stored(ref.path)
+                if transaction is not None:
+                    transaction._record_read(ref.path, stored.update_time if stored else None)
+                snaps.append(self._snapshot(ref, stored, read_time, field_paths))
+            self._count(reads=len(references))
+        return snaps
+
+    def _query_snapshots(self, query, read_time):
+        return [
+            self._snapshot(DocumentReference(self, f"{query._path}/{doc_id}"), stored, read_time, query._fields)
+            for doc_id, stored in query._evaluate(self._collections.get(query._path, {}))
+        ]
+
+    def _run_query(self, query, transaction):
+        with self._lock:
+            read_time = datetime.now(timezone.utc)
+            results = self._query_snapshots(query, read_time)
+            if transaction is not None:
+                for snap in results:
+                    transaction._record_read(snap.reference.path, snap.update_time)
+            self._count(queries=1, reads=max(len(results), 1))
+        return results
+
+    def _commit(self, writes, read_versions=None):
+        if len(writes) > MAX_BATCH_WRITES:
+            raise InvalidArgument(f"A batch can contain at most {MAX_BATCH_WRITES} writes")
+
+        with self._lock:
+            self._count(commits=1)
+
+            for path, update_time in (read_versions or {}).items():
+                stored = self._stored(path)
+                if (stored.update_time if stored else None) != update_time:
+                    raise Aborted(f"Transaction lost a race on {path}")
+
+            now = self._tick()
+
+            # Stage every write first so a failing one leaves nothing applied
+            staged = {}
+            for write in writes:
+                stored = self._stored(write.path)
+                current = staged[write.path] if write.path in staged else (
+                    stored.data if stored else None
+                )
+                staged[write.path] = write.apply(current, stored, now)
+
+            for path, data in staged.items():
+                collection, doc_id = path.rsplit("/", 1)
+                docs = self._collections.setdefault(collection, {})
+                if data is None:
+                    docs.pop(doc_id, None)
+                    continue
+                previous = docs.get(doc_id)
+                docs[doc_id] = _Stored(data, previous.create_time if previous else now, now)
+
+            self._count(writes=len(writes))
+
+            if staged and self._watches:
+                self._events.put(set(staged))
+
+        return [WriteResult(now) for _ in writes]
+
+    # --- listeners ---
+    def _watch(self, watch):
+        with self._lock:
+            watch._client = self
+            self._watches.append(watch)
+            if self._watch_thread is None:
+                self._events = queue.Queue()
+                self._watch_thread = threading.Thread(
+                    target=self._deliver_loop, name="memory-store-watch", daemon=True
+                )
+                self._watch_thread.start()
+            self._events.put(watch)
+        return watch
+
+    def _after_fork(self):
+        # gunicorn --preload: the child keeps the data but not the parent's
+        # lock state or delivery thread
+        self._lock = threading.RLock()
+        self._watch_thread = None
+        watches, self._watches = self._watches, []
+        for watch in watches:
+            self._watch(watch)
+
+    def _unwatch(self, watch):
+        with self._lock:
+            if watch in self._watches:
+                self._watches.remove(watch)
+
+    def _deliver_loop(self):
+        while True:
+            event = self._events.get()
+
+            with self._lock:
+                if isinstance(event, _Watch):
+                    targets = [event] if event._active else []
+                else:
+                    targets = [w for w in self._watches if w.affected_by(event)]
+
+                read_time = datetime.now(timezone.utc)
+                deliveries = []
+                for watch in targets:
+                    diff = watch._diff(watch.snapshot(self, read_time), read_time)
+                    if diff is not None:
+                        self._count(reads=max(len(diff[1]), 1))
+                        deliveries.append((watch, diff))
+
+            for watch, (snapshots, changes) in deliveries:
+                if not watch._active:
+                    continue
+                try:
+                    watch._callback(snapshots, changes, read_time)
+                except Exception as e:
+                    print("❌ memory store listener failed:", e)
@@ -0,0 +1,15 @@
+import threading
+from collections import defaultdict
+
+_lock = threading.Lock()
+_counters = defaultdict(int)
+
+
+def incr(name, value=1):
+    with _lock:
+        _counters[name] += value
+
+
+def counters():
+    with _lock:
+        return dict(_counters)
@@ -0,0 +1,166 @@
+"""
+Request-scoped identity map of documents.
+
+While one HTTP request is handled, every document read goes through the
+instrumented client (utils.instrumentation), which asks here first:
+the first get() of a path reaches Firestore, later ones in the same
+request are answered with that snapshot. Writes the request commits keep
+the map honest:
+- set / create / update with plain values → the cached copy is updated
+  (with the commit's update_time, so ETags and preconditions stay exact)
+- delete → cached as missing
+- anything Firestore computes (SERVER_TIMESTAMP, Increment, ArrayUnion...)
+  → evicted, the next read goes to Firestore
+
+Lives on flask.g, so it is dropped with the request. Transactional and
+field-projected reads always go to Firestore, and so does anything
+outside a request (scheduler, flush threads, listeners, streamed bodies).
+SSE streams keep the request context for minutes, so utils.live clears
+the map before building each event.
+
+REQUEST_DOC_CACHE=0 turns it off.
+"""
+import copy
+import os
+
+from flask import g, has_request_context
+from google.cloud.firestore_v1 import transforms
+
+ENABLED = os.environ.get("REQUEST_DOC_CACHE", "1") == "1"
+
+_COMPUTED = (transforms.Sentinel, transforms._ValueList, transforms._NumericValue)
+
+
+class CachedSnapshot:
+    """
+    A document as this request last wrote it (DocumentSnapshot interface).
+    """
+
+    def __init__(self, reference, data, create_time=None, update_time=None):
+        self.reference = reference
+        self.id = reference.id
+        self.exists = data is not None
+        self.create_time = create_time
+        self.update_time = update_time
+        self.read_time = update_time
+        self._data = data
+
+    def to_dict(self):
+        return copy.deepcopy(self._data) if self.exists else None
+
+    def get(self, field_path):
+        if not self.exists:
+            return None
+        value = self._data
+        for part in field_path.split("."):
+            if not isinstance(value, dict) or part not in value:
+                raise KeyError(field_path)
+            value = value[part]
+        return copy.deepcopy(value)
+
+
+def active():
+    return ENABLED and has_request_context()
+
+
+def cacheable(kwargs):
+    """
+    Plain reads only: a transaction needs its own read, a projection
+    would cache a partial document.
+    """
+    return kwargs.get("transaction") is None and not kwargs.get("field_paths")
+
+
+def lookup(path):
+    if not active():
+        return None
+    return g.get("_documents", {}).get(path)
+
+
+def remember(snapshot):
+    if active():
+        g.setdefault("_documents", {})[snapshot.reference.path] = snapshot
+
+
+def clear():
+    if has_request_context():
+        g.pop("_documents", None)
+
+
+def written(reference, op, data=None, merge=False, update_time=None):
+    """
+    Bring the cached copy of `reference` up to date after `op` committed.
+    """
+    if not active():
+        return
+
+    documents = g.setdefault("_documents", {})
+    path = reference.path
+    cached = documents.pop(path, None)
+
+    if op == "delete":
+        documents[path] = CachedSnapshot(reference, None)
+        return
+
+    if update_time is None or merge not in (False, True):
+        return
+
+    if op in ("set", "create") and not merge:
+        if _computed(data):
+            return
+        new = copy.deepcopy(data)
+        create_time = cached.create_time if cached is not None and cached.exists else None
+        if op == "create":
+            create_time = update_time
+
+    else:
+        # update / set(merge=True): only a copy we already hold can be patched
+        if cached is None or not cached.exists:
+            return
+        new = cached.to_dict()
+        create_time = cached.create_time
+
+        if op == "update":
+            for key, value in data.items():
+                if not isinstance(key, str) or "`" in key or _computed(value, allow_delete=True):
+                    return
+                _apply(new, key.split("."), value)
+        else:
+            if _computed(data):
+                return
+            _merge(new, data)
+
+    documents[path] = CachedSnapshot(reference, new, create_time, update_time)
+
+
+def _computed(value, allow_delete=False):
+    if allow_delete and value is transforms.DELETE_FIELD:
+        return False
+    if isinstance(value, _COMPUTED):
+        return True
+    if isinstance(value, dict):
+        return any(_computed(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return any(_computed(v) for v in value)
+    return False
+
+
+def _apply(data, parts, value):
+    for part in parts[:-1]:
+        child = data.get(part)
+        if not isinstance(child, dict):
+            child = data[part] = {}
+        data = child
+
+    if value is transforms.DELETE_FIELD:
+        data.pop(parts[-1], None)
+    else:
+        data[parts[-1]] = copy.deepcopy(value)
+
+
+def _merge(data, changes):
+    for key, value in changes.items():
+        if isinstance(value, dict) and isinstance(data.get(key), dict):
+            _merge(data[key], value)
+        else:
+            data[key] = copy.deepcopy(value)
@@ -1,76 +1,122 @@
 from datetime import datetime, timezone, timedelta
-from firebase import get_db
-
-db = get_db()
+from utils.accounts import get_owner_ref, invalidate_owner
+from utils.dispatch import mechanic_index
+from utils.transactions import run_transaction
 
 RADIUS_STEPS = [3, 5, 8, 12]   # km
 MAX_EXPANSIONS = 3            # 2 expansions → 15 minutes total
 EXPANSION_INTERVAL = 30
 
+# Largest radius a request can ever reach (used to pick query geocells)
+MAX_SEARCH_RADIUS_KM = max(RADIUS_STEPS)
+
 
-def maybe_expand_radius(req_ref, req):
+def skill_key(vehicle_type, service_type):
     """
-    Handles:
-    1. Progressive radius expansion
-    2. Final timeout after max expansions
+    "CAR#BATTERY": both skill dimensions in one indexed field, so nearby
+    queries filter on it (composite index in firestore.indexes.json).
     """
+    return f"{(vehicle_type or '').upper()}#{(service_type or '').upper()}"
 
-    if req.get("status") != "SEARCHING":
-        return
 
-    now = datetime.now(timezone.utc)
+def skill_keys(vehicle_types, service_types):
+    """
+    Every skill_key a mechanic with these skills can serve.
+    """
+    return sorted({skill_key(v, s) for v in vehicle_types for s in service_types})
+
+
+def _window_changes(req, now):
+    """
+    Fields to write when a SEARCHING request's window has passed:
+    a wider radius, or the final TIMEOUT. None when nothing is due.
+    """
+    if req.get("status") != "SEARCHING":
+        return None
 
     timeout_at = req.get("timeout_at")
-    if not timeout_at:
-        return
+    if not timeout_at or now <= timeout_at:
+        return None
 
     count = req.get("radius_expanded_count", 0)
 
-    # ⏱️ TIME WINDOW EXPIRED
-    if now > timeout_at:
-
-        # 🔁 EXPAND RADIUS (if allowed)
-        if count < MAX_EXPANSIONS:
-            new_radius = RADIUS_STEPS[count + 1]
-
-            print("━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━")
-            print(f"📌 REQUEST ID: {req_ref.id}")
-            print(f"⏱️ NOW: {now}")
-            print(f"⏰ PREVIOUS TIMEOUT_AT: {timeout_at}")
-            print(f"📏 CURRENT RADIUS: {req.get('search_radius_km')} km")
-            print(f"🔁 EXPANSION COUNT: {count}")
-            print(f"🚀 EXPANDING TO: {new_radius} km")
-
-            req_ref.update({
-                "search_radius_km": new_radius,
-                "radius_expanded_count": count + 1,
-                "timeout_at": now + timedelta(seconds=EXPANSION_INTERVAL)
-            })
-            return
-
-        # ⛔ FINAL TIMEOUT
-        print("━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━")
-        print(f"📌 REQUEST ID: {req_ref.id}")
-        print("⛔ FINAL TIMEOUT REACHED")
+    # 🔁 EXPAND RADIUS (if allowed)
+    if count < MAX_EXPANSIONS:
+        return {
+            "search_radius_km": RADIUS_STEPS[count + 1],
+            "radius_expanded_count": count + 1,
+            "timeout_at": now + timedelta(seconds=EXPANSION_INTERVAL)
+        }
+
+    # ⛔ FINAL TIMEOUT
+    return {
+        "status": "TIMEOUT",
+        "timed_out_at": now
+    }
+
+
+def maybe_expand_radius(req_ref, now=None):
+    """
+    Handles:
+    1. Progressive radius expansion
+    2. Final timeout after max expansions
 
-        req_ref.update({
-            "status": "TIMEOUT",
-            "timed_out_at": now
-        })
-
-        # 🔓 Clear owner active request
-        owner_phone = req.get("owner_phone")
-        if owner_phone:
-            owner_docs = (
-                db.collection("owners")
-                .where("phone", "==", owner_phone)
-                .limit(1)
-                .get()
-            )
-            if owner_docs:
-                owner_docs[0].reference.update({
-                    "active_request_id": None
-                })
-
-        return
+    The request is re-read inside a transaction and only written while it
+    is still SEARCHING, so an accept or cancel that commits first is
+    never overwritten.
 
+    Returns the request dict as committed (unchanged when nothing was
+    due), or None when the request doesn't exist.
+
+    `now` can be injected (scheduler / tests); defaults to UTC now.
+    """
+    now = now or datetime.now(timezone.utc)
+
+    def txn(transaction):
+        req_doc = req_ref.get(transaction=transaction)
+        if not req_doc.exists:
+            return None, None, None
+
+        req = req_doc.to_dict()
+        changes = _window_changes(req, now)
+        if changes is None:
+            return req, None, None      # accepted / cancelled meanwhile, or not due
+
+        owner_ref = None
+        if changes.get("status") == "TIMEOUT":
+            owner_ref = get_owner_ref(req.get("owner_phone"))
+            owner_doc = owner_ref.get(transaction=transaction) if owner_ref else None
+            # Only clear the owner's pointer if it still points here
+            if not (owner_doc and owner_doc.exists
+                    and owner_doc.to_dict().get("active_request_id") == req_ref.id):
+                owner_ref = None
+        else:
+            # 🧭 Re-dispatch at the wider radius
+            changes.update(mechanic_index.dispatch(req, changes["search_radius_km"]))
+
+        transaction.update(req_ref, changes)
+        if owner_ref:
+            transaction.update(owner_ref, {"active_request_id": None})
+
+        return {**req, **changes}, req, changes
+
+    updated, before, changes = run_transaction(txn, "expand")
+    if before is None:
+        return updated
+
+    print("━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━")
+    print(f"📌 REQUEST ID: {req_ref.id}")
+    print(f"⏱️ NOW: {now}")
+
+    if updated.get("status") == "TIMEOUT":
+        print("⛔ FINAL TIMEOUT REACHED")
+        mechanic_index.release_offers(req_ref.id)
+        invalidate_owner(updated.get("owner_phone"))
+    else:
+        mechanic_index.record_offers(req_ref.id, changes)
+        print(f"⏰ PREVIOUS TIMEOUT_AT: {before.get('timeout_at')}")
+        print(f"📏 PREVIOUS RADIUS: {before.get('search_radius_km')} km")
+        print(f"🚀 EXPANDED TO: {updated['search_radius_km']} km "
+              f"(expansion {updated['radius_expanded_count']})")
+
+    return updated
@@ -0,0 +1,287 @@
+"""
+Background driver for radius expansion and final TIMEOUT.
+
+Keeps a min-heap of (timeout_at, request_id) for SEARCHING requests and
+calls maybe_expand_radius exactly when each window expires, so the GET
+endpoints never have to write. A Firestore lease document makes sure only
+one process (across gunicorn workers / instances) runs it at a time.
+
+Run standalone with:  python -m utils.scheduler
+"""
+import heapq
+import os
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime, timezone, timedelta
+
+from google.cloud import firestore
+
+from firebase import get_db
+from utils.request_logic import maybe_expand_radius
+from utils.transactions import TransactionContention
+
+RESCAN_INTERVAL = 10      # seconds between SEARCHING re-scans (picks up new requests)
+FULL_RESCAN_INTERVAL = 300  # seconds between scans of every SEARCHING request
+IDLE_SLEEP = 1.0          # max seconds the loop sleeps between checks
+LEASE_TTL = 20            # seconds a leader lease stays valid without renewal
+LEASE_DOC = ("scheduler", "radius_expansion")
+
+
+def utc_now():
+    return datetime.now(timezone.utc)
+
+
+class LeaderLease:
+    """
+    Time-bounded lease stored in Firestore. Whoever holds an unexpired
+    lease is the leader; the holder renews it every ttl/2 seconds.
+    """
+
+    def __init__(self, db, clock=utc_now, ttl=LEASE_TTL, holder=None):
+        self.db = db
+        self.clock = clock
+        self.ttl = ttl
+        self.holder = holder or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self.ref = db.collection(LEASE_DOC[0]).document(LEASE_DOC[1])
+
+        self._is_leader = False
+        self._next_attempt = None
+
+    def acquire(self):
+        """
+        Take or renew the lease. Returns True if we are the leader.
+        Only talks to Firestore every ttl/2 seconds.
+        """
+        now = self.clock()
+        if self._next_attempt is not None and now < self._next_attempt:
+            return self._is_leader
+
+        self._is_leader = self._try_acquire()
+        self._next_attempt = now + timedelta(seconds=self.ttl / 2)
+        return self._is_leader
+
+    def _try_acquire(self):
+        transaction = self.db.transaction()
+
+        @firestore.transactional
+        def txn(transaction):
+            snap = self.ref.get(transaction=transaction)
+            lease = snap.to_dict() if snap.exists else {}
+            now = self.clock()
+
+            held_by_other = (
+                lease.get("holder") not in (None, self.holder)
+                and lease.get("expires_at")
+                and lease["expires_at"] > now
+            )
+            if held_by_other:
+                return False
+
+            transaction.set(self.ref, {
+                "holder": self.holder,
+                "expires_at": now + timedelta(seconds=self.ttl)
+            })
+            return True
+
+        try:
+            return txn(transaction)
+        except Exception as e:
+            print("⚠️ SCHEDULER LEASE ERROR:", e)
+            return False
+
+
+class ExpansionScheduler:
+    def __init__(self, db, clock=utc_now, lease=None,
+                 rescan_interval=RESCAN_INTERVAL):
+        self.db = db
+        self.clock = clock
+        self.lease = lease
+        self.rescan_interval = rescan_interval
+
+        self._heap = []          # (timeout_at, request_id)
+        self._due = {}           # request_id -> timeout_at currently scheduled
+        self._next_rescan = None
+        self._scanned_until = None   # timeout_at covered by earlier scans
+        self._next_full_rescan = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    # -----------------------------
+    # HEAP
+    # -----------------------------
+    def schedule(self, request_id, timeout_at):
+        with self._lock:
+            if self._due.get(request_id) == timeout_at:
+                return
+            self._due[request_id] = timeout_at
+            heapq.heappush(self._heap, (timeout_at, request_id))
+
+    def next_due(self):
+        with self._lock:
+            while self._heap:
+                timeout_at, request_id = self._heap[0]
+                if self._due.get(request_id) == timeout_at:
+                    return timeout_at
+                heapq.heappop(self._heap)   # stale entry
+            return None
+
+    def _pop_due(self, now):
+        due = []
+        with self._lock:
+            while self._heap and self._heap[0][0] < now:
+                timeout_at, request_id = heapq.heappop(self._heap)
+                if self._due.get(request_id) != timeout_at:
+                    continue
+                del self._due[request_id]
+                due.append(request_id)
+        return due
+
+    # -----------------------------
+    # WORK
+    # -----------------------------
+    def rescan(self):
+        """
+        Load SEARCHING requests into the heap. Cheap to repeat:
+        already-scheduled entries are skipped.
+
+        The first scan as leader (and one every FULL_RESCAN_INTERVAL)
+        reads every SEARCHING request. In between, only requests whose
+        timeout_at entered the window since the last scan are read,
+        (scanned_until, now + rescan_interval], so each request is read
+        about once per expansion window rather than on every rescan.
+        That misses nothing as long as the window stays shorter than
+        EXPANSION_INTERVAL: every write sets timeout_at at least that far
+        ahead, past anything already scanned. Expansions this scheduler
+        writes are re-queued by run_due directly.
+        """
+        now = self.clock()
+        until = now + timedelta(seconds=self.rescan_interval)
+
+        query = self.db.collection("requests").where("status", "==", "SEARCHING")
+
+        full = (
+            self._scanned_until is None
+            or self._next_full_rescan is None
+            or now >= self._next_full_rescan
+        )
+        if full:
+            self._next_full_rescan = now + timedelta(seconds=FULL_RESCAN_INTERVAL)
+        else:
+            query = (
+                query.where("timeout_at", ">", self._scanned_until)
+                .where("timeout_at", "<=", until)
+            )
+
+        for doc in query.get():
+            timeout_at = doc.get("timeout_at")
+            if timeout_at:
+                self.schedule(doc.id, timeout_at)
+
+        self._scanned_until = until
+
+    def run_due(self):
+        """
+        Expand / time out every request whose window has passed.
+        Returns the number of requests processed.
+        """
+        now = self.clock()
+        due = self._pop_due(now)
+
+        for request_id in due:
+            req_ref = self.db.collection("requests").document(request_id)
+            try:
+                req = maybe_expand_radius(req_ref, now=now)
+            except TransactionContention:
+                # Someone else is writing the request → look again next tick
+                self.schedule(request_id, now)
+                continue
+
+            if req is None:
+                continue
+
+            # Still searching → wait for the next window
+            if req.get("status") == "SEARCHING" and req.get("timeout_at"):
+                self.schedule(request_id, req["timeout_at"])
+
+        return len(due)
+
+    def tick(self):
+        """
+        One scheduler iteration. Returns False when not the leader.
+        """
+        if self.lease is not None and not self.lease.acquire():
+            with self._lock:
+                self._heap.clear()
+                self._due.clear()
+            self._next_rescan = None
+            self._scanned_until = None     # full scan on regaining leadership
+            return False
+
+        now = self.clock()
+        if self._next_rescan is None or now >= self._next_rescan:
+            self.rescan()
+            self._next_rescan = now + timedelta(seconds=self.rescan_interval)
+
+        self.run_due()
+        return True
+
+    # -----------------------------
+    # THREAD
+    # -----------------------------
+    def _sleep_seconds(self):
+        wake = [self._next_rescan, self.next_due()]
+        wake = [w for w in wake if w is not None]
+        if not wake:
+            return IDLE_SLEEP
+        delta = (min(wake) - self.clock()).total_seconds()
+        return min(max(delta, 0.05), IDLE_SLEEP)
+
+    def run_forever(self):
+        print("⏰ RADIUS SCHEDULER STARTED")
+        while not self._stop.is_set():
+            try:
+                self.tick()
+            except Exception as e:
+                print("🔥 SCHEDULER ERROR:", e)
+            self._stop.wait(self._sleep_seconds())
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return self
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self.run_forever, name="radius-scheduler", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+
+
+_scheduler = None
+
+
+def start_scheduler():
+    """
+    Start the process-wide scheduler thread (leader-elected).
+    """
+    global _scheduler
+    if _scheduler is None:
+        db = get_db()
+        _scheduler = ExpansionScheduler(db, lease=LeaderLease(db))
+    return _scheduler.start()
+
+
+if __name__ == "__main__":
+    scheduler = start_scheduler()
+    try:
+        while True:
+            time.sleep(60)
+    except KeyboardInterrupt:
+        scheduler.stop()
@@ -0,0 +1,95 @@
+"""
+Incrementally maintained per-mechanic aggregates.
+
+    mechanic_stats/<phone>
+        jobs_completed, earnings_total, rating_sum, rating_count, updated_at
+    mechanic_stats/<phone>/days/<YYYY-MM-DD>      (UTC)
+        same counters for that day
+
+Writes are Increment transforms queued on the caller's batch, so they
+commit atomically with the request change that caused them and never
+need a read. scripts/backfill_mechanic_stats.py rebuilds them from
+requests / bills.
+"""
+from datetime import datetime, timezone
+
+from google.cloud import firestore
+
+from firebase import get_db
+
+db = get_db()
+
+STATS = "mechanic_stats"
+DAYS = "days"
+
+COUNTERS = ("jobs_completed", "earnings_total", "rating_sum", "rating_count")
+
+
+def day_key(when=None):
+    when = when or datetime.now(timezone.utc)
+    return when.strftime("%Y-%m-%d")
+
+
+def stats_ref(phone):
+    return db.collection(STATS).document(phone)
+
+
+def day_ref(phone, day):
+    return stats_ref(phone).collection(DAYS).document(day)
+
+
+def _queue(batch, phone, when, **counters):
+    if not phone:
+        return
+
+    day = day_key(when)
+    changes = {name: firestore.Increment(value) for name, value in counters.items() if value}
+    if not changes:
+        return
+
+    changes["updated_at"] = firestore.SERVER_TIMESTAMP
+
+    batch.set(stats_ref(phone), {"phone": phone, **changes}, merge=True)
+    batch.set(day_ref(phone, day), {"day": day, **changes}, merge=True)
+
+
+def queue_job_completed(batch, phone, when=None):
+    _queue(batch, phone, when, jobs_completed=1)
+
+
+def queue_earnings(batch, phone, amount, when=None):
+    _queue(batch, phone, when, earnings_total=amount or 0)
+
+
+def queue_rating(batch, phone, rating, when=None):
+    _queue(batch, phone, when, rating_sum=rating, rating_count=1)
+
+
+def summarize(data):
+    data = data or {}
+    summary = {name: data.get(name, 0) for name in COUNTERS}
+    summary["avg_rating"] = (
+        round(summary["rating_sum"] / summary["rating_count"], 2)
+        if summary["rating_count"] else None
+    )
+    return summary
+
+
+def get_mechanic_stats(phone, days=0):
+    """
+    One read for the totals, plus one per day requested (newest first).
+    """
+    summary = summarize(stats_ref(phone).get().to_dict())
+
+    if days:
+        day_docs = (
+            stats_ref(phone).collection(DAYS)
+            .order_by("__name__", direction="DESCENDING")
+            .limit(days)
+            .get()
+        )
+        summary["days"] = [
+            {"day": d.id, **summarize(d.to_dict())} for d in day_docs
+        ]
+
+    return summary
@@ -0,0 +1,279 @@
+"""
+Write-coalescing ingestion for mechanic location pings.
+
+POST /mechanic/update-location used to read the request and write it on
+every ping. Now:
+  • the auth / status check is served from a short-lived cache of active
+    assignments (request_id → mechanic_phone, status)
+  • pings are buffered per request; only the latest position survives
+    until the next flush, and moves under MIN_MOVE_METERS are dropped
+    (unless the last write is older than MAX_SILENCE)
+  • a background thread flushes the buffer every FLUSH_INTERVAL seconds,
+    one small transaction per FLUSH_TXN_SIZE requests: each request's
+    status is re-read and the position is only written while it is still
+    ACCEPTED / IN_PROGRESS, so a job closed by another worker (whose
+    assignment cache hasn't expired yet) is never written to again.
+    Transactions stay small so they rarely collide with accepts / status
+    changes; a chunk that still fails goes back into the buffer unless a
+    newer ping replaced it
+
+The owner view therefore lags the mechanic by at most FLUSH_INTERVAL.
+Counters go to utils.metrics (location_*), visible at GET /stats.
+"""
+import atexit
+import threading
+import time
+from datetime import datetime
+
+from firebase import get_db
+from utils import metrics
+from utils.cache import LRUCache
+from utils.geo import haversine
+from utils.transactions import run_transaction
+from utils.trail import trail_recorder
+from utils.eta import forget_eta, eta_stats
+
+db = get_db()
+
+TRACKABLE_STATUSES = ("ACCEPTED", "IN_PROGRESS")
+
+ASSIGNMENT_CACHE_SIZE = 10000
+ASSIGNMENT_TTL = 15         # seconds
+
+FLUSH_INTERVAL = 2.0        # seconds
+MIN_MOVE_METERS = 10
+MAX_SILENCE = 30            # seconds; write anyway so updated_at stays fresh
+FLUSH_TXN_SIZE = 20         # requests locked per flush transaction
+
+
+class ActiveAssignments:
+    """
+    request_id → {"mechanic_phone", "status"} for trackable requests only.
+    Other statuses are never cached, so a request is trackable as soon
+    as it is accepted.
+    """
+
+    def __init__(self, db, ttl=ASSIGNMENT_TTL, maxsize=ASSIGNMENT_CACHE_SIZE):
+        self.db = db
+        self._cache = LRUCache(maxsize, ttl=ttl)
+
+    def get(self, request_id):
+        assignment = self._cache.get(request_id)
+        if assignment is not None:
+            return assignment
+
+        req_doc = self.db.collection("requests").document(request_id).get()
+        if not req_doc.exists:
+            return None
+
+        req = req_doc.to_dict()
+        assignment = {
+            "mechanic_phone": req.get("mechanic_phone"),
+            "status": req.get("status")
+        }
+
+        if assignment["status"] in TRACKABLE_STATUSES:
+            self._cache.set(request_id, assignment)
+
+        return assignment
+
+    def forget(self, request_id):
+        self._cache.pop(request_id)
+
+    def stats(self):
+        return self._cache.stats()
+
+
+class LocationBuffer:
+    """
+    Latest pending position per request, flushed in batches.
+    """
+
+    def __init__(self, db, clock=time.monotonic,
+                 flush_interval=FLUSH_INTERVAL,
+                 min_move_m=MIN_MOVE_METERS,
+                 max_silence=MAX_SILENCE):
+        self.db = db
+        self.clock = clock
+        self.flush_interval = flush_interval
+        self.min_move_m = min_move_m
+        self.max_silence = max_silence
+
+        self._lock = threading.Lock()
+        self._pending = {}          # request_id -> location dict
+        self._written = {}          # request_id -> (lat, lng, written_at)
+
+        self._stop = threading.Event()
+        self._thread = None
+
+    def offer(self, request_id, lat, lng):
+        """
+        Queue a ping. Returns False when it was dropped as sub-threshold.
+        """
+        metrics.incr("location_received")
+        now = self.clock()
+
+        with self._lock:
+            last = self._written.get(request_id)
+            if last and request_id not in self._pending:
+                moved_m = haversine(last[0], last[1], lat, lng) * 1000
+                if moved_m < self.min_move_m and now - last[2] < self.max_silence:
+                    metrics.incr("location_dropped")
+                    return False
+
+            if request_id in self._pending:
+                metrics.incr("location_coalesced")
+
+            self._pending[request_id] = {
+                "lat": lat,
+                "lng": lng,
+                "updated_at": datetime.utcnow().isoformat()
+            }
+
+        # 🧵 Every kept ping goes on the route trail, coalesced or not
+        trail_recorder.add(request_id, lat, lng)
+
+        self._ensure_started()
+        return True
+
+    def forget(self, request_id):
+        with self._lock:
+            self._pending.pop(request_id, None)
+            self._written.pop(request_id, None)
+
+    def flush(self):
+        self._flush_trail()
+
+        with self._lock:
+            pending, self._pending = self._pending, {}
+
+        if not pending:
+            return 0
+
+        items = list(pending.items())
+        written = 0
+
+        for start in range(0, len(items), FLUSH_TXN_SIZE):
+            chunk = dict(items[start:start + FLUSH_TXN_SIZE])
+
+            try:
+                kept = run_transaction(
+                    lambda transaction: self._write_chunk(transaction, chunk),
+                    "location_flush"
+                )
+            except Exception as e:
+                print("📍 LOCATION FLUSH ERROR:", e)
+                metrics.incr("location_flush_errors")
+                self._requeue(chunk)
+                continue
+
+            now = self.clock()
+            with self._lock:
+                for request_id in chunk:
+                    if request_id in kept:
+                        location = chunk[request_id]
+                        self._written[request_id] = (location["lat"], location["lng"], now)
+                    else:
+                        self._written.pop(request_id, None)
+
+            for request_id in chunk:
+                if request_id not in kept:
+                    active_assignments.forget(request_id)
+
+            written += len(kept)
+            metrics.incr("location_batches")
+            metrics.incr("location_skipped_closed", len(chunk) - len(kept))
+
+        metrics.incr("location_written", written)
+        return written
+
+    def _requeue(self, chunk):
+        """
+        Put positions from a failed write back, unless a newer ping for
+        the same request arrived meanwhile.
+        """
+        with self._lock:
+            for request_id, location in chunk.items():
+                if request_id not in self._pending:
+                    self._pending[request_id] = location
+                    metrics.incr("location_requeued")
+
+    def _write_chunk(self, transaction, chunk):
+        """
+        Write each pending position whose request is still trackable.
+        Returns the request IDs written.
+        """
+        refs = [self.db.collection("requests").document(r) for r in chunk]
+        snaps = self.db.get_all(refs, field_paths=["status"], transaction=transaction)
+
+        kept = set()
+        for snap in snaps:
+            if snap.exists and snap.get("status") in TRACKABLE_STATUSES:
+                kept.add(snap.id)
+
+        for ref in refs:
+            if ref.id in kept:
+                transaction.update(ref, {"mechanic_location": chunk[ref.id]})
+
+        return kept
+
+    def _flush_trail(self):
+        trail_recorder.write()
+
+    # ---------- background flusher ----------
+
+    def _ensure_started(self):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(
+                        target=self._run, name="location-flusher", daemon=True
+                    )
+                    self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception as e:
+                print("📍 LOCATION FLUSHER ERROR:", e)
+
+    def stop(self):
+        self._stop.set()
+        self.flush()
+        trail_recorder.flush()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "pending": len(self._pending),
+                "tracked": len(self._written),
+                "trail_pending_points": trail_recorder.pending(),
+                "flush_interval_seconds": self.flush_interval
+            }
+
+
+active_assignments = ActiveAssignments(db)
+location_buffer = LocationBuffer(db)
+
+# Don't lose the last few seconds of pings on a clean shutdown
+atexit.register(trail_recorder.flush)
+atexit.register(location_buffer.flush)
+
+
+def end_tracking(request_id):
+    """
+    Call when a request leaves ACCEPTED / IN_PROGRESS.
+    """
+    active_assignments.forget(request_id)
+    location_buffer.forget(request_id)
+    forget_eta(request_id)
+    trail_recorder.flush(request_id)
+
+
+def tracking_stats():
+    return {
+        "assignments": active_assignments.stats(),
+        "eta": eta_stats(),
+        "buffer": location_buffer.stats()
+    }
@@ -0,0 +1,276 @@
+"""
+Append-only location trail per job, stored as packed binary chunks.
+
+    requests/<request_id>/trail/<start_ms>-<rand>
+        v        : format version (1)
+        count    : points in the chunk
+        start_ts : first point, unix seconds
+        end_ts   : last point, unix seconds
+        data     : bytes — zigzag varints of (Δlat_e5, Δlng_e5, Δts) per
+                   point, the first point delta'd from zero
+
+lat / lng are quantised to 1e-5 degrees (~1.1 m) and time to seconds, so
+a typical ping costs 3–4 bytes. Chunk IDs sort by time and are created,
+never updated, so appends need no reads and no coordination between
+processes.
+
+Points are buffered in memory per request and written when a chunk
+reaches CHUNK_POINTS or its oldest point is CHUNK_MAX_AGE seconds old,
+by the location flusher in utils.tracking.
+"""
+import heapq
+import threading
+import time
+import uuid
+
+from firebase import get_db
+from utils import metrics
+
+db = get_db()
+
+FORMAT_VERSION = 1
+COORD_SCALE = 100000        # 1e-5 degrees
+CHUNK_POINTS = 200
+CHUNK_MAX_AGE = 60          # seconds
+BATCH_LIMIT = 500           # Firestore max writes per batch
+
+
+# ---------- encoding ----------
+
+def _zigzag(n):
+    return (n << 1) ^ (n >> 63)
+
+
+def _unzigzag(n):
+    return (n >> 1) ^ -(n & 1)
+
+
+def _write_varint(out, n):
+    while n >= 0x80:
+        out.append((n & 0x7F) | 0x80)
+        n >>= 7
+    out.append(n)
+
+
+def _read_varint(data, pos):
+    shift = result = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return result, pos
+        shift += 7
+
+
+def encode_points(points):
+    """
+    [(lat, lng, ts), ...] → bytes
+    """
+    out = bytearray()
+    prev = (0, 0, 0)
+    for lat, lng, ts in points:
+        q = (round(lat * COORD_SCALE), round(lng * COORD_SCALE), int(ts))
+        for value, last in zip(q, prev):
+            _write_varint(out, _zigzag(value - last))
+        prev = q
+    return bytes(out)
+
+
+def decode_points(data):
+    """
+    bytes → [(lat, lng, ts), ...]
+    """
+    points = []
+    lat = lng = ts = 0
+    pos = 0
+    while pos < len(data):
+        d_lat, pos = _read_varint(data, pos)
+        d_lng, pos = _read_varint(data, pos)
+        d_ts, pos = _read_varint(data, pos)
+        lat += _unzigzag(d_lat)
+        lng += _unzigzag(d_lng)
+        ts += _unzigzag(d_ts)
+        points.append((lat / COORD_SCALE, lng / COORD_SCALE, ts))
+    return points
+
+
+# ---------- writing ----------
+
+def _trail(db, request_id):
+    return db.collection("requests").document(request_id).collection("trail")
+
+
+class TrailRecorder:
+    """
+    Per-request buffers of points not yet written as a chunk.
+    """
+
+    def __init__(self, db, clock=time.time,
+                 chunk_points=CHUNK_POINTS, chunk_max_age=CHUNK_MAX_AGE):
+        self.db = db
+        self.clock = clock
+        self.chunk_points = chunk_points
+        self.chunk_max_age = chunk_max_age
+
+        self._lock = threading.Lock()
+        self._points = {}           # request_id -> [(lat, lng, ts), ...]
+
+    def add(self, request_id, lat, lng, ts=None):
+        ts = self.clock() if ts is None else ts
+        with self._lock:
+            self._points.setdefault(request_id, []).append((lat, lng, ts))
+
+    def _take(self, request_id=None, force=False):
+        now = self.clock()
+        taken = {}
+        with self._lock:
+            ids = [request_id] if request_id else list(self._points)
+            for rid in ids:
+                points = self._points.get(rid)
+                if not points:
+                    continue
+                due = (
+                    force
+                    or len(points) >= self.chunk_points
+                    or now - points[0][2] >= self.chunk_max_age
+                )
+                if due:
+                    taken[rid] = self._points.pop(rid)
+        return taken
+
+    def restore(self, taken):
+        """
+        Put points back after a failed commit.
+        """
+        with self._lock:
+            for rid, points in taken.items():
+                self._points[rid] = points + self._points.get(rid, [])
+
+    def _chunk_docs(self, taken):
+        """
+        (request_id, points, chunk ref, chunk data) per chunk, in time
+        order within each request.
+        """
+        for rid, points in taken.items():
+            for start in range(0, len(points), self.chunk_points):
+                chunk = points[start:start + self.chunk_points]
+                chunk_id = f"{int(chunk[0][2] * 1000):013d}-{uuid.uuid4().hex[:6]}"
+                yield rid, chunk, _trail(self.db, rid).document(chunk_id), {
+                    "v": FORMAT_VERSION,
+                    "count": len(chunk),
+                    "start_ts": int(chunk[0][2]),
+                    "end_ts": int(chunk[-1][2]),
+                    "data": encode_points(chunk)
+                }
+
+    def write(self, request_id=None, force=False):
+        """
+        Write due chunks (every buffered point with force), at most
+        BATCH_LIMIT per commit. A failed commit puts back only its own
+        points, so one bad batch can't keep the rest from draining.
+        Returns the number of chunks written.
+        """
+        if not self.pending():
+            return 0
+
+        chunks = list(self._chunk_docs(self._take(request_id, force)))
+        failed = {}
+        written = 0
+
+        for start in range(0, len(chunks), BATCH_LIMIT):
+            group = chunks[start:start + BATCH_LIMIT]
+            batch = self.db.batch()
+            for _, _, ref, data in group:
+                batch.create(ref, data)
+
+            try:
+                batch.commit()
+            except Exception as e:
+                print("🧵 TRAIL FLUSH ERROR:", e)
+                metrics.incr("trail_flush_errors")
+                for rid, chunk, _, _ in group:
+                    failed.setdefault(rid, []).extend(chunk)
+                continue
+
+            written += len(group)
+
+        if failed:
+            self.restore(failed)
+        if written:
+            metrics.incr("trail_chunks_written", written)
+        return written
+
+    def flush(self, request_id=None):
+        """
+        Write everything buffered (for request_id, or all) right now.
+        """
+        return self.write(request_id, force=True)
+
+    def recent(self, request_id):
+        """
+        Points buffered in this process that are not yet written.
+        """
+        with self._lock:
+            return list(self._points.get(request_id, ()))
+
+    def pending(self):
+        with self._lock:
+            return sum(len(p) for p in self._points.values())
+
+
+# ---------- reading ----------
+
+def _merged_points(docs, since=None):
+    """
+    (ts, lat, lng) across chunks in time order. Chunks from different
+    workers overlap in time, so chunk order alone isn't point order:
+    points wait on a heap until a chunk starting after them is read.
+    """
+    heap = []
+    for doc in docs:
+        if since is not None and (doc.get("end_ts") or 0) < since:
+            continue
+
+        start_ts = doc.get("start_ts") or 0
+        while heap and heap[0][0] < start_ts:
+            yield heapq.heappop(heap)
+
+        for lat, lng, ts in decode_points(doc.get("data") or b""):
+            if since is None or ts >= since:
+                heapq.heappush(heap, (ts, lat, lng))
+
+    while heap:
+        yield heapq.heappop(heap)
+
+
+def iter_trail(request_id, interval=None, since=None):
+    """
+    Yield (lat, lng, ts) in time order. With `interval` (seconds) only
+    points at least that far apart are kept; `since` (unix seconds) skips
+    older points without decoding chunks that end before it.
+    """
+    docs = _trail(db, request_id).order_by("__name__").stream()
+
+    last_ts = None
+    for ts, lat, lng in _merged_points(docs, since):
+        if interval and last_ts is not None and ts - last_ts < interval:
+            continue
+        last_ts = ts
+        yield lat, lng, ts
+
+
+def latest_points(request_id):
+    """
+    Points of the most recently written chunk (one read).
+    """
+    docs = (
+        _trail(db, request_id)
+        .order_by("__name__", direction="DESCENDING")
+        .limit(1)
+        .get()
+    )
+    return decode_points(docs[0].get("data") or b"") if docs else []
+
+
+trail_recorder = TrailRecorder(db)
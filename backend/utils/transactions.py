@@ -0,0 +1,73 @@
+"""
+Firestore transactions with bounded retry, jittered backoff and
+contention counters (see utils.metrics / GET /stats).
+
+The stock @firestore.transactional retries Aborted commits immediately
+and silently; here each retry is counted and spaced out so a burst of
+writers on one hot document doesn't keep colliding.
+"""
+import random
+import time
+
+from google.api_core.exceptions import Aborted
+from google.cloud import firestore
+
+from firebase import get_db
+from utils import metrics
+
+db = get_db()
+
+MAX_ATTEMPTS = 4
+BACKOFF_BASE = 0.05    # seconds; doubles each retry
+BACKOFF_MAX = 0.5
+
+
+class TransactionRejected(Exception):
+    """
+    Raise inside a transaction function to abort it with an HTTP error.
+    Never retried.
+    """
+
+    def __init__(self, message, status=409):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+class TransactionContention(Exception):
+    """
+    Retries exhausted while other writers kept winning.
+    """
+
+
+def _is_contention(exc):
+    if isinstance(exc, Aborted):
+        return True
+    # @firestore.transactional wraps the final Aborted in a ValueError
+    return isinstance(exc, ValueError) and isinstance(exc.__cause__, Aborted)
+
+
+def run_transaction(fn, name, max_attempts=MAX_ATTEMPTS):
+    """
+    Run `fn(transaction)` in a transaction, retrying on contention.
+    Counts <name>_conflicts, <name>_retries and <name>_contention_exhausted.
+    """
+    wrapped = firestore.transactional(fn)
+
+    for attempt in range(1, max_attempts + 1):
+        transaction = db.transaction(max_attempts=1)
+        try:
+            return wrapped(transaction)
+        except Exception as e:
+            if not _is_contention(e):
+                raise
+
+            metrics.incr(f"{name}_conflicts")
+
+            if attempt == max_attempts:
+                metrics.incr(f"{name}_contention_exhausted")
+                raise TransactionContention(name) from e
+
+            metrics.incr(f"{name}_retries")
+            delay = min(BACKOFF_BASE * (2 ** (attempt - 1)), BACKOFF_MAX)
+            time.sleep(delay * random.uniform(0.5, 1.5))
@@ -31,4 +31,34 @@ async function request(url, method = "GET", body = null) {
 }
 
 export const apiPost = (url, body) => request(url, "POST", body);
-export const apiGet = (url) => request(url, "GET");
\ No newline at end of file
+export const apiGet = (url) => request(url, "GET");
+
+// 🏷️ Conditional GET: sends the last ETag, 304 → { changed: false }
+const etagCache = new Map();
+
+export async function apiGetConditional(url) {
+  const cached = etagCache.get(url);
+  const headers = cached ? { "If-None-Match": cached.etag } : {};
+
+  const res = await fetch(BASE_URL + url, { headers });
+
+  if (res.status === 304 && cached) {
+    return { data: cached.data, changed: false };
+  }
+
+  const data = await res.json().catch(() => ({}));
+
+  if (!res.ok) {
+    const error = new Error(data.error || data.message || "Request failed");
+    error.response = { data };
+    throw error;
+  }
+
+  const etag = res.headers.get("ETag");
+  if (etag) etagCache.set(url, { etag, data });
+
+  return { data, changed: true };
+}
+
+// 📡 Server-Sent Events stream (falls back to polling on error)
+export const apiStream = (url) => new EventSource(BASE_URL + url);
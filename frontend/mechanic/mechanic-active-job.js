@@ -1,4 +1,4 @@
-import { apiGet, apiPost } from "../js/api.js";
+import { apiGetConditional, apiPost, apiStream } from "../js/api.js";
 
 /* ================= CONFIG ================= */
 const MIN_MOVE_METERS = 5;
@@ -199,10 +199,15 @@ function updateMechanicMarker(lat, lng) {
 
 /* ================= FETCH JOB ================= */
 async function fetchJob() {
-  const data = await apiGet(
+  // 🏷️ 304 when the job hasn't changed since the last poll
+  const { data, changed } = await apiGetConditional(
     `/mechanic/request/${requestId}?phone=${mechanic.phone}`
   );
 
+  if (changed) renderJob(data);
+}
+
+function renderJob(data) {
   /* 🔴 JOB FINISHED STATES */
   // ✅ Job fully done ONLY after bill confirmation
   if (data.bill_status === "CONFIRMED") {
@@ -378,9 +383,46 @@ function startLiveTracking() {
   );
 }
 
+/* ================= LIVE UPDATES ================= */
+let jobStream = null;
+let jobPollInterval = null;
+
+function startJobUpdates() {
+  // 📡 Prefer live push; fall back to 5s polling if the stream fails
+  if (!window.EventSource) {
+    jobPollInterval = setInterval(fetchJob, 5000);
+    return;
+  }
+
+  jobStream = apiStream(
+    `/mechanic/request/${requestId}/stream?phone=${mechanic.phone}`
+  );
+
+  jobStream.addEventListener("status", (e) => {
+    renderJob(JSON.parse(e.data));
+  });
+
+  // Server rotates long-lived connections
+  jobStream.addEventListener("reconnect", () => {
+    jobStream.close();
+    startJobUpdates();
+  });
+
+  jobStream.addEventListener("end", () => {
+    jobStream.close();
+  });
+
+  jobStream.onerror = () => {
+    jobStream.close();
+    if (!jobPollInterval) {
+      jobPollInterval = setInterval(fetchJob, 5000);
+    }
+  };
+}
+
 /* ================= INIT ================= */
 fetchJob();
-setInterval(fetchJob, 5000);
+startJobUpdates();
 
 const wait = setInterval(() => {
   if (map && ownerMarker) {
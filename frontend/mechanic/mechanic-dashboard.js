@@ -1,4 +1,4 @@
-import { apiGet, apiPost } from "../js/api.js";
+import { apiGetConditional, apiPost } from "../js/api.js";
 
 /* ================= SESSION ================= */
 const mechanicRaw = localStorage.getItem("mechanic");
@@ -21,7 +21,6 @@ const nearbyTitle = document.querySelector("h3"); // "Nearby Requests"
 
 /* ================= STATE ================= */
 let pollInterval = null;
-let syncInterval = null;
 let isOnline = false;
 
 /* ================= NAVBAR ================= */
@@ -43,17 +42,22 @@ document.getElementById("logoutBtn")?.addEventListener("click", async () => {
   } catch {}
 
   stopPolling();
-  clearInterval(syncInterval);
   localStorage.clear();
   window.location.href = "../index.html";
 });
 
 /* =====================================================
    🔥 DATABASE = SINGLE SOURCE OF TRUTH
+   One conditional poll: profile + active job + nearby requests.
+   Unchanged polls come back as 304 and skip re-rendering.
    ===================================================== */
 async function syncMechanicStateFromDB() {
   try {
-    const res = await apiGet(`/mechanic/profile?phone=${mechanic.phone}`);
+    const { data: res, changed } = await apiGetConditional(
+      `/mechanic/dashboard?phone=${mechanic.phone}`
+    );
+
+    if (!changed) return;
 
     /* ===== ACTIVE JOB GUARD ===== */
     if (res.active_request_id) {
@@ -69,7 +73,7 @@ async function syncMechanicStateFromDB() {
       window.location.href = "./mechanic-active-job.html";
     };
 
-    stopPolling();
+    requestsList.innerHTML = "";
     return;
   }
 
@@ -89,9 +93,8 @@ async function syncMechanicStateFromDB() {
     availabilityBtn.classList.toggle("online", isOnline);
 
     if (isOnline) {
-      startPolling();
+      renderRequests(res.requests || []);
     } else {
-      stopPolling();
       requestsList.innerHTML = "<p>No nearby requests</p>";
     }
 
@@ -160,14 +163,8 @@ availabilityBtn?.addEventListener("click", async () => {
   }
 });
 
-/* ================= FETCH REQUESTS ================= */
-async function fetchRequests() {
-  if (!isOnline) return;
-
-  try {
-    const res = await apiGet(`/mechanic/requests?phone=${mechanic.phone}`);
-    const requests = res.requests || [];
-
+/* ================= RENDER REQUESTS ================= */
+function renderRequests(requests) {
     requestsList.innerHTML = "";
 
     if (!requests.length) {
@@ -177,7 +174,6 @@ async function fetchRequests() {
 
     requests.forEach(req => {
       const card = document.createElement("div");
-      console.log("REQ OBJECT 👉", req);
       card.className = "request-card";
 
       card.innerHTML = `
@@ -205,10 +201,6 @@ async function fetchRequests() {
 
       requestsList.appendChild(card);
     });
-
-  } catch (err) {
-    console.error("Fetch requests failed:", err);
-  }
 }
 
 /* ================= ACCEPT REQUEST ================= */
@@ -232,8 +224,8 @@ async function acceptRequest(requestId) {
 /* ================= POLLING ================= */
 function startPolling() {
   stopPolling();
-  fetchRequests();
-  pollInterval = setInterval(fetchRequests, 5000);
+  syncMechanicStateFromDB();
+  pollInterval = setInterval(syncMechanicStateFromDB, 5000);
 }
 
 function stopPolling() {
@@ -244,7 +236,5 @@ function stopPolling() {
 }
 
 /* ================= INIT ================= */
-syncMechanicStateFromDB();
-
-/* 🔁 Background DB sync every 8s */
-syncInterval = setInterval(syncMechanicStateFromDB, 8000);
\ No newline at end of file
+/* 🔁 One dashboard poll every 5s (304 when nothing changed) */
+startPolling();
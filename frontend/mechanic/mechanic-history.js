@@ -45,28 +45,35 @@ document.getElementById("logoutBtn").onclick = async () => {
     location.href = "../index.html";
 };
 
-/* ---------------- LOAD HISTORY ---------------- */
+/* ---------------- LOAD HISTORY (PAGED) ---------------- */
+const PAGE_SIZE = 20;
 let cachedHistory = [];
+let nextCursor = null;
 
-async function loadHistory() {
+async function loadHistory(cursor = null) {
     const container = document.getElementById("historyList");
-    container.innerHTML = "Loading...";
+
+    if (!cursor) container.innerHTML = "Loading...";
+    document.getElementById("loadMoreBtn")?.remove();
 
     try {
         const res = await apiGet(
-            `/mechanic/jobs/history?phone=${mechanic.phone}`
+            `/mechanic/jobs/history?phone=${mechanic.phone}&limit=${PAGE_SIZE}` +
+            (cursor ? `&cursor=${encodeURIComponent(cursor)}` : "")
         );
 
-        cachedHistory = res.history || [];
+        const page = res.history || [];
+        nextCursor = res.next_cursor;
+        cachedHistory = cursor ? cachedHistory.concat(page) : page;
 
         if (!cachedHistory.length) {
             container.innerHTML = "<p class='empty'>No completed jobs yet.</p>";
             return;
         }
 
-        container.innerHTML = "";
+        if (!cursor) container.innerHTML = "";
 
-        cachedHistory.forEach(job => {
+        page.forEach(job => {
             const card = document.createElement("div");
             card.className = "history-card";
 
@@ -84,9 +91,19 @@ async function loadHistory() {
             container.appendChild(card);
         });
 
+        /* ---------- NEXT PAGE ---------- */
+        if (nextCursor) {
+            const more = document.createElement("button");
+            more.id = "loadMoreBtn";
+            more.className = "load-more";
+            more.textContent = "Load more";
+            more.onclick = () => loadHistory(nextCursor);
+            container.appendChild(more);
+        }
+
     } catch (err) {
         console.error(err);
-        container.innerHTML = "<p>Failed to load history.</p>";
+        if (!cursor) container.innerHTML = "<p>Failed to load history.</p>";
     }
 }
 
@@ -56,24 +56,31 @@ function init(owner) {
     loadHistory(owner);
 }
 
-/* ---------------- LOAD HISTORY ---------------- */
-async function loadHistory(owner) {
+/* ---------------- LOAD HISTORY (PAGED) ---------------- */
+const PAGE_SIZE = 20;
+let nextCursor = null;
+
+async function loadHistory(owner, cursor = null) {
     const container = document.getElementById("historyList");
-    container.innerHTML = "Loading...";
+
+    if (!cursor) container.innerHTML = "Loading...";
+    document.getElementById("loadMoreBtn")?.remove();
 
     try {
         const res = await apiGet(
-            `/owner/requests/history?phone=${owner.phone}`
+            `/owner/requests/history?phone=${owner.phone}&limit=${PAGE_SIZE}` +
+            (cursor ? `&cursor=${encodeURIComponent(cursor)}` : "")
         );
 
         const history = res.history;
+        nextCursor = res.next_cursor;
 
-        if (!history || history.length === 0) {
+        if (!cursor && (!history || history.length === 0)) {
             container.innerHTML = "<p>No service history found.</p>";
             return;
         }
 
-        container.innerHTML = "";
+        if (!cursor) container.innerHTML = "";
 
         history.forEach(req => {
             const div = document.createElement("div");
@@ -95,9 +102,19 @@ async function loadHistory(owner) {
             container.appendChild(div);
         });
 
+        /* ---------- NEXT PAGE ---------- */
+        if (nextCursor) {
+            const more = document.createElement("button");
+            more.id = "loadMoreBtn";
+            more.className = "load-more";
+            more.textContent = "Load more";
+            more.onclick = () => loadHistory(owner, nextCursor);
+            container.appendChild(more);
+        }
+
     } catch (err) {
         console.error(err);
-        container.innerHTML = "<p>Failed to load history.</p>";
+        if (!cursor) container.innerHTML = "<p>Failed to load history.</p>";
     }
 }
 
@@ -1,4 +1,4 @@
-import { apiGet, apiPost } from "../js/api.js";
+import { apiGetConditional, apiPost, apiStream } from "../js/api.js";
 
 /* ================= MAP STATE ================= */
 let map = null;
@@ -11,6 +11,8 @@ let lastMechLat = null;
 let lastMechLng = null;
 
 let statusInterval = null;
+let statusStream = null;
+let streamFailed = false;
 let isNavigatingAway = false;
 
 let boundsFitted = false;
@@ -18,6 +20,9 @@ let boundsFitted = false;
 const ARRIVAL_RADIUS_METERS = 30;
 let mechanicArrived = false;
 
+// ⏱ ETA computed by the backend (same for every viewer)
+let serverEta = null;
+
 let mapsReady = false;
 
 let finalTimeoutReached = false;
@@ -175,8 +180,10 @@ function drawRoute(mechLat, mechLng, ownerLat, ownerLng) {
 
       const leg = result.routes[0].legs[0];
 
-      document.getElementById("etaText").innerText =
-        `⏱ ETA: ${leg.duration.text}`;
+      if (!serverEta && !mechanicArrived) {
+        document.getElementById("etaText").innerText =
+          `⏱ ETA: ${leg.duration.text}`;
+      }
 
       document.getElementById("distanceText").innerText =
         `📏 Remaining: ${leg.distance.text}`;
@@ -254,16 +261,51 @@ function updateRadiusUI(radiusKm, timeoutAt, createdAt) {
 document.addEventListener("DOMContentLoaded", () => {
 
   function startPolling() {
-    if (statusInterval || isNavigatingAway) return;
+    if (statusInterval || statusStream || isNavigatingAway) return;
+
+    // 📡 Prefer live push; fall back to 3s polling if the stream fails
+    if (window.EventSource && !streamFailed) {
+      startStream();
+      return;
+    }
 
     statusInterval = setInterval(fetchStatus, 3000);
   }
 
+  function startStream() {
+    statusStream = apiStream(`/owner/request/${requestId}/stream`);
+
+    statusStream.addEventListener("status", (e) => {
+      renderStatus(JSON.parse(e.data));
+    });
+
+    // Server rotates long-lived connections
+    statusStream.addEventListener("reconnect", () => {
+      stopPolling();
+      startPolling();
+    });
+
+    statusStream.addEventListener("end", () => {
+      stopPolling();
+    });
+
+    statusStream.onerror = () => {
+      stopPolling();
+      streamFailed = true;
+      startPolling();
+    };
+  }
+
   function stopPolling() {
     if (statusInterval) {
       clearInterval(statusInterval);
       statusInterval = null;
     }
+
+    if (statusStream) {
+      statusStream.close();
+      statusStream = null;
+    }
   }
   /* ================= NAVBAR ================= */
   const logo = document.getElementById("logo");
@@ -308,203 +350,216 @@ document.addEventListener("DOMContentLoaded", () => {
     if (isNavigatingAway) return;
 
     try {
-      const data = await apiGet(
+      // 🏷️ 304 when the request hasn't changed since the last poll
+      const { data, changed } = await apiGetConditional(
         `/owner/request/${requestId}?phone=${owner.phone}`
       );
 
-      /* ================= OTP GATE (HARD BLOCK) ================= */
-      if (data.status !== "IN_PROGRESS") {
-        // 🔒 Mask bill completely until OTP verified
-        data.bill_status = null;
-      }
-
-      /* ================= STATUS TEXT ================= */
-      const statusTextEl = document.getElementById("statusText");
-      if (statusTextEl) {
-        statusTextEl.innerText = data.status || "UNKNOWN";
-      }
+      if (changed) renderStatus(data);
 
-      /* ================= FINAL TIMEOUT LOCK ================= */
-      if (data.status === "TIMEOUT") {
-        finalTimeoutReached = true;
+    } catch (err) {
+      console.error("Status fetch failed:", err);
+    }
+  }
 
-        // 🛑 STOP calm text rotation
-        if (window.calmInterval) {
-          clearInterval(window.calmInterval);
-          window.calmInterval = null;
-        }
+  function renderStatus(data) {
+    if (isNavigatingAway) return;
 
-        // 🔥 FORCE FINAL STATUS TEXTS
-        const statusTitleEl = document.querySelector(".status-title");
-        const statusTextEl = document.getElementById("statusText");
-        const calmTextEl = document.getElementById("calmText");
+    /* ================= OTP GATE (HARD BLOCK) ================= */
+    if (data.status !== "IN_PROGRESS") {
+      // 🔒 Mask bill completely until OTP verified
+      data.bill_status = null;
+    }
 
-        if (statusTitleEl) {
-          statusTitleEl.textContent = "❌ No mechanic found";
-        }
+    /* ================= STATUS TEXT ================= */
+    const statusTextEl = document.getElementById("statusText");
+    if (statusTextEl) {
+      statusTextEl.innerText = data.status || "UNKNOWN";
+    }
 
-        if (statusTextEl) {
-          statusTextEl.textContent = "TIMEOUT";
-          statusTextEl.style.color = "#dc2626"; // red
-        }
+    /* ================= FINAL TIMEOUT LOCK ================= */
+    if (data.status === "TIMEOUT") {
+      finalTimeoutReached = true;
 
-        if (calmTextEl) {
-          calmTextEl.textContent = "Request timed out";
-        }
+      // 🛑 STOP calm text rotation
+      if (window.calmInterval) {
+        clearInterval(window.calmInterval);
+        window.calmInterval = null;
+      }
 
-        // 🛑 STOP breathing animation
-        const statusCard = document.querySelector(".status-card");
-        if (statusCard) {
-          statusCard.style.animation = "none";
-        }
+      // 🔥 FORCE FINAL STATUS TEXTS
+      const statusTitleEl = document.querySelector(".status-title");
+      const statusTextEl = document.getElementById("statusText");
+      const calmTextEl = document.getElementById("calmText");
 
-        // Radius UI
-        const radiusText = document.getElementById("radiusText");
-        const timerText = document.getElementById("timerText");
-        if (radiusText) radiusText.textContent = "❌ No mechanic found";
-        if (timerText) timerText.textContent = "Request timed out";
+      if (statusTitleEl) {
+        statusTitleEl.textContent = "❌ No mechanic found";
+      }
 
-        // Buttons
-        const cancelBtn = document.getElementById("cancelBtn");
-        if (cancelBtn) cancelBtn.style.display = "none";
+      if (statusTextEl) {
+        statusTextEl.textContent = "TIMEOUT";
+        statusTextEl.style.color = "#dc2626"; // red
+      }
 
-        const completeBtn = document.getElementById("completeBtn");
-        if (completeBtn) completeBtn.style.display = "none";
+      if (calmTextEl) {
+        calmTextEl.textContent = "Request timed out";
+      }
 
-        const otpSection = document.getElementById("otpSection");
+      // 🛑 STOP breathing animation
+      const statusCard = document.querySelector(".status-card");
+      if (statusCard) {
+        statusCard.style.animation = "none";
+      }
 
-        // Stop timers
-        if (window.radiusInterval) clearInterval(window.radiusInterval);
-        stopPolling();
+      // Radius UI
+      const radiusText = document.getElementById("radiusText");
+      const timerText = document.getElementById("timerText");
+      if (radiusText) radiusText.textContent = "❌ No mechanic found";
+      if (timerText) timerText.textContent = "Request timed out";
 
-        isNavigatingAway = true;
-        return; // ⛔ HARD STOP — NOTHING AFTER THIS
-      }
+      // Buttons
+      const cancelBtn = document.getElementById("cancelBtn");
+      if (cancelBtn) cancelBtn.style.display = "none";
 
-      // If timeout already happened earlier, never touch UI again
-      if (finalTimeoutReached) return;
+      const completeBtn = document.getElementById("completeBtn");
+      if (completeBtn) completeBtn.style.display = "none";
 
+      const otpSection = document.getElementById("otpSection");
 
-      /* ================= BILL FLOW ================= */
+      // Stop timers
+      if (window.radiusInterval) clearInterval(window.radiusInterval);
+      stopPolling();
 
-      if (
-        data.status === "IN_PROGRESS" &&
-        data.bill_status === "CONFIRMED"
-      ) {
-        isNavigatingAway = true;
-        stopPolling();
+      isNavigatingAway = true;
+      return; // ⛔ HARD STOP — NOTHING AFTER THIS
+    }
 
-        localStorage.removeItem("activeRequestId");
-        localStorage.setItem("completedRequestId", requestId);
+    // If timeout already happened earlier, never touch UI again
+    if (finalTimeoutReached) return;
 
-        window.location.href = "./rating.html";
-        return;
-      }
 
-     /* ================= VIEW BILL UI ================= */
-      const viewBillBtn = document.getElementById("viewBillBtn");
+    /* ================= BILL FLOW ================= */
 
-      if (
-        data.status === "IN_PROGRESS" &&
-        (
-          data.bill_status === "CREATED" ||
-          data.bill_status === "AWAITING_BILL_CONFIRMATION"
-        )
-      ) {
-        if (viewBillBtn) viewBillBtn.style.display = "block";
-      } else {
-        if (viewBillBtn) viewBillBtn.style.display = "none";
-      }
+    if (
+      data.status === "IN_PROGRESS" &&
+      data.bill_status === "CONFIRMED"
+    ) {
+      isNavigatingAway = true;
+      stopPolling();
 
-      /* ================= INIT MAP ================= */
-      if (data.ownerLocation && !map) {
-        initMap(data.ownerLocation.lat, data.ownerLocation.lng);
-      }
+      localStorage.removeItem("activeRequestId");
+      localStorage.setItem("completedRequestId", requestId);
 
-      console.log("STATUS:", data.status, "BILL:", data.bill_status);
+      window.location.href = "./rating.html";
+      return;
+    }
 
-      /* ================= SEARCHING ================= */
-      const radiusBox = document.querySelector(".radius-box");
+   /* ================= VIEW BILL UI ================= */
+    const viewBillBtn = document.getElementById("viewBillBtn");
+
+    if (
+      data.status === "IN_PROGRESS" &&
+      (
+        data.bill_status === "CREATED" ||
+        data.bill_status === "AWAITING_BILL_CONFIRMATION"
+      )
+    ) {
+      if (viewBillBtn) viewBillBtn.style.display = "block";
+    } else {
+      if (viewBillBtn) viewBillBtn.style.display = "none";
+    }
 
-      if (data.status === "SEARCHING") {
-        if (radiusBox) radiusBox.style.display = "block";
+    /* ================= INIT MAP ================= */
+    if (data.ownerLocation && !map) {
+      initMap(data.ownerLocation.lat, data.ownerLocation.lng);
+    }
 
-        updateRadiusUI(
-          data.search_radius_km,
-          data.timeout_at,
-          data.created_at
-        );
+    console.log("STATUS:", data.status, "BILL:", data.bill_status);
 
-        const cancelBtn = document.getElementById("cancelBtn");
-        if (cancelBtn) cancelBtn.style.display = "block";
+    /* ================= SEARCHING ================= */
+    const radiusBox = document.querySelector(".radius-box");
 
-        return;
-      } else {
-        if (radiusBox) radiusBox.style.display = "none";
-        if (window.radiusInterval) clearInterval(window.radiusInterval);
-      }
+    if (data.status === "SEARCHING") {
+      if (radiusBox) radiusBox.style.display = "block";
 
-      /* ================= ACCEPTED / IN_PROGRESS ================= */
-      if (
-        (data.status === "ACCEPTED" || data.status === "IN_PROGRESS") &&
-        data.mechanicLocation &&
-        typeof data.mechanicLocation.lat === "number" &&
-        typeof data.mechanicLocation.lng === "number" &&
-        data.ownerLocation &&
-        mapsReady
-      ) {
-        const mech = data.mechanicLocation;
-        const own = data.ownerLocation;
-
-        updateMechanicMarker(mech.lat, mech.lng);
-        drawRoute(mech.lat, mech.lng, own.lat, own.lng);
-
-        // ARRIVAL DETECTION
-        if (!mechanicArrived && google.maps.geometry) {
-          const dist = distanceMeters(mech, own);
-          if (dist <= ARRIVAL_RADIUS_METERS) {
-            mechanicArrived = true;
-
-            const etaText = document.getElementById("etaText");
-            const distanceText = document.getElementById("distanceText");
-            if (etaText) etaText.innerText = "🚗 Mechanic has arrived";
-            if (distanceText) distanceText.innerText = "📍 Nearby";
-          }
-        }
-      }
+      updateRadiusUI(
+        data.search_radius_km,
+        data.timeout_at,
+        data.created_at
+      );
 
-      /* ================= BUTTONS ================= */
       const cancelBtn = document.getElementById("cancelBtn");
-      const completeBtn = document.getElementById("completeBtn");
-      const otpSection = document.getElementById("otpSection");
+      if (cancelBtn) cancelBtn.style.display = "block";
 
-      if (cancelBtn) {
-        cancelBtn.style.display =
-          data.status === "SEARCHING" || data.status === "ACCEPTED"
-            ? "block"
-            : "none";
-      }
+      return;
+    } else {
+      if (radiusBox) radiusBox.style.display = "none";
+      if (window.radiusInterval) clearInterval(window.radiusInterval);
+    }
 
-      if (completeBtn) {
-        completeBtn.style.display =
-          data.status === "IN_PROGRESS" &&
-          data.bill_status === "CONFIRMED"
-            ? "block"
-            : "none";
+    /* ================= ACCEPTED / IN_PROGRESS ================= */
+    if (
+      (data.status === "ACCEPTED" || data.status === "IN_PROGRESS") &&
+      data.mechanicLocation &&
+      typeof data.mechanicLocation.lat === "number" &&
+      typeof data.mechanicLocation.lng === "number" &&
+      data.ownerLocation &&
+      mapsReady
+    ) {
+      const mech = data.mechanicLocation;
+      const own = data.ownerLocation;
+
+      serverEta = data.eta || null;
+      if (serverEta && !mechanicArrived) {
+        const etaText = document.getElementById("etaText");
+        if (etaText) etaText.innerText = `⏱ ETA: ${serverEta.minutes} min`;
       }
 
-      if (data.status === "IN_PROGRESS") {
-        completeBtn.disabled = false;
-      }
+      updateMechanicMarker(mech.lat, mech.lng);
+      drawRoute(mech.lat, mech.lng, own.lat, own.lng);
 
-      if (otpErrorVisible) {
-        showOtpSection(true);
-      } else {
-        showOtpSection(data.status === "ACCEPTED");
+      // ARRIVAL DETECTION
+      if (!mechanicArrived && google.maps.geometry) {
+        const dist = distanceMeters(mech, own);
+        if (dist <= ARRIVAL_RADIUS_METERS) {
+          mechanicArrived = true;
+
+          const etaText = document.getElementById("etaText");
+          const distanceText = document.getElementById("distanceText");
+          if (etaText) etaText.innerText = "🚗 Mechanic has arrived";
+          if (distanceText) distanceText.innerText = "📍 Nearby";
+        }
       }
+    }
 
-    } catch (err) {
-      console.error("Status fetch failed:", err);
+    /* ================= BUTTONS ================= */
+    const cancelBtn = document.getElementById("cancelBtn");
+    const completeBtn = document.getElementById("completeBtn");
+    const otpSection = document.getElementById("otpSection");
+
+    if (cancelBtn) {
+      cancelBtn.style.display =
+        data.status === "SEARCHING" || data.status === "ACCEPTED"
+          ? "block"
+          : "none";
+    }
+
+    if (completeBtn) {
+      completeBtn.style.display =
+        data.status === "IN_PROGRESS" &&
+        data.bill_status === "CONFIRMED"
+          ? "block"
+          : "none";
+    }
+
+    if (data.status === "IN_PROGRESS") {
+      completeBtn.disabled = false;
+    }
+
+    if (otpErrorVisible) {
+      showOtpSection(true);
+    } else {
+      showOtpSection(data.status === "ACCEPTED");
     }
   }
 